@@ -13,22 +13,61 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from ibm_cloud_sdk_core import IAMTokenManager, DetailedResponse, BaseService, ApiException
-
-from .authorization_v1 import AuthorizationV1
-from .assistant_v1 import AssistantV1
-from .assistant_v2 import AssistantV2
-from .language_translator_v3 import LanguageTranslatorV3
-from .natural_language_classifier_v1 import NaturalLanguageClassifierV1
-from .natural_language_understanding_v1 import NaturalLanguageUnderstandingV1
-from .personality_insights_v3 import PersonalityInsightsV3
-from .text_to_speech_v1 import TextToSpeechV1
-from .tone_analyzer_v3 import ToneAnalyzerV3
-from .discovery_v1 import DiscoveryV1
-from .compare_comply_v1 import CompareComplyV1
-from .visual_recognition_v3 import VisualRecognitionV3
-from .visual_recognition_v4 import VisualRecognitionV4
+import sys
+from importlib import import_module
+
 from .version import __version__
 from .common import get_sdk_headers
-from .speech_to_text_v1_adapter import SpeechToTextV1Adapter as SpeechToTextV1
-from .text_to_speech_adapter_v1 import TextToSpeechV1Adapter as TextToSpeechV1
+
+# The exported names and the modules that define them. The service modules
+# are large, so they are only imported when their class is first used.
+_EXPORTS = {
+    'IAMTokenManager': ('ibm_cloud_sdk_core', 'IAMTokenManager'),
+    'DetailedResponse': ('ibm_cloud_sdk_core', 'DetailedResponse'),
+    'BaseService': ('ibm_cloud_sdk_core', 'BaseService'),
+    'ApiException': ('ibm_cloud_sdk_core', 'ApiException'),
+    'AuthorizationV1': ('.authorization_v1', 'AuthorizationV1'),
+    'AssistantV1': ('.assistant_v1', 'AssistantV1'),
+    'AssistantV2': ('.assistant_v2', 'AssistantV2'),
+    'NaturalLanguageClassifierV1': ('.natural_language_classifier_v1',
+                                    'NaturalLanguageClassifierV1'),
+    'PersonalityInsightsV3': ('.personality_insights_v3',
+                              'PersonalityInsightsV3'),
+    'VisualRecognitionV3': ('.visual_recognition_v3', 'VisualRecognitionV3'),
+    'VisualRecognitionV4': ('.visual_recognition_v4', 'VisualRecognitionV4'),
+    'SpeechToTextV1': ('.speech_to_text_v1_adapter', 'SpeechToTextV1Adapter'),
+    'DiscoveryV1': ('.discovery_v1_adapter', 'DiscoveryV1Adapter'),
+    'CompareComplyV1': ('.compare_comply_v1_adapter',
+                        'CompareComplyV1Adapter'),
+    'LanguageTranslatorV3': ('.language_translator_v3_adapter',
+                             'LanguageTranslatorV3Adapter'),
+    'NaturalLanguageUnderstandingV1': (
+        '.natural_language_understanding_v1_adapter',
+        'NaturalLanguageUnderstandingV1Adapter'),
+    'TextToSpeechV1': ('.text_to_speech_adapter_v1', 'TextToSpeechV1Adapter'),
+    'ToneAnalyzerV3': ('.tone_analyzer_v3_adapter', 'ToneAnalyzerV3Adapter'),
+}
+
+__all__ = sorted(_EXPORTS) + ['__version__', 'get_sdk_headers']
+
+
+def _load(name):
+    module, attribute = _EXPORTS[name]
+    value = getattr(import_module(module, __name__), attribute)
+    globals()[name] = value
+    return value
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in _EXPORTS:
+            return _load(name)
+        raise AttributeError(
+            'module {0!r} has no attribute {1!r}'.format(__name__, name))
+
+    def __dir__():
+        return sorted(set(globals()) | set(_EXPORTS))
+else:
+    # Module __getattr__ (PEP 562) needs Python 3.7.
+    for _name in _EXPORTS:
+        _load(_name)
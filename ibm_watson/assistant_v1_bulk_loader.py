@@ -0,0 +1,281 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Bulk loading of training data into an Assistant V1 workspace.
+"""
+
+from __future__ import absolute_import
+
+from concurrent.futures import ThreadPoolExecutor
+from ibm_cloud_sdk_core import ApiException
+from .assistant_v1_mirror import WorkspaceChange
+from .common import RateLimiter
+
+# Item calls that depend on each other run in successive phases, so that an
+# intent or entity exists before its examples, values and synonyms are added.
+PHASES = (
+    ('create_intent', 'create_entity'),
+    ('create_example', 'create_value'),
+    ('create_synonym',),
+)
+
+
+def _dicts(items):
+    """Return models such as `Example` or `CreateValue` as dicts."""
+    return [x._to_dict() if hasattr(x, '_to_dict') else x
+            for x in items or []]
+
+
+class BulkLoadResult(object):
+    """
+    The outcome of one queued mutation.
+
+    :attr WorkspaceChange change: The queued mutation.
+    :attr DetailedResponse response: (optional) The response of the call that
+    applied the mutation. For a coalesced load, all mutations share the
+    response of the single `update_workspace` call.
+    :attr ApiException error: (optional) The error raised while applying the
+    mutation.
+    """
+
+    def __init__(self, change, response=None, error=None):
+        self.change = change
+        self.response = response
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return '<BulkLoadResult {0} {1}>'.format(
+            self.change, 'ok' if self.ok else self.error)
+
+
+class BulkLoader(object):
+    """
+    Collects training data mutations and applies them with as few calls as
+    possible.
+
+    Once at least `coalesce_threshold` mutations are pending, :meth:`flush`
+    folds them into a single `update_workspace` call with `append=True`, which
+    retrains the workspace once instead of once per item. Smaller loads are
+    applied with the individual `create_*` methods, run concurrently and, if
+    `calls_per_second` is given, rate limited.
+
+    :param AssistantV1 assistant: The client used to reach the service.
+    :param str workspace_id: Unique identifier of the workspace to load.
+    :param int coalesce_threshold: The number of pending mutations from which
+    a single `update_workspace` call is used.
+    :param int max_workers: The maximum number of concurrent item calls.
+    :param float calls_per_second: (optional) The maximum rate of item calls.
+    :param bool fallback: Whether to retry a failed coalesced load item by item,
+    so that each mutation gets its own outcome.
+    """
+
+    def __init__(self,
+                 assistant,
+                 workspace_id,
+                 coalesce_threshold=50,
+                 max_workers=8,
+                 calls_per_second=None,
+                 fallback=True):
+        if assistant is None:
+            raise ValueError('assistant must be provided')
+        if workspace_id is None:
+            raise ValueError('workspace_id must be provided')
+        self.assistant = assistant
+        self.workspace_id = workspace_id
+        self.coalesce_threshold = coalesce_threshold
+        self.max_workers = max_workers
+        self.fallback = fallback
+        self._limiter = RateLimiter(calls_per_second) \
+            if calls_per_second else None
+        self._pending = []
+
+    def __len__(self):
+        return len(self._pending)
+
+    #########################
+    # Queueing
+    #########################
+
+    def create_intent(self, intent, description=None, examples=None):
+        """Queue the creation of an intent; see `AssistantV1.create_intent`."""
+        if intent is None:
+            raise ValueError('intent must be provided')
+        self._queue('create_intent', intent=intent, description=description,
+                    examples=examples)
+
+    def create_example(self, intent, text, mentions=None):
+        """Queue the creation of an example; see `AssistantV1.create_example`."""
+        if intent is None:
+            raise ValueError('intent must be provided')
+        if text is None:
+            raise ValueError('text must be provided')
+        self._queue('create_example', intent=intent, text=text,
+                    mentions=mentions)
+
+    def create_entity(self, entity, description=None, metadata=None,
+                      fuzzy_match=None, values=None):
+        """Queue the creation of an entity; see `AssistantV1.create_entity`."""
+        if entity is None:
+            raise ValueError('entity must be provided')
+        self._queue('create_entity', entity=entity, description=description,
+                    metadata=metadata, fuzzy_match=fuzzy_match, values=values)
+
+    def create_value(self, entity, value, metadata=None, value_type=None,
+                     synonyms=None, patterns=None):
+        """Queue the creation of an entity value; see `AssistantV1.create_value`."""
+        if entity is None:
+            raise ValueError('entity must be provided')
+        if value is None:
+            raise ValueError('value must be provided')
+        self._queue('create_value', entity=entity, value=value,
+                    metadata=metadata, value_type=value_type,
+                    synonyms=synonyms, patterns=patterns)
+
+    def create_synonym(self, entity, value, synonym):
+        """Queue the creation of a synonym; see `AssistantV1.create_synonym`."""
+        if entity is None:
+            raise ValueError('entity must be provided')
+        if value is None:
+            raise ValueError('value must be provided')
+        if synonym is None:
+            raise ValueError('synonym must be provided')
+        self._queue('create_synonym', entity=entity, value=value,
+                    synonym=synonym)
+
+    def _queue(self, method, **arguments):
+        arguments = dict((k, v) for k, v in arguments.items() if v is not None)
+        self._pending.append(WorkspaceChange(method, **arguments))
+
+    #########################
+    # Loading
+    #########################
+
+    def flush(self):
+        """
+        Apply all pending mutations.
+
+        :return: One result per mutation, in the order they were queued.
+        :rtype: list[BulkLoadResult]
+        """
+        pending, self._pending = self._pending, []
+        if not pending:
+            return []
+        if len(pending) >= self.coalesce_threshold:
+            try:
+                response = self.assistant.update_workspace(
+                    self.workspace_id, append=True, **self.payload(pending))
+            except ApiException as ex:
+                if not self.fallback:
+                    return [BulkLoadResult(c, error=ex) for c in pending]
+            else:
+                return [BulkLoadResult(c, response=response) for c in pending]
+        return self._apply_items(pending)
+
+    @staticmethod
+    def payload(changes):
+        """
+        Fold mutations into `update_workspace` arguments.
+
+        :param list[WorkspaceChange] changes: The mutations to fold.
+        :return: The `intents` and `entities` keyword arguments.
+        :rtype: dict
+        """
+        intents = {}
+        entities = {}
+        values = {}
+
+        def intent_of(name):
+            if name not in intents:
+                intents[name] = {'intent': name, 'examples': []}
+            return intents[name]
+
+        def entity_of(name):
+            if name not in entities:
+                entities[name] = {'entity': name, 'values': []}
+            return entities[name]
+
+        def value_of(entity, name):
+            if (entity, name) not in values:
+                values[(entity, name)] = {'value': name}
+                entity_of(entity)['values'].append(values[(entity, name)])
+            return values[(entity, name)]
+
+        for change in changes:
+            arguments = change.arguments
+            if change.method == 'create_intent':
+                intent = intent_of(arguments['intent'])
+                if 'description' in arguments:
+                    intent['description'] = arguments['description']
+                intent['examples'].extend(_dicts(arguments.get('examples')))
+            elif change.method == 'create_example':
+                example = {'text': arguments['text']}
+                if 'mentions' in arguments:
+                    example['mentions'] = _dicts(arguments['mentions'])
+                intent_of(arguments['intent'])['examples'].append(example)
+            elif change.method == 'create_entity':
+                entity = entity_of(arguments['entity'])
+                for field in ('description', 'metadata', 'fuzzy_match'):
+                    if field in arguments:
+                        entity[field] = arguments[field]
+                entity['values'].extend(_dicts(arguments.get('values')))
+            elif change.method == 'create_value':
+                value = value_of(arguments['entity'], arguments['value'])
+                if 'metadata' in arguments:
+                    value['metadata'] = arguments['metadata']
+                if 'value_type' in arguments:
+                    value['type'] = arguments['value_type']
+                for field in ('synonyms', 'patterns'):
+                    if field in arguments:
+                        value.setdefault(field, []).extend(arguments[field])
+            elif change.method == 'create_synonym':
+                value = value_of(arguments['entity'], arguments['value'])
+                value.setdefault('synonyms', []).append(arguments['synonym'])
+            else:
+                raise ValueError('cannot coalesce {0}'.format(change.method))
+
+        payload = {}
+        if intents:
+            payload['intents'] = list(intents.values())
+        if entities:
+            payload['entities'] = list(entities.values())
+        return payload
+
+    def _apply_items(self, changes):
+        results = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            for phase in PHASES:
+                batch = [(i, c) for i, c in enumerate(changes)
+                         if c.method in phase]
+                for (index, _), result in zip(
+                        batch, executor.map(self._apply, [c for _, c in batch])):
+                    results[index] = result
+        finally:
+            executor.shutdown(wait=True)
+        return [results[i] for i in range(len(changes))]
+
+    def _apply(self, change):
+        if self._limiter is not None:
+            self._limiter.wait()
+        try:
+            return BulkLoadResult(
+                change, response=change.apply(self.assistant, self.workspace_id))
+        except ApiException as ex:
+            return BulkLoadResult(change, error=ex)
@@ -0,0 +1,370 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Offline index of the dialog tree of an Assistant V1 workspace.
+"""
+
+from __future__ import absolute_import
+
+JUMP_SELECTORS = ('condition', 'client', 'user_input', 'body')
+UNCONDITIONAL = ('true', 'anything_else')
+
+# Model attributes whose name differs from the JSON property.
+_MODEL_ATTRIBUTES = {'type': 'node_type'}
+
+
+def _get(item, field):
+    if item is None:
+        return None
+    if isinstance(item, dict):
+        return item.get(field)
+    return getattr(item, _MODEL_ATTRIBUTES.get(field, field), None)
+
+
+def _condition(node):
+    conditions = _get(node, 'conditions')
+    if conditions is None:
+        return None
+    return conditions.strip().lower()
+
+
+class DialogGraphIssue(object):
+    """
+    A structural problem found in a dialog tree.
+
+    :attr str dialog_node: The ID of the offending dialog node.
+    :attr str kind: The kind of problem, for example `missing_parent` or
+    `missing_jump_target`.
+    :attr str message: A human readable description of the problem.
+    """
+
+    def __init__(self, dialog_node, kind, message):
+        self.dialog_node = dialog_node
+        self.kind = kind
+        self.message = message
+
+    def __str__(self):
+        return '{0}: {1}'.format(self.dialog_node, self.message)
+
+    def __repr__(self):
+        return '<DialogGraphIssue {0} {1}>'.format(self.kind, self)
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return self.__dict__ == other.__dict__
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class DialogGraph(object):
+    """
+    An index of the parent, sibling and jump relations between dialog nodes.
+
+    The service returns dialog nodes as a flat list in which each node only
+    points at its parent and previous sibling. The graph is built in a single
+    pass over that list, after which navigation is a dictionary lookup.
+
+    :param list nodes: The dialog nodes, as `DialogNode` models or as the
+    `dict` objects returned by `list_dialog_nodes` and `get_workspace`.
+    """
+
+    def __init__(self, nodes):
+        self._nodes = {}
+        self._order = []
+        self._parent = {}
+        self._children = {}
+        self._previous = {}
+        self._next = {}
+        self._position = {}
+        self._issues = []
+
+        for node in nodes:
+            node_id = _get(node, 'dialog_node')
+            if node_id in self._nodes:
+                self._issues.append(
+                    DialogGraphIssue(node_id, 'duplicate_node',
+                                     'dialog node ID is used more than once'))
+                continue
+            self._nodes[node_id] = node
+            self._order.append(node_id)
+
+        groups = {}
+        for node_id in self._order:
+            node = self._nodes[node_id]
+            parent = _get(node, 'parent')
+            if parent is not None and parent not in self._nodes:
+                self._issues.append(
+                    DialogGraphIssue(node_id, 'missing_parent',
+                                     'parent {0} does not exist'.format(parent)))
+            self._parent[node_id] = parent
+            groups.setdefault(parent, []).append(node_id)
+
+        for parent, members in groups.items():
+            self._children[parent] = self._order_siblings(parent, members)
+        for members in self._children.values():
+            for index, node_id in enumerate(members):
+                self._position[node_id] = index
+                self._previous[node_id] = members[index - 1] if index else None
+                self._next[node_id] = members[index + 1] \
+                    if index + 1 < len(members) else None
+
+        self._find_parent_cycles()
+
+    @classmethod
+    def from_workspace(cls, workspace):
+        """
+        Build the graph of a workspace.
+
+        :param workspace: A `Workspace` model, or a `dict` with a `dialog_nodes`
+        list such as the result of `get_workspace(export=True)` or
+        `list_dialog_nodes`.
+        :rtype: DialogGraph
+        """
+        return cls(_get(workspace, 'dialog_nodes') or [])
+
+    def _order_siblings(self, parent, members):
+        """Follow the previous_sibling links of one sibling group."""
+        heads = []
+        following = {}
+        for node_id in members:
+            previous = _get(self._nodes[node_id], 'previous_sibling')
+            if previous is None:
+                heads.append(node_id)
+            elif previous not in self._nodes:
+                self._issues.append(
+                    DialogGraphIssue(
+                        node_id, 'missing_previous_sibling',
+                        'previous sibling {0} does not exist'.format(previous)))
+                heads.append(node_id)
+            elif self._parent.get(previous) != parent:
+                self._issues.append(
+                    DialogGraphIssue(
+                        node_id, 'sibling_mismatch',
+                        'previous sibling {0} has a different parent'.format(
+                            previous)))
+                heads.append(node_id)
+            elif previous in following:
+                self._issues.append(
+                    DialogGraphIssue(
+                        node_id, 'duplicate_previous_sibling',
+                        'previous sibling {0} is shared with {1}'.format(
+                            previous, following[previous])))
+                heads.append(node_id)
+            else:
+                following[previous] = node_id
+
+        ordered = []
+        placed = set()
+        for head in heads:
+            node_id = head
+            while node_id is not None and node_id not in placed:
+                placed.add(node_id)
+                ordered.append(node_id)
+                node_id = following.get(node_id)
+        # Whatever is left forms a previous_sibling cycle.
+        for node_id in members:
+            if node_id not in placed:
+                self._issues.append(
+                    DialogGraphIssue(node_id, 'sibling_cycle',
+                                     'previous_sibling links form a cycle'))
+                placed.add(node_id)
+                ordered.append(node_id)
+        return tuple(ordered)
+
+    def _find_parent_cycles(self):
+        state = {}
+        for start in self._order:
+            path = []
+            node_id = start
+            while node_id in self._nodes and node_id not in state:
+                state[node_id] = start
+                path.append(node_id)
+                node_id = self._parent[node_id]
+            if node_id in self._nodes and state[node_id] == start:
+                cycle = path[path.index(node_id):]
+                for member in cycle:
+                    self._issues.append(
+                        DialogGraphIssue(member, 'parent_cycle',
+                                         'node is its own ancestor'))
+
+    #########################
+    # Navigation
+    #########################
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, dialog_node):
+        return dialog_node in self._nodes
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def node(self, dialog_node):
+        """Return the dialog node with the given ID, or `None`."""
+        return self._nodes.get(dialog_node)
+
+    @property
+    def roots(self):
+        """The top-level nodes, in evaluation order."""
+        return self._children.get(None, ())
+
+    def parent(self, dialog_node):
+        """Return the ID of the parent node, or `None` for a root node."""
+        return self._parent.get(dialog_node)
+
+    def children(self, dialog_node):
+        """Return the IDs of the child nodes, in evaluation order."""
+        return self._children.get(dialog_node, ())
+
+    def previous_sibling(self, dialog_node):
+        """Return the ID of the previous sibling, or `None`."""
+        return self._previous.get(dialog_node)
+
+    def next_sibling(self, dialog_node):
+        """Return the ID of the next sibling, or `None`."""
+        return self._next.get(dialog_node)
+
+    def ancestors(self, dialog_node):
+        """Return the IDs of the ancestors, starting with the parent."""
+        ancestors = []
+        seen = set([dialog_node])
+        parent = self._parent.get(dialog_node)
+        while parent is not None and parent in self._nodes \
+                and parent not in seen:
+            ancestors.append(parent)
+            seen.add(parent)
+            parent = self._parent.get(parent)
+        return ancestors
+
+    def jump_target(self, dialog_node):
+        """Return the ID of the node that a `jump_to` step points at, or `None`."""
+        next_step = _get(self._nodes.get(dialog_node), 'next_step')
+        if _get(next_step, 'behavior') != 'jump_to':
+            return None
+        return _get(next_step, 'dialog_node')
+
+    #########################
+    # Analysis
+    #########################
+
+    def validate(self):
+        """
+        Check the tree structure and the jump targets.
+
+        :return: The problems found, in node order.
+        :rtype: list[DialogGraphIssue]
+        """
+        issues = list(self._issues)
+        for node_id in self._order:
+            next_step = _get(self._nodes[node_id], 'next_step')
+            if _get(next_step, 'behavior') != 'jump_to':
+                continue
+            target = _get(next_step, 'dialog_node')
+            selector = _get(next_step, 'selector')
+            if target is None:
+                issues.append(
+                    DialogGraphIssue(node_id, 'missing_jump_target',
+                                     'jump_to has no target dialog node'))
+            elif target not in self._nodes:
+                issues.append(
+                    DialogGraphIssue(
+                        node_id, 'missing_jump_target',
+                        'jump target {0} does not exist'.format(target)))
+            if selector is not None and selector not in JUMP_SELECTORS:
+                issues.append(
+                    DialogGraphIssue(
+                        node_id, 'invalid_jump_selector',
+                        'unknown jump selector {0}'.format(selector)))
+        return issues
+
+    def reachable(self):
+        """
+        Find the nodes that a conversation can reach.
+
+        Sibling groups are evaluated in order, starting with the root nodes.
+        A standard node whose condition is `true` or `anything_else` shadows
+        the standard nodes and folders that follow it, and a node whose
+        condition is `false` is never selected by evaluation. Children are
+        considered whenever their parent is reached, and `jump_to` steps reach
+        their target. The analysis is conservative: it never reports a node
+        that could be reached as unreachable because of a missed edge.
+
+        :return: The IDs of the reachable nodes.
+        :rtype: set
+        """
+        reached = set()
+        scanned = set()
+        pending = [(None, 0)]
+        while pending:
+            parent, start = pending.pop()
+            members = self._children.get(parent, ())
+            shadowed = False
+            responses_shadowed = False
+            for node_id in members[start:]:
+                state = (node_id, shadowed, responses_shadowed)
+                if state in scanned:
+                    break
+                scanned.add(state)
+                node_type = _get(self._nodes[node_id], 'type') or 'standard'
+                if node_type in ('standard', 'folder') and shadowed:
+                    continue
+                if node_type == 'response_condition' and responses_shadowed:
+                    continue
+                condition = _condition(self._nodes[node_id])
+                if condition == 'false':
+                    continue
+                self._reach(node_id, reached, pending)
+                if condition in UNCONDITIONAL:
+                    if node_type == 'standard':
+                        shadowed = True
+                    elif node_type == 'response_condition':
+                        responses_shadowed = True
+        return reached
+
+    def _reach(self, node_id, reached, pending):
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            if current in reached:
+                continue
+            reached.add(current)
+            if self._children.get(current):
+                pending.append((current, 0))
+            next_step = _get(self._nodes[current], 'next_step')
+            if _get(next_step, 'behavior') != 'jump_to':
+                continue
+            target = _get(next_step, 'dialog_node')
+            if target not in self._nodes:
+                continue
+            if _get(next_step, 'selector') in ('body', 'client'):
+                stack.append(target)
+            else:
+                # The target's condition is evaluated, and evaluation falls
+                # through to its following siblings if it does not match.
+                pending.append((self._parent[target], self._position[target]))
+
+    def dead_nodes(self):
+        """
+        Find the nodes that no conversation can reach.
+
+        :return: The IDs of the unreachable nodes, in node order.
+        :rtype: list[str]
+        """
+        reached = self.reachable()
+        return [node_id for node_id in self._order if node_id not in reached]
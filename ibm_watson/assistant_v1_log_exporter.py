@@ -0,0 +1,216 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming export of Assistant V1 logs to newline-delimited JSON, Parquet or
+Arrow files.
+"""
+
+from __future__ import absolute_import
+
+import json
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FORMATS = ('ndjson', 'parquet', 'arrow')
+
+# The fixed schema of an exported row, in column order.
+COLUMNS = ('log_id', 'workspace_id', 'language', 'conversation_id',
+           'request_timestamp', 'response_timestamp', 'request_text',
+           'top_intent', 'top_intent_confidence', 'intents', 'entities',
+           'output_text')
+
+
+def _arrow_schema():
+    intent = pyarrow.struct([('intent', pyarrow.string()),
+                             ('confidence', pyarrow.float64())])
+    entity = pyarrow.struct([('entity', pyarrow.string()),
+                             ('value', pyarrow.string()),
+                             ('confidence', pyarrow.float64())])
+    return pyarrow.schema([
+        ('log_id', pyarrow.string()),
+        ('workspace_id', pyarrow.string()),
+        ('language', pyarrow.string()),
+        ('conversation_id', pyarrow.string()),
+        ('request_timestamp', pyarrow.string()),
+        ('response_timestamp', pyarrow.string()),
+        ('request_text', pyarrow.string()),
+        ('top_intent', pyarrow.string()),
+        ('top_intent_confidence', pyarrow.float64()),
+        ('intents', pyarrow.list_(intent)),
+        ('entities', pyarrow.list_(entity)),
+        ('output_text', pyarrow.list_(pyarrow.string())),
+    ])
+
+
+def log_to_row(log):
+    """
+    Flatten a log event, as returned in the `logs` array of `list_logs` or
+    `list_all_logs`, into a row of the export schema.
+
+    :param dict log: The log event.
+    :rtype: dict
+    """
+    request = log.get('request') or {}
+    response = log.get('response') or {}
+    intents = [{
+        'intent': x.get('intent'),
+        'confidence': x.get('confidence')
+    } for x in response.get('intents') or []]
+    entities = [{
+        'entity': x.get('entity'),
+        'value': x.get('value'),
+        'confidence': x.get('confidence')
+    } for x in response.get('entities') or []]
+    context = response.get('context') or request.get('context') or {}
+    output_text = (response.get('output') or {}).get('text') or []
+    return {
+        'log_id': log.get('log_id'),
+        'workspace_id': log.get('workspace_id'),
+        'language': log.get('language'),
+        'conversation_id': context.get('conversation_id'),
+        'request_timestamp': log.get('request_timestamp'),
+        'response_timestamp': log.get('response_timestamp'),
+        'request_text': (request.get('input') or {}).get('text'),
+        'top_intent': intents[0]['intent'] if intents else None,
+        'top_intent_confidence': intents[0]['confidence'] if intents else None,
+        'intents': intents,
+        'entities': entities,
+        'output_text': output_text
+            if isinstance(output_text, list) else [output_text],
+    }
+
+
+class LogExporter(object):
+    """
+    Pages through the logs of an Assistant V1 service instance and writes them
+    to disk one page at a time.
+
+    Only the JSON of the current page is held in memory and no `Log` models
+    are built, so the memory used by an export does not grow with the number
+    of log events.
+
+    :param AssistantV1 assistant: The client used to reach the service.
+    :param int page_limit: The number of log events to request per page.
+    """
+
+    def __init__(self, assistant, page_limit=500):
+        if assistant is None:
+            raise ValueError('assistant must be provided')
+        self.assistant = assistant
+        self.page_limit = page_limit
+
+    def iter_pages(self, filter=None, workspace_id=None, sort=None):
+        """
+        Yield the rows of each page of log events.
+
+        :param str filter: A filter query limiting the exported events. It is
+        required unless `workspace_id` is given; see `AssistantV1.list_all_logs`.
+        :param str workspace_id: (optional) Export the logs of this workspace
+        with `list_logs` instead of `list_all_logs`.
+        :param str sort: (optional) How to sort the log events.
+        :return: A generator of lists of rows.
+        """
+        if workspace_id is None and filter is None:
+            raise ValueError('filter must be provided')
+        cursor = None
+        while True:
+            if workspace_id is not None:
+                result = self.assistant.list_logs(
+                    workspace_id, sort=sort, filter=filter,
+                    page_limit=self.page_limit, cursor=cursor).get_result()
+            else:
+                result = self.assistant.list_all_logs(
+                    filter, sort=sort, page_limit=self.page_limit,
+                    cursor=cursor).get_result()
+            yield [log_to_row(log) for log in result.get('logs') or []]
+            cursor = (result.get('pagination') or {}).get('next_cursor')
+            if not cursor:
+                return
+
+    def export(self,
+               path,
+               filter=None,
+               workspace_id=None,
+               sort=None,
+               format='ndjson'):
+        """
+        Export log events to a file.
+
+        :param str path: The file to write.
+        :param str filter: A filter query limiting the exported events; see
+        :meth:`iter_pages`.
+        :param str workspace_id: (optional) Export the logs of this workspace.
+        :param str sort: (optional) How to sort the log events.
+        :param str format: The file format: `ndjson`, `parquet` (one row group
+        per page) or `arrow` (the Arrow IPC file format, one record batch per
+        page). The last two require `pyarrow`.
+        :return: The number of exported log events.
+        :rtype: int
+        """
+        if format not in FORMATS:
+            raise ValueError('format must be one of {0}'.format(
+                ', '.join(FORMATS)))
+        if workspace_id is None and filter is None:
+            raise ValueError('filter must be provided')
+        pages = self.iter_pages(filter=filter, workspace_id=workspace_id,
+                                sort=sort)
+        if format == 'ndjson':
+            return self._write_ndjson(path, pages)
+        if pyarrow is None:
+            raise ImportError(
+                'pyarrow is required to export logs as {0}'.format(format))
+        return self._write_arrow(path, pages, format)
+
+    @staticmethod
+    def _write_ndjson(path, pages):
+        count = 0
+        with open(path, 'w') as out:
+            for rows in pages:
+                for row in rows:
+                    out.write(json.dumps(row, sort_keys=True))
+                    out.write('\n')
+                count += len(rows)
+        return count
+
+    @staticmethod
+    def _write_arrow(path, pages, format):
+        schema = _arrow_schema()
+        count = 0
+        if format == 'parquet':
+            writer = pyarrow.parquet.ParquetWriter(path, schema)
+        else:
+            writer = pyarrow.RecordBatchFileWriter(path, schema)
+        try:
+            for rows in pages:
+                if not rows:
+                    continue
+                columns = [[row[name] for row in rows] for name in COLUMNS]
+                batch = pyarrow.RecordBatch.from_arrays(
+                    [pyarrow.array(c, type=schema.field(i).type)
+                     for i, c in enumerate(columns)],
+                    schema=schema)
+                if format == 'parquet':
+                    writer.write_table(pyarrow.Table.from_batches([batch]))
+                else:
+                    writer.write_batch(batch)
+                count += len(rows)
+        finally:
+            writer.close()
+        return count
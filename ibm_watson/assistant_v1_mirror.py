@@ -0,0 +1,539 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Local on-disk snapshot of an Assistant V1 workspace with incremental sync.
+"""
+
+from __future__ import absolute_import
+
+import json
+import os
+from .common import replace_file
+
+AUDIT_FIELDS = ('created', 'updated')
+
+INTENT_FIELDS = ('description',)
+ENTITY_FIELDS = ('description', 'metadata', 'fuzzy_match')
+VALUE_FIELDS = ('metadata', 'type', 'patterns')
+DIALOG_NODE_FIELDS = ('description', 'conditions', 'parent', 'previous_sibling',
+                      'output', 'context', 'metadata', 'next_step', 'title',
+                      'type', 'event_name', 'variable', 'actions',
+                      'digress_in', 'digress_out', 'digress_out_slots',
+                      'user_label')
+
+# The dialog node and value models name their `type` property differently in
+# the create/update methods.
+_ARGUMENT_NAMES = {'type': 'node_type'}
+_VALUE_ARGUMENT_NAMES = {'type': 'value_type'}
+
+
+def _strip_audit(item):
+    if isinstance(item, dict):
+        return dict((k, _strip_audit(v)) for k, v in item.items()
+                    if k not in AUDIT_FIELDS)
+    if isinstance(item, list):
+        return [_strip_audit(x) for x in item]
+    return item
+
+
+def _is_newer(remote, local):
+    """Compare two audit timestamps, treating a missing one as changed."""
+    if local is None or remote is None:
+        return True
+    # The service returns ISO 8601 timestamps in UTC, which sort lexically.
+    return remote > local
+
+
+class WorkspaceChange(object):
+    """
+    A single service call needed to bring a workspace to a desired state.
+
+    :attr str method: The name of the `AssistantV1` method to call.
+    :attr dict arguments: The keyword arguments for the call, excluding
+    `workspace_id`.
+    """
+
+    def __init__(self, method, **arguments):
+        self.method = method
+        self.arguments = arguments
+
+    def apply(self, assistant, workspace_id):
+        """Invoke the change and return the `DetailedResponse`."""
+        return getattr(assistant, self.method)(workspace_id,
+                                               **self.arguments)
+
+    def __str__(self):
+        return '{0}({1})'.format(
+            self.method, json.dumps(self.arguments, sort_keys=True))
+
+    def __repr__(self):
+        return '<WorkspaceChange {0}>'.format(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return self.__dict__ == other.__dict__
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class WorkspaceMirror(object):
+    """
+    A local snapshot of an Assistant V1 workspace.
+
+    The snapshot is a single JSON file holding the exported workspace with its
+    audit timestamps. :meth:`sync` only performs a full export (limited to 20
+    requests per 30 minutes) when no snapshot exists yet; later syncs compare
+    the `updated` timestamps reported by the inexpensive list operations with
+    the snapshot and fetch only the intents and entities that changed.
+
+    :param AssistantV1 assistant: The client used to reach the service.
+    :param str workspace_id: Unique identifier of the mirrored workspace.
+    :param str path: The file in which the snapshot is stored.
+    :param int page_limit: The number of records to request per page when
+    listing workspace elements.
+    """
+
+    def __init__(self, assistant, workspace_id, path, page_limit=500):
+        if assistant is None:
+            raise ValueError('assistant must be provided')
+        if workspace_id is None:
+            raise ValueError('workspace_id must be provided')
+        if path is None:
+            raise ValueError('path must be provided')
+        self.assistant = assistant
+        self.workspace_id = workspace_id
+        self.path = path
+        self.page_limit = page_limit
+        self.workspace = None
+        self._intents = {}
+        self._examples = {}
+        self._entities = {}
+        self._values = {}
+        self._dialog_nodes = {}
+        self._counterexamples = {}
+        if os.path.exists(path):
+            self._load()
+
+    #########################
+    # Snapshot
+    #########################
+
+    def _load(self):
+        with open(self.path, 'r') as snapshot:
+            data = json.load(snapshot)
+        if data.get('workspace_id') != self.workspace_id:
+            raise ValueError('{0} holds a snapshot of workspace {1}'.format(
+                self.path, data.get('workspace_id')))
+        self.workspace = data['workspace']
+        self._reindex()
+
+    def save(self):
+        """Write the snapshot to disk, replacing any previous one atomically."""
+        if self.workspace is None:
+            raise ValueError('no snapshot to save; call sync() first')
+        tmp_path = '{0}.tmp'.format(self.path)
+        with open(tmp_path, 'w') as snapshot:
+            json.dump({
+                'workspace_id': self.workspace_id,
+                'workspace': self.workspace
+            }, snapshot, sort_keys=True)
+        replace_file(tmp_path, self.path)
+
+    def _reindex(self):
+        workspace = self.workspace
+        self._intents = dict(
+            (x['intent'], x) for x in workspace.get('intents') or [])
+        self._examples = {}
+        for intent in self._intents.values():
+            for example in intent.get('examples') or []:
+                self._examples[(intent['intent'], example['text'])] = example
+        self._entities = dict(
+            (x['entity'], x) for x in workspace.get('entities') or [])
+        self._values = {}
+        for entity in self._entities.values():
+            for value in entity.get('values') or []:
+                self._values[(entity['entity'], value['value'])] = value
+        self._dialog_nodes = dict(
+            (x['dialog_node'], x) for x in workspace.get('dialog_nodes') or [])
+        self._counterexamples = dict(
+            (x['text'], x) for x in workspace.get('counterexamples') or [])
+
+    #########################
+    # Lookup
+    #########################
+
+    def intent(self, intent):
+        """Return the mirrored intent `dict`, or `None`."""
+        return self._intents.get(intent)
+
+    def example(self, intent, text):
+        """Return the mirrored example `dict` of an intent, or `None`."""
+        return self._examples.get((intent, text))
+
+    def entity(self, entity):
+        """Return the mirrored entity `dict`, or `None`."""
+        return self._entities.get(entity)
+
+    def value(self, entity, value):
+        """Return the mirrored value `dict` of an entity, or `None`."""
+        return self._values.get((entity, value))
+
+    def dialog_node(self, dialog_node):
+        """Return the mirrored dialog node `dict`, or `None`."""
+        return self._dialog_nodes.get(dialog_node)
+
+    def counterexample(self, text):
+        """Return the mirrored counterexample `dict`, or `None`."""
+        return self._counterexamples.get(text)
+
+    @property
+    def intents(self):
+        return list(self._intents.values())
+
+    @property
+    def entities(self):
+        return list(self._entities.values())
+
+    @property
+    def dialog_nodes(self):
+        return list(self._dialog_nodes.values())
+
+    @property
+    def counterexamples(self):
+        return list(self._counterexamples.values())
+
+    #########################
+    # Sync
+    #########################
+
+    def sync(self, full=False):
+        """
+        Bring the snapshot up to date with the service and save it.
+
+        :param bool full: Whether to force a full export of the workspace.
+        :return: `True` if the snapshot changed, `False` otherwise.
+        :rtype: bool
+        """
+        if full or self.workspace is None:
+            self.workspace = self.assistant.get_workspace(
+                self.workspace_id, export=True, include_audit=True,
+                sort='stable').get_result()
+            self._reindex()
+            self.save()
+            return True
+
+        header = self.assistant.get_workspace(
+            self.workspace_id, export=False,
+            include_audit=True).get_result()
+        if not _is_newer(header.get('updated'), self.workspace.get('updated')):
+            return False
+
+        workspace = dict((k, v) for k, v in header.items()
+                         if k not in ('intents', 'entities', 'dialog_nodes',
+                                      'counterexamples'))
+        workspace['intents'] = self._sync_children(
+            'list_intents', 'intents', 'intent', self._intents,
+            'get_intent')
+        workspace['entities'] = self._sync_children(
+            'list_entities', 'entities', 'entity', self._entities,
+            'get_entity')
+        # Dialog nodes and counterexamples have no subelements, so listing
+        # them already returns their full content.
+        workspace['dialog_nodes'] = self._list_all('list_dialog_nodes',
+                                                   'dialog_nodes')
+        workspace['counterexamples'] = self._list_all(
+            'list_counterexamples', 'counterexamples')
+        self.workspace = workspace
+        self._reindex()
+        self.save()
+        return True
+
+    def _list_all(self, method, key, **kwargs):
+        items = []
+        cursor = None
+        while True:
+            result = getattr(self.assistant, method)(
+                self.workspace_id,
+                page_limit=self.page_limit,
+                cursor=cursor,
+                include_audit=True,
+                **kwargs).get_result()
+            items.extend(result.get(key) or [])
+            cursor = (result.get('pagination') or {}).get('next_cursor')
+            if not cursor:
+                return items
+
+    def _sync_children(self, list_method, key, name_field, local, get_method):
+        children = []
+        for header in self._list_all(list_method, key, export=False):
+            name = header[name_field]
+            known = local.get(name)
+            if known is not None and not _is_newer(header.get('updated'),
+                                                    known.get('updated')):
+                children.append(known)
+                continue
+            children.append(
+                getattr(self.assistant, get_method)(
+                    self.workspace_id, name, export=True,
+                    include_audit=True).get_result())
+        return children
+
+    #########################
+    # Push
+    #########################
+
+    def diff(self, desired):
+        """
+        Compute the service calls that turn the snapshot into `desired`.
+
+        :param dict desired: The workspace content to converge to, in the
+        export format returned by `get_workspace(export=True)`.
+        :return: The changes, ordered so that each can be applied in turn.
+        :rtype: list[WorkspaceChange]
+        """
+        if self.workspace is None:
+            raise ValueError('no snapshot to diff against; call sync() first')
+        desired = _strip_audit(desired)
+        changes = []
+        changes.extend(self._diff_intents(desired.get('intents') or []))
+        changes.extend(self._diff_entities(desired.get('entities') or []))
+        changes.extend(
+            self._diff_counterexamples(desired.get('counterexamples') or []))
+        changes.extend(
+            self._diff_dialog_nodes(desired.get('dialog_nodes') or []))
+        return changes
+
+    def push(self, desired, dry_run=False):
+        """
+        Apply the minimal set of changes that turn the workspace into `desired`.
+
+        After the changes are applied, the snapshot is brought up to date with
+        an incremental :meth:`sync`.
+
+        :param dict desired: The workspace content to converge to.
+        :param bool dry_run: Whether to only compute the changes.
+        :return: The applied (or, for a dry run, pending) changes.
+        :rtype: list[WorkspaceChange]
+        """
+        changes = self.diff(desired)
+        if dry_run or not changes:
+            return changes
+        for change in changes:
+            change.apply(self.assistant, self.workspace_id)
+        self.sync()
+        return changes
+
+    def _diff_intents(self, desired):
+        changes = []
+        wanted = dict((x['intent'], x) for x in desired)
+        for name in sorted(set(self._intents) - set(wanted)):
+            changes.append(WorkspaceChange('delete_intent', intent=name))
+        for name in sorted(wanted):
+            intent = wanted[name]
+            current = self._intents.get(name)
+            if current is None:
+                changes.append(
+                    WorkspaceChange(
+                        'create_intent',
+                        intent=name,
+                        description=intent.get('description'),
+                        examples=intent.get('examples')))
+                continue
+            current = _strip_audit(current)
+            if current.get('description') != intent.get('description'):
+                changes.append(
+                    WorkspaceChange(
+                        'update_intent',
+                        intent=name,
+                        new_description=intent.get('description')))
+            changes.extend(
+                self._diff_examples(name, current.get('examples') or [],
+                                    intent.get('examples') or []))
+        return changes
+
+    @staticmethod
+    def _diff_examples(intent, current, desired):
+        changes = []
+        have = dict((x['text'], x) for x in current)
+        wanted = dict((x['text'], x) for x in desired)
+        for text in sorted(set(have) - set(wanted)):
+            changes.append(
+                WorkspaceChange('delete_example', intent=intent, text=text))
+        for text in sorted(wanted):
+            example = wanted[text]
+            if text not in have:
+                changes.append(
+                    WorkspaceChange(
+                        'create_example',
+                        intent=intent,
+                        text=text,
+                        mentions=example.get('mentions')))
+            elif have[text].get('mentions') != example.get('mentions'):
+                changes.append(
+                    WorkspaceChange(
+                        'update_example',
+                        intent=intent,
+                        text=text,
+                        new_mentions=example.get('mentions') or []))
+        return changes
+
+    def _diff_entities(self, desired):
+        changes = []
+        wanted = dict((x['entity'], x) for x in desired)
+        for name in sorted(set(self._entities) - set(wanted)):
+            changes.append(WorkspaceChange('delete_entity', entity=name))
+        for name in sorted(wanted):
+            entity = wanted[name]
+            current = self._entities.get(name)
+            if current is None:
+                changes.append(
+                    WorkspaceChange(
+                        'create_entity',
+                        entity=name,
+                        description=entity.get('description'),
+                        metadata=entity.get('metadata'),
+                        fuzzy_match=entity.get('fuzzy_match'),
+                        values=entity.get('values')))
+                continue
+            current = _strip_audit(current)
+            updates = dict(('new_{0}'.format(field), entity.get(field))
+                           for field in ENTITY_FIELDS
+                           if current.get(field) != entity.get(field))
+            if updates:
+                changes.append(
+                    WorkspaceChange('update_entity', entity=name, **updates))
+            changes.extend(
+                self._diff_values(name, current.get('values') or [],
+                                  entity.get('values') or []))
+        return changes
+
+    @staticmethod
+    def _diff_values(entity, current, desired):
+        changes = []
+        have = dict((x['value'], x) for x in current)
+        wanted = dict((x['value'], x) for x in desired)
+        for name in sorted(set(have) - set(wanted)):
+            changes.append(
+                WorkspaceChange('delete_value', entity=entity, value=name))
+        for name in sorted(wanted):
+            value = wanted[name]
+            if name not in have:
+                changes.append(
+                    WorkspaceChange(
+                        'create_value',
+                        entity=entity,
+                        value=name,
+                        metadata=value.get('metadata'),
+                        value_type=value.get('type'),
+                        synonyms=value.get('synonyms'),
+                        patterns=value.get('patterns')))
+                continue
+            updates = dict(
+                ('new_{0}'.format(_VALUE_ARGUMENT_NAMES.get(field, field)),
+                 value.get(field))
+                for field in VALUE_FIELDS
+                if have[name].get(field) != value.get(field))
+            if updates:
+                changes.append(
+                    WorkspaceChange(
+                        'update_value', entity=entity, value=name, **updates))
+            old = set(have[name].get('synonyms') or [])
+            new = set(value.get('synonyms') or [])
+            for synonym in sorted(old - new):
+                changes.append(
+                    WorkspaceChange(
+                        'delete_synonym',
+                        entity=entity,
+                        value=name,
+                        synonym=synonym))
+            for synonym in sorted(new - old):
+                changes.append(
+                    WorkspaceChange(
+                        'create_synonym',
+                        entity=entity,
+                        value=name,
+                        synonym=synonym))
+        return changes
+
+    def _diff_counterexamples(self, desired):
+        changes = []
+        wanted = set(x['text'] for x in desired)
+        for text in sorted(set(self._counterexamples) - wanted):
+            changes.append(WorkspaceChange('delete_counterexample', text=text))
+        for text in sorted(wanted - set(self._counterexamples)):
+            changes.append(WorkspaceChange('create_counterexample', text=text))
+        return changes
+
+    def _diff_dialog_nodes(self, desired):
+        changes = []
+        wanted = dict((x['dialog_node'], x) for x in desired)
+        removed = set(self._dialog_nodes) - set(wanted)
+        for name in sorted(removed):
+            # Deleting a node also deletes its descendants.
+            if self._dialog_nodes[name].get('parent') not in removed:
+                changes.append(
+                    WorkspaceChange('delete_dialog_node', dialog_node=name))
+        created = set(wanted) - set(self._dialog_nodes)
+        for name in self._creation_order(wanted, created):
+            node = wanted[name]
+            arguments = dict(
+                (_ARGUMENT_NAMES.get(field, field), node[field])
+                for field in DIALOG_NODE_FIELDS
+                if node.get(field) is not None)
+            changes.append(
+                WorkspaceChange(
+                    'create_dialog_node', dialog_node=name, **arguments))
+        for name in sorted(set(wanted) - created):
+            node = wanted[name]
+            current = _strip_audit(self._dialog_nodes[name])
+            updates = dict(
+                ('new_{0}'.format(_ARGUMENT_NAMES.get(field, field)),
+                 node.get(field))
+                for field in DIALOG_NODE_FIELDS
+                if current.get(field) != node.get(field))
+            if updates:
+                changes.append(
+                    WorkspaceChange(
+                        'update_dialog_node', dialog_node=name, **updates))
+        return changes
+
+    @staticmethod
+    def _creation_order(nodes, created):
+        """Order new nodes so that parents and previous siblings come first."""
+        ordered = []
+        visited = set()
+        for name in sorted(created):
+            stack = [name]
+            while stack:
+                current = stack[-1]
+                if current in visited:
+                    stack.pop()
+                    continue
+                pending = [
+                    dep for dep in (nodes[current].get('parent'),
+                                    nodes[current].get('previous_sibling'))
+                    if dep in created and dep not in visited
+                    and dep not in stack
+                ]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                visited.add(current)
+                ordered.append(current)
+                stack.pop()
+        return ordered
@@ -14,7 +14,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import platform
+import threading
+import time
 from .version import __version__
 
 SDK_ANALYTICS_HEADER = 'X-IBMCloud-SDK-Analytics'
@@ -39,3 +42,37 @@ def get_sdk_headers(service_name, service_version, operation_id):
     headers[SDK_ANALYTICS_HEADER] = get_sdk_analytics(service_name, service_version, operation_id)
     headers[USER_AGENT_HEADER] = get_user_agent()
     return headers
+
+
+def replace_file(src, dst):
+    """Atomically move `src` over `dst`, also on Python 2."""
+    try:
+        os.replace(src, dst)
+    except AttributeError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+class RateLimiter(object):
+    """
+    Thread-safe limiter that spaces calls out to at most `rate` per second.
+
+    :param float rate: The maximum number of calls per second.
+    """
+
+    def __init__(self, rate):
+        if rate is None or rate <= 0:
+            raise ValueError('rate must be a positive number')
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        """Block until the next call is allowed."""
+        with self._lock:
+            now = time.time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
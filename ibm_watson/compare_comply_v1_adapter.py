@@ -0,0 +1,207 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from os.path import basename
+from concurrent.futures import ThreadPoolExecutor
+from ibm_cloud_sdk_core import DetailedResponse
+from .compare_comply_v1 import CompareComplyV1
+from .compare_comply_v1_cache import ResultCache, file_digest
+from .compare_comply_v1_pages import is_pdf, merge_results, split_pdf
+
+PAGES_DOCSTRING = """
+        :param int pages_per_request: (optional) Split a PDF document into
+        parts of this many pages, process the parts concurrently and merge
+        their results. Offsets and element IDs of the merged result refer to
+        the joined HTML of the parts. Requires `pypdf`.
+        :param int max_workers: (optional) The maximum number of parts
+        processed at a time. By default every part is processed at once.
+"""
+
+
+def _with_pages_docstring(method):
+    docstring = method.__doc__
+    marker = '        :param dict headers:'
+    return docstring.replace(marker, PAGES_DOCSTRING.strip('\n') + '\n' +
+                             marker, 1)
+
+
+class CompareComplyV1Adapter(CompareComplyV1):
+    result_cache = None
+
+    def enable_result_cache(self, directory, max_bytes=1 << 30):
+        """
+        Cache the results of `convert_to_html`, `classify_elements`,
+        `extract_tables` and `compare_documents` on disk.
+
+        Results are keyed by the SHA-256 of the input documents, the method,
+        the model and the version date of the client, so submitting the same
+        document again only costs hashing it. Results of `compare_documents`
+        are keyed by the ordered pair of hashes.
+
+        :param str directory: The directory holding the cache files.
+        :param int max_bytes: The maximum total size of the cache files.
+        :return: The cache, whose `hits` and `misses` can be inspected.
+        :rtype: ResultCache
+        """
+        self.result_cache = ResultCache(directory, max_bytes=max_bytes)
+        return self.result_cache
+
+    def disable_result_cache(self):
+        """Stop caching results. The cache files are kept."""
+        self.result_cache = None
+
+    def _cached(self, method, files, model, parts, call):
+        cache = self.result_cache
+        if cache is None:
+            return call(*files)
+        for f in files:
+            if f is None:
+                raise ValueError('file must be provided')
+        data = [f.read() if hasattr(f, 'read') else f for f in files]
+        key = cache.key(method, self.version, model,
+                        [file_digest(d) for d in data], *parts)
+        result = cache.get(key)
+        if result is not None:
+            return DetailedResponse(result, None, 200)
+        response = call(*data)
+        cache.put(key, response.get_result())
+        return response
+
+    def convert_to_html(self,
+                        file,
+                        filename=None,
+                        file_content_type=None,
+                        model=None,
+                        pages_per_request=None,
+                        max_workers=None,
+                        **kwargs):
+        if not filename and hasattr(file, 'name'):
+            filename = basename(file.name)
+
+        def call(file):
+            if pages_per_request is None:
+                return CompareComplyV1.convert_to_html(
+                    self, file, filename=filename,
+                    file_content_type=file_content_type, model=model,
+                    **kwargs)
+            if not filename:
+                raise ValueError('filename must be provided')
+            return self._process_pages(CompareComplyV1.convert_to_html, file,
+                                       pages_per_request, max_workers,
+                                       filename=filename, model=model,
+                                       **kwargs)
+
+        return self._cached('convert_to_html', [file], model,
+                            [pages_per_request], call)
+
+    convert_to_html.__doc__ = _with_pages_docstring(
+        CompareComplyV1.convert_to_html)
+
+    def classify_elements(self,
+                          file,
+                          file_content_type=None,
+                          model=None,
+                          pages_per_request=None,
+                          max_workers=None,
+                          **kwargs):
+
+        def call(file):
+            if pages_per_request is None:
+                return CompareComplyV1.classify_elements(
+                    self, file, file_content_type=file_content_type,
+                    model=model, **kwargs)
+            return self._process_pages(CompareComplyV1.classify_elements, file,
+                                       pages_per_request, max_workers,
+                                       model=model, **kwargs)
+
+        return self._cached('classify_elements', [file], model,
+                            [pages_per_request], call)
+
+    classify_elements.__doc__ = _with_pages_docstring(
+        CompareComplyV1.classify_elements)
+
+    def extract_tables(self,
+                       file,
+                       file_content_type=None,
+                       model=None,
+                       pages_per_request=None,
+                       max_workers=None,
+                       **kwargs):
+
+        def call(file):
+            if pages_per_request is None:
+                return CompareComplyV1.extract_tables(
+                    self, file, file_content_type=file_content_type,
+                    model=model, **kwargs)
+            return self._process_pages(CompareComplyV1.extract_tables, file,
+                                       pages_per_request, max_workers,
+                                       model=model, **kwargs)
+
+        return self._cached('extract_tables', [file], model,
+                            [pages_per_request], call)
+
+    extract_tables.__doc__ = _with_pages_docstring(
+        CompareComplyV1.extract_tables)
+
+    def compare_documents(self,
+                          file_1,
+                          file_2,
+                          file_1_content_type=None,
+                          file_2_content_type=None,
+                          file_1_label=None,
+                          file_2_label=None,
+                          model=None,
+                          **kwargs):
+
+        def call(file_1, file_2):
+            return CompareComplyV1.compare_documents(
+                self, file_1, file_2,
+                file_1_content_type=file_1_content_type,
+                file_2_content_type=file_2_content_type,
+                file_1_label=file_1_label,
+                file_2_label=file_2_label,
+                model=model,
+                **kwargs)
+
+        return self._cached('compare_documents', [file_1, file_2], model,
+                            [file_1_label, file_2_label], call)
+
+    compare_documents.__doc__ = CompareComplyV1.compare_documents.__doc__
+
+    def _process_pages(self, method, file, pages_per_request, max_workers,
+                       **kwargs):
+        if file is None:
+            raise ValueError('file must be provided')
+        data = file.read() if hasattr(file, 'read') else file
+        if not is_pdf(data):
+            raise ValueError('pages_per_request requires a PDF document')
+        parts = split_pdf(data, pages_per_request)
+        if len(parts) == 1:
+            return method(self, data, file_content_type='application/pdf',
+                          **kwargs)
+
+        def process(part):
+            return method(self, part, file_content_type='application/pdf',
+                          **kwargs)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers or len(parts))
+        try:
+            responses = list(executor.map(process, parts))
+        finally:
+            executor.shutdown(wait=True)
+        return DetailedResponse(
+            merge_results([r.get_result() for r in responses], data),
+            responses[0].get_headers(), responses[0].get_status_code())
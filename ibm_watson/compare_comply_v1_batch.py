@@ -0,0 +1,249 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Orchestration of Compare and Comply V1 batch processing, with a local
+fallback.
+"""
+
+from __future__ import absolute_import
+
+import json
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ibm_cloud_sdk_core import ApiException
+
+# The `CompareComplyV1` method run by each batch function.
+FUNCTIONS = {
+    'html_conversion': 'convert_to_html',
+    'element_classification': 'classify_elements',
+    'tables': 'extract_tables',
+}
+
+# The statuses after which a batch no longer changes.
+FINAL_STATUSES = ('completed', 'failed', 'cancelled', 'canceled')
+
+
+def _now():
+    return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def _counts(status):
+    counts = status.get('document_counts') or {}
+    return (counts.get('total'), counts.get('pending'),
+            counts.get('successful'), counts.get('failed'))
+
+
+class BatchOrchestrator(object):
+    """
+    Runs one Compare and Comply function over many documents.
+
+    Batches are submitted with `create_batch` and followed with `get_batch`.
+    When batches cannot be used, the same function can be run over the files
+    of a local directory instead, and :meth:`run` does so when the service
+    rejects the batch. Either way, progress is reported as a sequence of
+    `BatchStatus` dicts whose `document_counts` hold the `total`, `pending`,
+    `successful` and `failed` documents.
+
+    :param CompareComplyV1 compare_comply: The client used to reach the
+    service.
+    :param str function: The batch function: `html_conversion`,
+    `element_classification` or `tables`.
+    :param str model: (optional) The analysis model to use.
+    :param int max_workers: The maximum number of documents processed at a
+    time by the local fallback.
+    :param float initial_interval: The number of seconds between the first
+    polls of a batch.
+    :param float max_interval: The maximum number of seconds between two
+    polls.
+    :param float backoff: The factor applied to the interval after every poll
+    that shows no progress.
+    :param sleep: (optional) The function used to wait between polls.
+    """
+
+    def __init__(self,
+                 compare_comply,
+                 function,
+                 model=None,
+                 max_workers=4,
+                 initial_interval=5.0,
+                 max_interval=60.0,
+                 backoff=2.0,
+                 sleep=time.sleep):
+        if compare_comply is None:
+            raise ValueError('compare_comply must be provided')
+        if function not in FUNCTIONS:
+            raise ValueError('function must be one of {0}'.format(
+                ', '.join(sorted(FUNCTIONS))))
+        self.compare_comply = compare_comply
+        self.function = function
+        self.model = model
+        self.max_workers = max_workers
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.sleep = sleep
+        self.failures = {}
+
+    def submit(self, input_credentials_file, input_bucket_location,
+               input_bucket_name, output_credentials_file,
+               output_bucket_location, output_bucket_name):
+        """
+        Submit a batch; see `CompareComplyV1.create_batch`.
+
+        :return: The ID of the batch.
+        :rtype: str
+        """
+        return self.compare_comply.create_batch(
+            self.function,
+            input_credentials_file,
+            input_bucket_location,
+            input_bucket_name,
+            output_credentials_file,
+            output_bucket_location,
+            output_bucket_name,
+            model=self.model).get_result()['batch_id']
+
+    def poll(self, batch_id):
+        """
+        Follow a batch until it finishes.
+
+        The interval between polls grows while the batch makes no progress
+        and is reset whenever its status or counts change.
+
+        :param str batch_id: The ID of the batch.
+        :return: A generator of the `get_batch` result, each time the status
+        or the document counts change.
+        """
+        interval = self.initial_interval
+        previous = None
+        while True:
+            status = self.compare_comply.get_batch(batch_id).get_result()
+            current = (status.get('status'), _counts(status))
+            if current != previous:
+                yield status
+                previous = current
+                interval = self.initial_interval
+            else:
+                interval = min(interval * self.backoff, self.max_interval)
+            if status.get('status') in FINAL_STATUSES:
+                return
+            self.sleep(interval)
+
+    def run_local(self, input_directory, output_directory):
+        """
+        Run the function over the files of a directory.
+
+        The result of each file is written as JSON to `output_directory`,
+        under the name of the file followed by `.json`, as a batch writes it
+        to its output bucket. The error of each failed file is kept in
+        :attr:`failures`.
+
+        :param str input_directory: The directory of the input documents.
+        :param str output_directory: The directory to write the results to.
+        :return: A generator of `BatchStatus` dicts, after every document.
+        """
+        names = sorted(
+            name for name in os.listdir(input_directory)
+            if not name.startswith('.') and
+            os.path.isfile(os.path.join(input_directory, name)))
+        if not os.path.isdir(output_directory):
+            os.makedirs(output_directory)
+        status = {
+            'function': self.function,
+            'input_bucket_name': input_directory,
+            'output_bucket_name': output_directory,
+            'status': 'active',
+            'document_counts': {'total': len(names), 'pending': len(names),
+                                'successful': 0, 'failed': 0},
+            'created': _now(),
+            'updated': _now(),
+        }
+        counts = status['document_counts']
+        method = getattr(self.compare_comply, FUNCTIONS[self.function])
+
+        def process(name):
+            path = os.path.join(input_directory, name)
+            with open(path, 'rb') as document:
+                if self.function == 'html_conversion':
+                    result = method(document, filename=name, model=self.model)
+                else:
+                    result = method(document, model=self.model)
+            with open(os.path.join(output_directory, name + '.json'),
+                      'w') as out:
+                json.dump(result.get_result(), out)
+
+        yield dict(status, document_counts=dict(counts))
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = dict((executor.submit(process, name), name)
+                           for name in names)
+            for future in as_completed(futures):
+                counts['pending'] -= 1
+                error = future.exception()
+                if error is None:
+                    counts['successful'] += 1
+                else:
+                    counts['failed'] += 1
+                    self.failures[futures[future]] = error
+                status['updated'] = _now()
+                if not counts['pending']:
+                    status['status'] = 'completed'
+                yield dict(status, document_counts=dict(counts))
+        finally:
+            executor.shutdown(wait=True)
+        if not names:
+            status['status'] = 'completed'
+            yield dict(status, document_counts=dict(counts))
+
+    def run(self,
+            input_directory=None,
+            output_directory=None,
+            input_credentials_file=None,
+            input_bucket_location=None,
+            input_bucket_name=None,
+            output_credentials_file=None,
+            output_bucket_location=None,
+            output_bucket_name=None):
+        """
+        Run the function as a batch, or locally when that is not possible.
+
+        A batch is submitted when the bucket arguments are given. When they
+        are not, or when the service rejects the batch, the function is run
+        over `input_directory` with :meth:`run_local`.
+
+        :return: A generator of `BatchStatus` dicts.
+        """
+        buckets = (input_credentials_file, input_bucket_location,
+                   input_bucket_name, output_credentials_file,
+                   output_bucket_location, output_bucket_name)
+        if all(b is not None for b in buckets):
+            try:
+                batch_id = self.submit(*buckets)
+            except ApiException:
+                if input_directory is None:
+                    raise
+            else:
+                for status in self.poll(batch_id):
+                    yield status
+                return
+        if input_directory is None:
+            raise ValueError('input_directory must be provided')
+        if output_directory is None:
+            raise ValueError('output_directory must be provided')
+        for status in self.run_local(input_directory, output_directory):
+            yield status
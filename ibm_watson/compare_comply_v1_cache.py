@@ -0,0 +1,150 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Persistent cache of Compare and Comply V1 results, keyed by document content.
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from .common import replace_file
+
+_SUFFIX = '.json'
+
+
+def file_digest(data):
+    """Return the SHA-256 hex digest of a document."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache(object):
+    """
+    A thread-safe, size-bounded LRU cache of results on disk.
+
+    Each result is stored as a JSON file named after its key. The index of
+    the entries is rebuilt from the directory when the cache is opened,
+    oldest access first, so the cache survives restarts and can be shared by
+    consecutive processes. Once the files exceed `max_bytes`, the least
+    recently used ones are deleted.
+
+    :param str directory: The directory holding the cache files.
+    :param int max_bytes: The maximum total size of the cache files.
+    """
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        found = []
+        for name in os.listdir(directory):
+            if not name.endswith(_SUFFIX):
+                continue
+            stat = os.stat(os.path.join(directory, name))
+            found.append((stat.st_mtime, name[:-len(_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.size += size
+        self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(method, version, model, digests, *parts):
+        """
+        Compute the key of a result.
+
+        :param str method: The name of the method.
+        :param str version: The API version date of the client.
+        :param str model: The analysis model, or `None` for the default.
+        :param list[str] digests: The SHA-256 digests of the input documents,
+        in argument order.
+        :param parts: Any other argument that changes the result.
+        :rtype: str
+        """
+        canonical = json.dumps([method, version, model, list(digests)] +
+                               list(parts), separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key):
+        """Return the cached result of `key`, or `None`."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries[key] = self._entries.pop(key)
+        try:
+            with open(self._path(key)) as cached:
+                result = json.load(cached)
+            # The modification time orders the entries on the next open.
+            os.utime(self._path(key), None)
+        except (IOError, OSError, ValueError):
+            with self._lock:
+                self._drop(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Store the result of `key`."""
+        body = json.dumps(result, separators=(',', ':'))
+        size = len(body.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'w') as out:
+            out.write(body)
+        with self._lock:
+            replace_file(tmp_path, self._path(key))
+            self.size -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self.size += size
+            self._evict()
+
+    def clear(self):
+        """Delete every cached result."""
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key):
+        self.size -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
@@ -0,0 +1,200 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Page-range splitting of Compare and Comply V1 documents, and merging of the
+results of each range.
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import io
+import re
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:
+    try:
+        from PyPDF2 import PdfReader, PdfWriter
+    except ImportError:
+        PdfReader = PdfWriter = None
+
+# Element and cell IDs end with the begin and end offsets of the element,
+# such as `bodyCell-2049-2053`.
+_ELEMENT_ID = re.compile(r'^(.*)-(\d+)-(\d+)$')
+_BODY_START = re.compile(r'<body[^>]*>', re.IGNORECASE)
+_BODY_END = re.compile(r'</body\s*>', re.IGNORECASE)
+_STRING_TYPES = (type(''), type(u''))
+
+
+def is_pdf(data):
+    """Return whether `data` holds a PDF document."""
+    return data[:5] == b'%PDF-'
+
+
+def split_pdf(data, pages_per_request):
+    """
+    Split a PDF document into documents of consecutive pages.
+
+    Requires `pypdf`, or `PyPDF2` 2.0 or later.
+
+    :param bytes data: The PDF document.
+    :param int pages_per_request: The number of pages of each part.
+    :return: The parts, in page order.
+    :rtype: list[bytes]
+    """
+    if PdfReader is None:
+        raise ImportError('pypdf is required to split documents into pages')
+    if pages_per_request < 1:
+        raise ValueError('pages_per_request must be positive')
+    reader = PdfReader(io.BytesIO(data))
+    pages = list(reader.pages)
+    parts = []
+    for start in range(0, len(pages), pages_per_request):
+        writer = PdfWriter()
+        for page in pages[start:start + pages_per_request]:
+            writer.add_page(page)
+        part = io.BytesIO()
+        writer.write(part)
+        parts.append(part.getvalue())
+    return parts
+
+
+def _splice_html(htmls):
+    """
+    Join the HTML of each part into one document, keeping the head of the
+    first part and appending the body content of the others to its body.
+
+    :return: The joined HTML, and the shift of the offsets of each part.
+    """
+    first = htmls[0]
+    end = _BODY_END.search(first)
+    end = end.start() if end else len(first)
+    pieces = [first[:end]]
+    length = end
+    shifts = [0]
+    for html in htmls[1:]:
+        start = _BODY_START.search(html)
+        start = start.end() if start else 0
+        stop = _BODY_END.search(html, start)
+        stop = stop.start() if stop else len(html)
+        shifts.append(length - start)
+        pieces.append(html[start:stop])
+        length += stop - start
+    pieces.append(first[end:])
+    return ''.join(pieces), shifts
+
+
+def _max_end(value):
+    if isinstance(value, dict):
+        ends = [_max_end(v) for v in value.values()]
+        if isinstance(value.get('end'), int):
+            ends.append(value['end'])
+        return max(ends or [0])
+    if isinstance(value, list):
+        return max([_max_end(v) for v in value] or [0])
+    return 0
+
+
+def rebase(value, shift):
+    """
+    Return a copy of a result with every `begin` and `end` offset, and every
+    element ID built from them, moved by `shift` characters.
+    """
+    if isinstance(value, dict):
+        rebased = {}
+        for key, item in value.items():
+            if key in ('begin', 'end') and isinstance(item, int):
+                rebased[key] = item + shift
+            elif key in ('cell_id', 'id') and isinstance(item, _STRING_TYPES):
+                match = _ELEMENT_ID.match(item)
+                rebased[key] = '{0}-{1}-{2}'.format(
+                    match.group(1), int(match.group(2)) + shift,
+                    int(match.group(3)) + shift) if match else item
+            else:
+                rebased[key] = rebase(item, shift)
+        return rebased
+    if isinstance(value, list):
+        return [rebase(item, shift) for item in value]
+    return value
+
+
+def _merge_parties(parties, more):
+    by_name = dict((p.get('party'), p) for p in parties)
+    for party in more:
+        same = by_name.get(party.get('party'))
+        if same is None:
+            parties.append(party)
+            by_name[party.get('party')] = party
+            continue
+        for key, item in party.items():
+            if isinstance(item, list):
+                same[key] = (same.get(key) or []) + item
+            elif same.get(key) is None:
+                same[key] = item
+
+
+def _merge(merged, other):
+    for key, item in other.items():
+        current = merged.get(key)
+        if current is None:
+            merged[key] = item
+        elif key == 'parties':
+            _merge_parties(current, item)
+        elif isinstance(current, list) and isinstance(item, list):
+            current.extend(item)
+        elif isinstance(current, dict) and isinstance(item, dict):
+            _merge(current, item)
+
+
+def merge_results(results, data=None):
+    """
+    Merge the results of the page ranges of one document.
+
+    Works on the results of `classify_elements`, `extract_tables` and
+    `convert_to_html`. The HTML of the parts is joined into the HTML of the
+    whole document, and the offsets and element IDs of each part are moved
+    to where its HTML now starts. Lists of elements, tables, dates and so on
+    are concatenated in page order, and parties found in several parts are
+    merged by name.
+
+    :param list[dict] results: The result of each part, in page order.
+    :param bytes data: (optional) The whole document, whose MD5 hash replaces
+    the hash of the first part.
+    :rtype: dict
+    """
+    documents = [r.get('document') if 'document' in r else r for r in results]
+    htmls = [d.get('html') if d else None for d in documents]
+    if all(h is not None for h in htmls):
+        html, shifts = _splice_html(htmls)
+    else:
+        html, shifts = None, [0]
+        for result in results[:-1]:
+            shifts.append(shifts[-1] + _max_end(result))
+
+    merged = rebase(results[0], shifts[0])
+    for result, shift in zip(results[1:], shifts[1:]):
+        _merge(merged, rebase(result, shift))
+
+    document = merged.get('document') if 'document' in merged else merged
+    if html is not None:
+        document['html'] = html
+    if data is not None and 'hash' in document:
+        document['hash'] = hashlib.md5(data).hexdigest()
+    if 'num_pages' in merged:
+        merged['num_pages'] = str(sum(int(r.get('num_pages') or 0)
+                                      for r in results))
+    return merged
@@ -0,0 +1,204 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Decoding of Compare and Comply V1 tables into dense grids.
+"""
+
+from __future__ import absolute_import
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# The kinds of cell of a grid.
+EMPTY = 0
+TABLE_HEADER = 1
+COLUMN_HEADER = 2
+ROW_HEADER = 3
+BODY = 4
+
+# The cell lists of a table, and the kind of their cells.
+_CELL_LISTS = (('table_headers', TABLE_HEADER),
+               ('column_headers', COLUMN_HEADER),
+               ('row_headers', ROW_HEADER),
+               ('body_cells', BODY))
+
+
+def _span(cell):
+    row = cell.get('row_index_begin') or 0
+    column = cell.get('column_index_begin') or 0
+    row_end = cell.get('row_index_end')
+    column_end = cell.get('column_index_end')
+    return (row, row if row_end is None else row_end,
+            column, column if column_end is None else column_end)
+
+
+class TableGrid(object):
+    """
+    A table laid out as a dense grid of rows and columns.
+
+    A cell spanning several rows or columns fills every position it spans.
+    When NumPy is installed, :attr:`text` and :attr:`cell_ids` are
+    two-dimensional object arrays and :attr:`kinds` an `int8` array;
+    otherwise they are lists of rows.
+
+    :attr tuple shape: The number of rows and columns.
+    :attr text: The text of the cell at each position, or `None`.
+    :attr cell_ids: The `cell_id` of the cell at each position, or `None`.
+    :attr kinds: The kind of the cell at each position: `EMPTY`,
+    `TABLE_HEADER`, `COLUMN_HEADER`, `ROW_HEADER` or `BODY`.
+    :attr list[tuple] column_headers: The texts of the column headers over
+    each column, from top to bottom.
+    :attr list[tuple] row_headers: The texts of the row headers of each row,
+    from left to right.
+    :attr dict location: The location of the table in the document.
+    :attr str section_title: The text of the section title of the table.
+    """
+
+    def __init__(self, shape, text, cell_ids, kinds, column_headers,
+                 row_headers, location=None, section_title=None):
+        self.shape = shape
+        self.text = text
+        self.cell_ids = cell_ids
+        self.kinds = kinds
+        self.column_headers = column_headers
+        self.row_headers = row_headers
+        self.location = location
+        self.section_title = section_title
+
+    @classmethod
+    def from_dict(cls, table):
+        """
+        Decode one table of the raw `extract_tables` or `classify_elements`
+        result, without building `Tables` models.
+
+        :param dict table: An item of the `tables` array.
+        :rtype: TableGrid
+        """
+        cells = []
+        rows = columns = 0
+        for name, kind in _CELL_LISTS:
+            for cell in table.get(name) or []:
+                span = _span(cell)
+                rows = max(rows, span[1] + 1)
+                columns = max(columns, span[3] + 1)
+                cells.append((span, kind, cell))
+
+        if numpy is not None:
+            text = numpy.empty((rows, columns), dtype=object)
+            cell_ids = numpy.empty((rows, columns), dtype=object)
+            kinds = numpy.zeros((rows, columns), dtype=numpy.int8)
+            for (row, row_end, column, column_end), kind, cell in cells:
+                area = (slice(row, row_end + 1), slice(column, column_end + 1))
+                text[area] = cell.get('text')
+                cell_ids[area] = cell.get('cell_id')
+                kinds[area] = kind
+        else:
+            text = [[None] * columns for _ in range(rows)]
+            cell_ids = [[None] * columns for _ in range(rows)]
+            kinds = [[EMPTY] * columns for _ in range(rows)]
+            for (row, row_end, column, column_end), kind, cell in cells:
+                for r in range(row, row_end + 1):
+                    for c in range(column, column_end + 1):
+                        text[r][c] = cell.get('text')
+                        cell_ids[r][c] = cell.get('cell_id')
+                        kinds[r][c] = kind
+
+        column_headers = [[] for _ in range(columns)]
+        row_headers = [[] for _ in range(rows)]
+        for (row, row_end, column, column_end), kind, cell in cells:
+            if kind == COLUMN_HEADER:
+                for c in range(column, column_end + 1):
+                    column_headers[c].append((row, cell.get('text')))
+            elif kind == ROW_HEADER:
+                for r in range(row, row_end + 1):
+                    row_headers[r].append((column, cell.get('text')))
+
+        return cls((rows, columns), text, cell_ids, kinds,
+                   [tuple(t for _, t in sorted(h) if t) for h in column_headers],
+                   [tuple(t for _, t in sorted(h) if t) for h in row_headers],
+                   location=table.get('location'),
+                   section_title=(table.get('section_title') or {}).get(
+                       'text'))
+
+    def _kind(self, row, column):
+        if numpy is not None:
+            return self.kinds[row, column]
+        return self.kinds[row][column]
+
+    def _text(self, row, column):
+        if numpy is not None:
+            return self.text[row, column]
+        return self.text[row][column]
+
+    def body_rows(self):
+        """Return the indexes of the rows holding body cells."""
+        if numpy is not None:
+            return numpy.nonzero((self.kinds == BODY).any(axis=1))[0].tolist()
+        return [r for r in range(self.shape[0])
+                if any(self._kind(r, c) == BODY for c in range(self.shape[1]))]
+
+    def body_columns(self):
+        """Return the indexes of the columns holding body cells."""
+        if numpy is not None:
+            return numpy.nonzero((self.kinds == BODY).any(axis=0))[0].tolist()
+        return [c for c in range(self.shape[1])
+                if any(self._kind(r, c) == BODY for r in range(self.shape[0]))]
+
+    def to_arrow(self):
+        """
+        Return the body of the table as an Arrow table of strings.
+
+        There is one column per body column, named after its column headers
+        joined with ` / `, and one row per body row, preceded by a `row_header`
+        column holding its row headers joined the same way. Requires `pyarrow`.
+
+        :rtype: pyarrow.Table
+        """
+        if pyarrow is None:
+            raise ImportError('pyarrow is required to convert tables to Arrow')
+        rows = self.body_rows()
+        names = ['row_header']
+        arrays = [pyarrow.array([' / '.join(self.row_headers[r]) or None
+                                 for r in rows], type=pyarrow.string())]
+        for column in self.body_columns():
+            name = ' / '.join(self.column_headers[column]) or \
+                'column_{0}'.format(column)
+            if name in names:
+                name = '{0}_{1}'.format(name, column)
+            names.append(name)
+            arrays.append(pyarrow.array([self._text(r, column) for r in rows],
+                                        type=pyarrow.string()))
+        return pyarrow.Table.from_arrays(arrays, names=names)
+
+    def __repr__(self):
+        return '<TableGrid rows={0} columns={1}>'.format(*self.shape)
+
+
+def decode_tables(result):
+    """
+    Decode every table of an `extract_tables` or `classify_elements` result.
+
+    :param dict result: The raw result, as returned by `get_result()`.
+    :rtype: list[TableGrid]
+    """
+    return [TableGrid.from_dict(table) for table in result.get('tables') or []]
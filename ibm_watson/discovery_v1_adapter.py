@@ -0,0 +1,559 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from ibm_cloud_sdk_core import DetailedResponse
+from .common import get_sdk_headers
+from .discovery_v1 import DiscoveryV1
+from .discovery_v1_query_cache import QueryCache, STALE
+from .discovery_v1_stream import QueryResultStream
+
+# The arguments of `DiscoveryV1.query` that follow the collection ID.
+QUERY_ARGUMENTS = ('filter', 'query', 'natural_language_query', 'passages',
+                   'aggregation', 'count', 'return_fields', 'offset', 'sort',
+                   'highlight', 'passages_fields', 'passages_count',
+                   'passages_characters', 'deduplicate', 'deduplicate_field',
+                   'collection_ids', 'similar', 'similar_document_ids',
+                   'similar_fields', 'bias', 'logging_opt_out')
+
+# The query arguments whose name in the request body differs.
+QUERY_BODY_NAMES = {
+    'return_fields': 'return',
+    'passages_fields': 'passages.fields',
+    'passages_count': 'passages.count',
+    'passages_characters': 'passages.characters',
+    'deduplicate_field': 'deduplicate.field',
+    'similar_document_ids': 'similar.document_ids',
+    'similar_fields': 'similar.fields',
+}
+
+# The service rejects queries whose offset plus count exceeds this window.
+MAX_RESULT_WINDOW = 10000
+
+# Aggregations whose buckets are summed per key, and how their keys sort.
+BUCKET_AGGREGATIONS = {'term': None, 'histogram': 'key', 'timeslice': 'key'}
+SCOPE_AGGREGATIONS = ('nested', 'filter')
+
+
+def _query_arguments(args, kwargs):
+    """
+    Name the positional arguments of a query, and compile an `Aggregation`
+    built with :mod:`discovery_v1_aggregation` to its string.
+    """
+    arguments = dict(zip(QUERY_ARGUMENTS, args))
+    arguments.update(kwargs)
+    if arguments.get('aggregation') is not None:
+        arguments['aggregation'] = str(arguments['aggregation'])
+    return arguments
+
+
+def _score(result):
+    return (result.get('result_metadata') or {}).get('score') or 0
+
+
+def merge_by_score(shards):
+    """
+    Merge per-shard result lists, each already sorted by descending score,
+    into a single list sorted by descending score.
+
+    :param list[list[dict]] shards: The query results of each shard.
+    :return: A generator of results.
+    """
+    heap = []
+    for shard, results in enumerate(shards):
+        if results:
+            heap.append((-_score(results[0]), shard, 0))
+    heapq.heapify(heap)
+    while heap:
+        _, shard, position = heapq.heappop(heap)
+        yield shards[shard][position]
+        position += 1
+        if position < len(shards[shard]):
+            heapq.heappush(
+                heap, (-_score(shards[shard][position]), shard, position))
+
+
+def merge_aggregations(shards):
+    """
+    Combine the aggregations of the same query run against several shards.
+
+    Aggregations are matched by position. Buckets of `term`, `histogram` and
+    `timeslice` aggregations are summed per key, `nested` and `filter` scopes
+    are merged recursively, `max`, `min` and `sum` are combined exactly and
+    `average` is weighted by the matching results of each shard.
+    `unique_count` is reported as the sum over the shards, which is an upper
+    bound of the true value, and `top_hits` keeps the best scoring hits.
+
+    :param list[list[dict]] shards: The `aggregations` of each shard.
+    :rtype: list[dict]
+    """
+    shards = [s for s in shards if s]
+    if not shards:
+        return []
+    merged = []
+    for position in range(max(len(s) for s in shards)):
+        group = [s[position] for s in shards if position < len(s)]
+        merged.append(_merge_aggregation(group))
+    return merged
+
+
+def _merge_aggregation(group):
+    first = group[0]
+    kind = first.get('type')
+    if any(x.get('type') != kind for x in group):
+        raise ValueError('shards returned different aggregations')
+    merged = dict(first)
+    if 'matching_results' in first:
+        merged['matching_results'] = sum(
+            x.get('matching_results') or 0 for x in group)
+    if kind in BUCKET_AGGREGATIONS:
+        merged['results'] = _merge_buckets(group, BUCKET_AGGREGATIONS[kind])
+    elif kind in SCOPE_AGGREGATIONS:
+        merged['aggregations'] = merge_aggregations(
+            [x.get('aggregations') for x in group])
+    elif kind in ('max', 'min', 'sum', 'unique_count', 'average') and \
+            not _values(group):
+        # No shard matched a document with the field.
+        merged['value'] = None
+    elif kind == 'max':
+        merged['value'] = max(_values(group))
+    elif kind == 'min':
+        merged['value'] = min(_values(group))
+    elif kind in ('sum', 'unique_count'):
+        merged['value'] = sum(_values(group))
+    elif kind == 'average':
+        weights = [x.get('matching_results') or 1 for x in group
+                   if x.get('value') is not None]
+        merged['value'] = sum(
+            v * w for v, w in zip(_values(group), weights)) / float(sum(weights))
+    elif kind == 'top_hits':
+        hits = [(x.get('hits') or {}) for x in group]
+        best = list(merge_by_score([h.get('hits') or [] for h in hits]))
+        merged['hits'] = {
+            'matching_results': sum(h.get('matching_results') or 0
+                                    for h in hits),
+            'hits': best[:first.get('size') or len(best)]
+        }
+    return merged
+
+
+def _values(group):
+    return [x['value'] for x in group if x.get('value') is not None]
+
+
+def _merge_buckets(group, order):
+    buckets = {}
+    keys = []
+    for aggregation in group:
+        for bucket in aggregation.get('results') or []:
+            key = bucket.get('key')
+            if key not in buckets:
+                buckets[key] = []
+                keys.append(key)
+            buckets[key].append(bucket)
+    merged = []
+    for key in keys:
+        same = buckets[key]
+        bucket = dict(same[0])
+        bucket['matching_results'] = sum(
+            b.get('matching_results') or 0 for b in same)
+        if any(b.get('aggregations') for b in same):
+            bucket['aggregations'] = merge_aggregations(
+                [b.get('aggregations') for b in same])
+        merged.append(bucket)
+    if order == 'key':
+        merged.sort(key=lambda b: b.get('key'))
+    else:
+        merged.sort(key=lambda b: -b['matching_results'])
+        # Each shard returns its own top terms; keep as many as one shard did.
+        size = max(len(a.get('results') or []) for a in group)
+        merged = merged[:size]
+    return merged
+
+
+def _invalidating(name):
+    """Wrap a method that changes what queries against a collection return."""
+    method = getattr(DiscoveryV1, name)
+
+    def wrapper(self, environment_id, collection_id, *args, **kwargs):
+        try:
+            return method(self, environment_id, collection_id, *args,
+                          **kwargs)
+        finally:
+            if self.query_cache is not None:
+                self.query_cache.invalidate((environment_id, collection_id))
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class DiscoveryV1Adapter(DiscoveryV1):
+    query_cache = None
+
+    update_collection = _invalidating('update_collection')
+    delete_collection = _invalidating('delete_collection')
+    create_expansions = _invalidating('create_expansions')
+    delete_expansions = _invalidating('delete_expansions')
+    create_tokenization_dictionary = _invalidating(
+        'create_tokenization_dictionary')
+    delete_tokenization_dictionary = _invalidating(
+        'delete_tokenization_dictionary')
+    create_stopword_list = _invalidating('create_stopword_list')
+    delete_stopword_list = _invalidating('delete_stopword_list')
+    add_document = _invalidating('add_document')
+    update_document = _invalidating('update_document')
+    delete_document = _invalidating('delete_document')
+
+    def enable_query_cache(self,
+                           ttl=300,
+                           max_bytes=64 * 1024 * 1024,
+                           stale_ttl=0,
+                           hot_threshold=2):
+        """
+        Cache the results of `query` on the client.
+
+        Identical queries are answered from the cache until they expire or
+        until this client changes the collection, for example with
+        `add_document` or `update_collection`. Changes made by other clients
+        are only seen once the cached results expire.
+
+        :param float ttl: The number of seconds a result is fresh.
+        :param int max_bytes: The maximum total size of the cached results.
+        :param float stale_ttl: The number of seconds past `ttl` during which
+        a frequently used result is still returned while it is refreshed in
+        the background.
+        :param int hot_threshold: The number of hits from which a result is
+        refreshed in the background.
+        :return: The cache, which also keeps hit and miss counts.
+        :rtype: QueryCache
+        """
+        self.query_cache = QueryCache(ttl=ttl, max_bytes=max_bytes,
+                                      stale_ttl=stale_ttl,
+                                      hot_threshold=hot_threshold)
+        return self.query_cache
+
+    def disable_query_cache(self):
+        """Stop caching query results and drop the cache."""
+        self.query_cache = None
+
+    def query(self, environment_id, collection_id, *args, **kwargs):
+        arguments = _query_arguments(args, kwargs)
+        cache = self.query_cache
+        if cache is None:
+            return DiscoveryV1.query(self, environment_id, collection_id,
+                                     **arguments)
+        headers = arguments.pop('headers', None)
+        scope = (environment_id, collection_id)
+        key = cache.key(scope, arguments)
+        cached = cache.get(key)
+        if cached is None:
+            return self._fetch_query(cache, scope, key, arguments, headers)
+        result, response_headers, status_code, state = cached
+        if state == STALE and cache.claim_refresh(key):
+            refresh = threading.Thread(
+                target=self._refresh_query,
+                args=(cache, scope, key, arguments, headers))
+            refresh.daemon = True
+            refresh.start()
+        return DetailedResponse(result, response_headers, status_code)
+
+    query.__doc__ = DiscoveryV1.query.__doc__
+
+    def _fetch_query(self, cache, scope, key, arguments, headers):
+        generation = cache.generation(scope)
+        if headers is not None:
+            arguments = dict(arguments, headers=headers)
+        try:
+            response = DiscoveryV1.query(self, scope[0], scope[1],
+                                         **arguments)
+        except Exception:
+            cache.release(key)
+            raise
+        cache.put(key, scope, generation, response.get_result(),
+                  response.get_headers(), response.get_status_code())
+        return response
+
+    def _refresh_query(self, cache, scope, key, arguments, headers):
+        try:
+            self._fetch_query(cache, scope, key, arguments, headers)
+        except Exception:
+            pass
+
+    def query_stream(self,
+                     environment_id,
+                     collection_id,
+                     *args,
+                     **kwargs):
+        """
+        Query a collection and decode the results as the response arrives.
+
+        Takes the same arguments as `query`. Instead of parsing the whole
+        response, which with a large `count` and `passages` can reach tens of
+        megabytes, the response is read incrementally and each result is
+        decoded when it has been received. The query cache is not used.
+
+        :param bool as_models: Whether to yield `QueryResult` models instead of
+        `dict` objects. Defaults to `True`.
+        :return: An iterable of results whose `matching_results`,
+        `aggregations` and `passages` are filled in as they are parsed.
+        :rtype: QueryResultStream
+        """
+        if environment_id is None:
+            raise ValueError('environment_id must be provided')
+        if collection_id is None:
+            raise ValueError('collection_id must be provided')
+        as_models = kwargs.pop('as_models', True)
+        arguments = _query_arguments(args, kwargs)
+        unknown = set(arguments) - set(QUERY_ARGUMENTS) - set(['headers'])
+        if unknown:
+            raise TypeError('unexpected arguments: {0}'.format(
+                ', '.join(sorted(unknown))))
+
+        headers = {
+            'X-Watson-Logging-Opt-Out': arguments.pop('logging_opt_out', None),
+            'Accept': 'application/json'
+        }
+        if 'headers' in arguments:
+            headers.update(arguments.pop('headers'))
+        sdk_headers = get_sdk_headers('discovery', 'V1', 'query')
+        headers.update(sdk_headers)
+
+        params = {'version': self.version}
+
+        data = dict((QUERY_BODY_NAMES.get(k, k), v)
+                    for k, v in arguments.items())
+
+        url = '/v1/environments/{0}/collections/{1}/query'.format(
+            *self._encode_path_vars(environment_id, collection_id))
+        response = self.request(
+            method='POST',
+            url=url,
+            headers=headers,
+            params=params,
+            json=data,
+            stream=True)
+        return QueryResultStream(response.get_result(), as_models=as_models)
+
+    def iter_all_documents(self,
+                           environment_id,
+                           collection_id,
+                           filter=None,
+                           return_fields=None,
+                           partition_field='extracted_metadata.sha1',
+                           partition_alphabet='0123456789abcdef',
+                           partitions=None,
+                           page_size=1000,
+                           concurrency=8):
+        """
+        Iterate over every document of a collection that matches a filter.
+
+        Result sets that fit within the service's result window of 10000
+        are read with `offset` paging. Larger ones are partitioned on a
+        sortable field: by default on the prefix of `extracted_metadata.sha1`,
+        with prefixes lengthened until each partition fits in the window.
+        Alternatively, explicit partition filters such as date ranges can be
+        given. The pages of all partitions are fetched concurrently and
+        documents are yielded as their page arrives, so the order is not
+        defined. At most `2 * concurrency` pages are held at a time.
+
+        :param str environment_id: The ID of the environment.
+        :param str collection_id: The ID of the collection.
+        :param str filter: (optional) A filter that the documents must match.
+        :param str return_fields: (optional) A comma-separated list of the
+        portion of the document hierarchy to return.
+        :param str partition_field: The field to sort pages on and, unless
+        `partitions` is given, whose values are partitioned by prefix.
+        :param str partition_alphabet: The characters the values of
+        `partition_field` are made of.
+        :param list[str] partitions: (optional) Filters that split the
+        documents into disjoint partitions, each of which must fit in the
+        result window, for example
+        `['publication_date<2019-01-01', 'publication_date>=2019-01-01']`.
+        :param int page_size: The number of documents to request per query.
+        :param int concurrency: The maximum number of concurrent queries.
+        :return: A generator of result `dict` objects.
+        """
+        if environment_id is None:
+            raise ValueError('environment_id must be provided')
+        if collection_id is None:
+            raise ValueError('collection_id must be provided')
+        return self._iter_all_documents(
+            environment_id, collection_id, filter, return_fields,
+            partition_field, partition_alphabet, partitions,
+            min(page_size, MAX_RESULT_WINDOW), concurrency)
+
+    def _iter_all_documents(self, environment_id, collection_id, filter,
+                            return_fields, partition_field, partition_alphabet,
+                            partitions, page_size, concurrency):
+
+        def conjunction(partition):
+            return ','.join(x for x in (filter, partition) if x)
+
+        def count(partition):
+            return DiscoveryV1.query(
+                self, environment_id, collection_id,
+                filter=conjunction(partition) or None,
+                count=0).get_result().get('matching_results') or 0
+
+        def page(partition, offset, size):
+            return DiscoveryV1.query(
+                self, environment_id, collection_id,
+                filter=conjunction(partition) or None,
+                return_fields=return_fields,
+                sort=partition_field,
+                count=size,
+                offset=offset).get_result().get('results') or []
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        pending = set()
+        try:
+            if partitions is not None:
+                sizes = list(executor.map(count, partitions))
+                for partition, size in zip(partitions, sizes):
+                    if size > MAX_RESULT_WINDOW:
+                        raise ValueError(
+                            'partition {0} matches {1} documents, more than '
+                            'the result window of {2}'.format(
+                                partition, size, MAX_RESULT_WINDOW))
+                leaves = list(zip(partitions, sizes))
+            else:
+                leaves = self._partition_by_prefix(
+                    executor, count, partition_field, partition_alphabet)
+            # The last page of a partition stops at its size, which is
+            # within the result window.
+            tasks = ((partition, offset, min(page_size, size - offset))
+                     for partition, size in leaves
+                     for offset in range(0, size, page_size))
+
+            for task in tasks:
+                pending.add(executor.submit(page, *task))
+                if len(pending) < 2 * concurrency:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for document in future.result():
+                        yield document
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for document in future.result():
+                        yield document
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _partition_by_prefix(executor, count, field, alphabet):
+        """Split prefixes of `field` until each matches at most a window."""
+        leaves = []
+        level = [(None, count(None))]
+        depth = 0
+        while level:
+            split = []
+            for partition, size in level:
+                if size <= MAX_RESULT_WINDOW:
+                    if size:
+                        leaves.append((partition, size))
+                else:
+                    split.append(partition)
+            if not split:
+                break
+            depth += 1
+            if depth > 64:
+                raise ValueError('cannot partition {0} to fit the result '
+                                 'window'.format(field))
+            children = []
+            for partition in split:
+                prefix = partition[len(field) + 1:-1] if partition else ''
+                children.extend('{0}:{1}{2}*'.format(field, prefix, c)
+                                for c in alphabet)
+            level = list(zip(children, executor.map(count, children)))
+        return leaves
+
+    def scatter_query(self,
+                      collections,
+                      count=None,
+                      offset=None,
+                      max_workers=None,
+                      **kwargs):
+        """
+        Query several collections concurrently and merge the results.
+
+        Unlike `federated_query`, the collections may live in different
+        environments. Every collection is queried with `query` at the same
+        time, so the latency is bounded by the slowest collection. To return a
+        consistent page, each collection is asked for its top `offset + count`
+        results, which are merged by descending score before the page is cut.
+        Aggregations are combined with :func:`merge_aggregations`.
+
+        :param list collections: The `(environment_id, collection_id)` pairs
+        to query.
+        :param int count: Number of results to return. The default is `10`.
+        :param int offset: The number of merged results to skip.
+        :param int max_workers: The maximum number of concurrent queries. By
+        default every collection is queried at once.
+        :param kwargs: Any other argument of `query`, except `sort`, `bias`
+        and `collection_ids`.
+        :return: A `DetailedResponse` whose result has the shape of a
+        `QueryResponse`. Each result carries the `environment_id` and
+        `collection_id` it came from.
+        :rtype: DetailedResponse
+        """
+        if not collections:
+            raise ValueError('collections must be provided')
+        for unsupported in ('sort', 'bias', 'collection_ids'):
+            if kwargs.get(unsupported) is not None:
+                raise ValueError(
+                    '{0} is not supported when merging by score'.format(
+                        unsupported))
+        count = 10 if count is None else count
+        offset = offset or 0
+
+        def run(shard):
+            environment_id, collection_id = shard
+            result = self.query(environment_id, collection_id,
+                                count=offset + count, offset=0,
+                                **kwargs).get_result()
+            for item in result.get('results') or []:
+                item.setdefault('collection_id', collection_id)
+                item['environment_id'] = environment_id
+            return result
+
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers or len(collections))
+        try:
+            responses = list(executor.map(run, collections))
+        finally:
+            executor.shutdown(wait=True)
+
+        merged = merge_by_score([r.get('results') or [] for r in responses])
+        results = []
+        for position, result in enumerate(merged):
+            if position >= offset + count:
+                break
+            if position >= offset:
+                results.append(result)
+        return DetailedResponse({
+            'matching_results': sum(r.get('matching_results') or 0
+                                    for r in responses),
+            'results': results,
+            'aggregations': merge_aggregations(
+                [r.get('aggregations') for r in responses]),
+        }, None, 200)
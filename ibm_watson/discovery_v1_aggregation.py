@@ -0,0 +1,292 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Builder for Discovery V1 aggregation expressions, and a columnar decoder for
+their results.
+
+Aggregations are built by chaining, and compile to the string accepted by the
+**aggregation** parameter of `DiscoveryV1.query`::
+
+    entities = term('enriched_text.entities.text', count=10)
+    daily = entities.timeslice('publication_date', '1day')
+    str(daily)
+    # 'term(enriched_text.entities.text,count:10).timeslice(publication_date,1day)'
+"""
+
+from __future__ import absolute_import
+
+from array import array
+
+__all__ = ['Aggregation', 'AggregationLevel', 'BUCKET_TYPES', 'term',
+           'histogram', 'timeslice', 'nested', 'filter_', 'top_hits', 'max_',
+           'min_', 'sum_', 'average', 'unique_count', 'compile_aggregations',
+           'decode_aggregations']
+
+BUCKET_TYPES = ('term', 'histogram', 'timeslice')
+
+
+class Aggregation(object):
+    """
+    An immutable chain of aggregations.
+
+    Every chaining method returns a new chain with one more nested
+    aggregation, so chains can be shared and extended freely. The compiled
+    string is computed once per chain.
+    """
+
+    __slots__ = ('_steps', '_compiled')
+
+    def __init__(self, steps):
+        self._steps = tuple(steps)
+        self._compiled = None
+
+    def _then(self, kind, *args, **options):
+        arguments = [str(a) for a in args if a is not None]
+        arguments.extend('{0}:{1}'.format(k, _option(v))
+                         for k, v in sorted(options.items()) if v is not None)
+        return Aggregation(self._steps + ((kind, tuple(arguments)),))
+
+    def compile(self):
+        """Return the aggregation string."""
+        if self._compiled is None:
+            self._compiled = '.'.join(
+                '{0}({1})'.format(kind, ','.join(arguments))
+                for kind, arguments in self._steps)
+        return self._compiled
+
+    def __str__(self):
+        return self.compile()
+
+    def __repr__(self):
+        return '<Aggregation {0}>'.format(self.compile())
+
+    def __eq__(self, other):
+        return isinstance(other, Aggregation) and self._steps == other._steps
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._steps)
+
+    def term(self, field, count=None):
+        return self._then('term', field, count=count)
+
+    def histogram(self, field, interval):
+        return self._then('histogram', field, interval)
+
+    def timeslice(self, field, interval, anomaly=None):
+        return self._then('timeslice', field, interval, anomaly=anomaly)
+
+    def nested(self, path):
+        return self._then('nested', path)
+
+    def filter(self, query):
+        return self._then('filter', query)
+
+    def top_hits(self, size):
+        return self._then('top_hits', size)
+
+    def max(self, field):
+        return self._then('max', field)
+
+    def min(self, field):
+        return self._then('min', field)
+
+    def sum(self, field):
+        return self._then('sum', field)
+
+    def average(self, field):
+        return self._then('average', field)
+
+    def unique_count(self, field):
+        return self._then('unique_count', field)
+
+
+def _option(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+
+_ROOT = Aggregation(())
+
+
+def term(field, count=None):
+    """Start a chain with a `term` aggregation."""
+    return _ROOT.term(field, count=count)
+
+
+def histogram(field, interval):
+    """Start a chain with a `histogram` aggregation."""
+    return _ROOT.histogram(field, interval)
+
+
+def timeslice(field, interval, anomaly=None):
+    """Start a chain with a `timeslice` aggregation."""
+    return _ROOT.timeslice(field, interval, anomaly=anomaly)
+
+
+def nested(path):
+    """Start a chain with a `nested` aggregation."""
+    return _ROOT.nested(path)
+
+
+def filter_(query):
+    """Start a chain with a `filter` aggregation."""
+    return _ROOT.filter(query)
+
+
+def top_hits(size):
+    """Start a chain with a `top_hits` aggregation."""
+    return _ROOT.top_hits(size)
+
+
+def max_(field):
+    """Start a chain with a `max` aggregation."""
+    return _ROOT.max(field)
+
+
+def min_(field):
+    """Start a chain with a `min` aggregation."""
+    return _ROOT.min(field)
+
+
+def sum_(field):
+    """Start a chain with a `sum` aggregation."""
+    return _ROOT.sum(field)
+
+
+def average(field):
+    """Start a chain with an `average` aggregation."""
+    return _ROOT.average(field)
+
+
+def unique_count(field):
+    """Start a chain with a `unique_count` aggregation."""
+    return _ROOT.unique_count(field)
+
+
+def compile_aggregations(*aggregations):
+    """Combine several chains into one aggregation string."""
+    return ','.join(str(a) for a in aggregations)
+
+
+class AggregationLevel(object):
+    """
+    The rows produced by one aggregation of a chain, stored by column.
+
+    :attr str path: The position of the aggregation in the tree, such as
+    `0.1` for the second aggregation nested in the first top-level one.
+    :attr str type: The type of the aggregation.
+    :attr list keys: The bucket keys. Scope aggregations have one row per
+    parent row, keyed by their path or match. Timeslice keys are in
+    milliseconds; their `key_as_string` values are in `labels`.
+    :attr array counts: The matching results of each row.
+    :attr array parents: The row of the enclosing level that each row belongs
+    to, or -1 at the top level.
+    :attr array values: The values of a calculation aggregation, with NaN for
+    a missing value.
+    :attr list labels: The `key_as_string` of each timeslice bucket.
+    """
+
+    def __init__(self, path, aggregation_type):
+        self.path = path
+        self.type = aggregation_type
+        self.keys = []
+        self.labels = []
+        self.counts = array('l')
+        self.parents = array('l')
+        self.values = array('d')
+
+    def __len__(self):
+        return len(self.parents)
+
+    def offsets(self, parent_rows):
+        """
+        Return the start of the rows of each parent row, followed by the
+        total number of rows, so that the rows of parent `i` are
+        `offsets[i]:offsets[i + 1]`.
+
+        :param int parent_rows: The number of rows of the enclosing level.
+        """
+        offsets = array('l', [0]) * (parent_rows + 1)
+        for parent in self.parents:
+            offsets[parent + 1] += 1
+        for i in range(parent_rows):
+            offsets[i + 1] += offsets[i]
+        return offsets
+
+    def __repr__(self):
+        return '<AggregationLevel {0} {1} rows={2}>'.format(
+            self.path, self.type, len(self))
+
+
+def decode_aggregations(aggregations):
+    """
+    Flatten the `aggregations` of a query response into columnar levels.
+
+    The raw JSON of the response is walked once, without building
+    `QueryAggregation` models. Each aggregation in the tree becomes one
+    :class:`AggregationLevel`, whose rows point at the row of the enclosing
+    level they were nested in.
+
+    :param list[dict] aggregations: The `aggregations` of a query result.
+    :return: The levels, keyed by path.
+    :rtype: dict
+    """
+    levels = {}
+    stack = [(str(i), a, -1) for i, a in enumerate(aggregations or [])]
+    stack.reverse()
+    while stack:
+        path, aggregation, parent = stack.pop()
+        kind = aggregation.get('type')
+        level = levels.get(path)
+        if level is None:
+            level = levels[path] = AggregationLevel(path, kind)
+        children = []
+        if kind in BUCKET_TYPES:
+            for bucket in aggregation.get('results') or []:
+                row = len(level.parents)
+                level.keys.append(bucket.get('key'))
+                level.labels.append(bucket.get('key_as_string'))
+                level.counts.append(bucket.get('matching_results') or 0)
+                level.parents.append(parent)
+                level.values.append(float('nan'))
+                children.extend((row, x) for x in
+                                bucket.get('aggregations') or [])
+        else:
+            row = len(level.parents)
+            value = aggregation.get('value')
+            level.keys.append(aggregation.get('match') or
+                              aggregation.get('path') or
+                              aggregation.get('field'))
+            level.labels.append(None)
+            level.counts.append(aggregation.get('matching_results') or 0)
+            level.parents.append(parent)
+            level.values.append(float('nan') if value is None else value)
+            children.extend((row, x) for x in
+                            aggregation.get('aggregations') or [])
+        positions = {}
+        pushed = []
+        for row, child in children:
+            # Sibling buckets share the child levels of the same position.
+            position = positions.get(row, 0)
+            positions[row] = position + 1
+            pushed.append(('{0}.{1}'.format(path, position), child, row))
+        pushed.reverse()
+        stack.extend(pushed)
+    return levels
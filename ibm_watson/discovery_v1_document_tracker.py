@@ -0,0 +1,275 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tracking of the ingestion status of many Discovery V1 documents.
+"""
+
+from __future__ import absolute_import
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import as_completed as _as_completed
+from ibm_cloud_sdk_core import ApiException
+
+# The statuses after which a document no longer changes.
+FINAL_STATUSES = ('available', 'available with notices', 'failed')
+
+
+def _transient(error):
+    return isinstance(error, ApiException) and \
+        (error.code == 429 or error.code >= 500)
+
+
+class _Tracked(object):
+    __slots__ = ('document_id', 'future', 'interval', 'polls', 'skips')
+
+    def __init__(self, document_id, interval):
+        self.document_id = document_id
+        self.future = Future()
+        self.interval = interval
+        self.polls = 0
+        self.skips = 0
+
+
+class DocumentStatusTracker(object):
+    """
+    Waits for documents added to a Discovery collection to finish processing.
+
+    Every tracked document gets a future, resolved with its
+    `get_document_status` result once its status is final: `available`,
+    `available with notices` or `failed`. A background thread polls the
+    documents that are due, at most `max_workers` at a time. The interval of
+    each document grows by `backoff` after every poll that finds it still
+    processing, up to `max_interval`.
+
+    Before polling, the tracker reads the `document_counts` of the
+    collection. When no document has finished since the previous round, the
+    documents that have been polled before are not polled again but backed
+    off, so a collection that is still busy costs one call per round rather
+    than one per document. As the counts also stay the same when a document
+    finishes while another is deleted, a document is skipped at most
+    `max_skips` rounds in a row.
+
+    :param DiscoveryV1 discovery: The client used to reach the service.
+    :param str environment_id: The ID of the environment.
+    :param str collection_id: The ID of the collection.
+    :param int max_workers: The maximum number of concurrent status requests.
+    :param float initial_interval: The number of seconds before a document is
+    first polled, and between its first polls.
+    :param float max_interval: The maximum number of seconds between two polls
+    of a document.
+    :param float backoff: The factor applied to the interval of a document
+    after every poll.
+    :param int max_skips: The number of consecutive rounds a document that
+    was polled before can be skipped because the counts did not change.
+    """
+
+    def __init__(self,
+                 discovery,
+                 environment_id,
+                 collection_id,
+                 max_workers=8,
+                 initial_interval=1.0,
+                 max_interval=60.0,
+                 backoff=2.0,
+                 max_skips=3):
+        if discovery is None:
+            raise ValueError('discovery must be provided')
+        if environment_id is None:
+            raise ValueError('environment_id must be provided')
+        if collection_id is None:
+            raise ValueError('collection_id must be provided')
+        self.discovery = discovery
+        self.environment_id = environment_id
+        self.collection_id = collection_id
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_skips = max_skips
+        self.status_requests = 0
+        self.collection_requests = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = {}
+        self._schedule = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self._finished = None
+
+    def track(self, document_ids):
+        """
+        Start tracking documents.
+
+        :param list[str] document_ids: The IDs returned by `add_document` or
+        `update_document`. Documents already tracked are not tracked twice.
+        :return: The future of every given document, keyed by ID.
+        :rtype: dict
+        """
+        futures = {}
+        with self._condition:
+            if self._closed:
+                raise ValueError('the tracker is closed')
+            due = time.time() + self.initial_interval
+            for document_id in document_ids:
+                if document_id not in self._futures:
+                    tracked = _Tracked(document_id, self.initial_interval)
+                    self._futures[document_id] = tracked.future
+                    self._push(due, tracked)
+                futures[document_id] = self._futures[document_id]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+        return futures
+
+    def as_completed(self, timeout=None):
+        """
+        Yield the final status of every tracked document as it is reached.
+
+        :param float timeout: (optional) The maximum number of seconds to wait.
+        :return: A generator of `get_document_status` results. The error of a
+        document that could not be tracked is raised when it is reached.
+        """
+        with self._condition:
+            futures = list(self._futures.values())
+        for future in _as_completed(futures, timeout=timeout):
+            yield future.result()
+
+    def close(self):
+        """Stop polling and cancel the futures of unfinished documents."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self._executor.shutdown(wait=True)
+        for future in self._futures.values():
+            future.cancel()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _push(self, due, tracked):
+        heapq.heappush(self._schedule, (due, next(self._sequence), tracked))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                due = self._next_due()
+                if due is None:
+                    return
+            progressed, idle = self._collection_progress()
+            with self._condition:
+                if idle:
+                    # Nothing is processing, so every document has an answer.
+                    due.extend(entry[2] for entry in self._schedule
+                               if not entry[2].future.done())
+                    del self._schedule[:]
+                elif not progressed:
+                    due = self._skip(due)
+            for tracked, status, error in self._executor.map(self._poll, due):
+                self._settle(tracked, status, error)
+
+    def _skip(self, due):
+        """
+        Back off the due documents that were polled before, unless they were
+        skipped `max_skips` rounds in a row, and return the others. Mostly,
+        only the documents never polled can have finished.
+        """
+        polled = []
+        for tracked in due:
+            if tracked.polls and tracked.skips < self.max_skips:
+                tracked.skips += 1
+                self._reschedule(tracked)
+            else:
+                polled.append(tracked)
+        return polled
+
+    def _next_due(self):
+        """Wait for the next documents to poll, or `None` once closed."""
+        while not self._closed:
+            if not self._schedule:
+                self._condition.wait()
+                continue
+            delay = self._schedule[0][0] - time.time()
+            if delay > 0:
+                self._condition.wait(delay)
+                continue
+            now = time.time()
+            due = []
+            while self._schedule and self._schedule[0][0] <= now:
+                tracked = heapq.heappop(self._schedule)[2]
+                if not tracked.future.done():
+                    due.append(tracked)
+            if due:
+                return due
+        return None
+
+    def _collection_progress(self):
+        """
+        Return whether any document of the collection may have finished since
+        the previous round, and whether none is processing any more.
+        """
+        self.collection_requests += 1
+        try:
+            counts = self.discovery.get_collection(
+                self.environment_id,
+                self.collection_id).get_result().get('document_counts') or {}
+        except Exception:
+            return True, False
+        finished = (counts.get('available') or 0) + (counts.get('failed') or 0)
+        busy = (counts.get('processing') or 0) + (counts.get('pending') or 0)
+        progressed = finished != self._finished
+        self._finished = finished
+        return progressed, busy == 0
+
+    def _poll(self, tracked):
+        try:
+            status = self.discovery.get_document_status(
+                self.environment_id, self.collection_id,
+                tracked.document_id).get_result()
+        except Exception as error:
+            return tracked, None, error
+        return tracked, status, None
+
+    def _settle(self, tracked, status, error):
+        self.status_requests += 1
+        tracked.polls += 1
+        tracked.skips = 0
+        if tracked.future.done():
+            # Cancelled by the caller.
+            return
+        if error is not None and not _transient(error):
+            tracked.future.set_exception(error)
+        elif status is not None and status.get('status') in FINAL_STATUSES:
+            tracked.future.set_result(status)
+        else:
+            with self._condition:
+                self._reschedule(tracked)
+
+    def _reschedule(self, tracked):
+        tracked.interval = min(tracked.interval * self.backoff,
+                               self.max_interval)
+        self._push(time.time() + tracked.interval, tracked)
@@ -0,0 +1,254 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Incremental collection of Discovery V1 usage metrics.
+"""
+
+from __future__ import absolute_import
+
+import threading
+import time
+from array import array
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# The time series metrics, by the name of the `DiscoveryV1` method that
+# returns them.
+METRICS = ('get_metrics_query', 'get_metrics_query_event',
+           'get_metrics_query_no_results', 'get_metrics_event_rate')
+
+
+def _format_time(milliseconds):
+    return datetime.utcfromtimestamp(milliseconds / 1000.0).strftime(
+        '%Y-%m-%dT%H:%M:%SZ')
+
+
+class MetricSeries(object):
+    """
+    A time series of metric buckets, kept in a fixed-size ring buffer.
+
+    Keys are the epoch milliseconds of each bucket, as returned in the `key`
+    of a `MetricAggregationResult`. Once `capacity` buckets are stored, adding
+    a newer bucket drops the oldest one.
+
+    :param int capacity: The maximum number of buckets.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+        self.capacity = capacity
+        self._keys = array('d', [0.0]) * capacity
+        self._counts = array('l', [0]) * capacity
+        self._rates = array('d', [0.0]) * capacity
+        self._start = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def last_key(self):
+        """The key of the newest bucket, or `None` when empty."""
+        if not self._length:
+            return None
+        return int(self._keys[self._slot(self._length - 1)])
+
+    def _slot(self, index):
+        return (self._start + index) % self.capacity
+
+    def add(self, key, matching_results=None, event_rate=None):
+        """
+        Store a bucket, replacing the bucket with the same key if any.
+
+        Buckets are expected in increasing key order. A bucket older than the
+        newest one only updates the stored bucket with the same key.
+        """
+        index = self._length
+        while index > 0 and self._keys[self._slot(index - 1)] > key:
+            index -= 1
+        if index > 0 and self._keys[self._slot(index - 1)] == key:
+            slot = self._slot(index - 1)
+        elif index < self._length:
+            return
+        elif self._length == self.capacity:
+            slot = self._start
+            self._start = self._slot(1)
+        else:
+            slot = self._slot(self._length)
+            self._length += 1
+        self._keys[slot] = key
+        self._counts[slot] = matching_results or 0
+        self._rates[slot] = event_rate or 0.0
+
+    def _ordered(self, column):
+        end = self._start + self._length
+        if end <= self.capacity:
+            return column[self._start:end]
+        return column[self._start:] + column[:end - self.capacity]
+
+    def keys(self):
+        """Return the bucket keys, oldest first, as an `array`."""
+        return self._ordered(self._keys)
+
+    def counts(self):
+        """Return the `matching_results` of every bucket, oldest first."""
+        return self._ordered(self._counts)
+
+    def rates(self):
+        """Return the `event_rate` of every bucket, oldest first."""
+        return self._ordered(self._rates)
+
+    def copy(self):
+        """Return an independent copy of the series."""
+        other = MetricSeries(self.capacity)
+        other._keys = array('d', self._keys)
+        other._counts = array('l', self._counts)
+        other._rates = array('d', self._rates)
+        other._start = self._start
+        other._length = self._length
+        return other
+
+
+class MetricsCollector(object):
+    """
+    Keeps a local copy of the Discovery metrics of a service instance.
+
+    Every :meth:`refresh` calls the metrics methods concurrently. A time
+    series that already holds buckets is only requested from the start of its
+    newest bucket, which may have been partial, so each refresh transfers the
+    last few buckets instead of the whole history. Reading a series is then a
+    local copy.
+
+    :param DiscoveryV1 discovery: The client used to reach the service.
+    :param int capacity: The number of buckets kept per series.
+    :param float history: The number of seconds of history requested for an
+    empty series. Queries and events are stored by the service for 30 days.
+    :param str result_type: (optional) The type of result to consider, passed
+    to every time series method.
+    :param int token_count: The number of query tokens to request from
+    `get_metrics_query_token_event`, or `None` to skip it.
+    :param float max_age: Skip refreshes requested within this many seconds of
+    the previous one.
+    :param clock: (optional) A function returning the current time in seconds.
+    """
+
+    def __init__(self,
+                 discovery,
+                 capacity=24 * 60,
+                 history=30 * 24 * 60 * 60,
+                 result_type=None,
+                 token_count=10,
+                 max_age=0,
+                 clock=time.time):
+        if discovery is None:
+            raise ValueError('discovery must be provided')
+        self.discovery = discovery
+        self.capacity = capacity
+        self.history = history
+        self.result_type = result_type
+        self.token_count = token_count
+        self.max_age = max_age
+        self.clock = clock
+        self.tokens = []
+        self.refreshed = None
+        self._series = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def series(self, metric, event_type=None):
+        """
+        Return a copy of a stored time series.
+
+        :param str metric: The name of the method returning the metric, such
+        as `get_metrics_query`.
+        :param str event_type: (optional) The event type of the series, for
+        metrics reported per event type such as `get_metrics_event_rate`.
+        :rtype: MetricSeries
+        """
+        if metric not in METRICS:
+            raise ValueError('metric must be one of {0}'.format(
+                ', '.join(METRICS)))
+        with self._lock:
+            series = self._series.get((metric, event_type))
+            if series is None:
+                return MetricSeries(self.capacity)
+            return series.copy()
+
+    def refresh(self, force=False):
+        """
+        Fetch the buckets missing from every series, and the query tokens.
+
+        :param bool force: Refresh even if the previous refresh is more recent
+        than `max_age`.
+        :return: Whether the metrics were fetched.
+        :rtype: bool
+        """
+        with self._refresh_lock:
+            now = self.clock()
+            if not force and self.refreshed is not None \
+                    and now - self.refreshed < self.max_age:
+                return False
+            end = _format_time(now * 1000)
+            requests = []
+            for metric in METRICS:
+                with self._lock:
+                    starts = [s.last_key for (m, _), s in self._series.items()
+                              if m == metric and len(s)]
+                start = min(starts) if starts else \
+                    (now - self.history) * 1000
+                requests.append((metric, {
+                    'start_time': _format_time(start),
+                    'end_time': end,
+                    'result_type': self.result_type
+                }))
+            if self.token_count is not None:
+                requests.append(('get_metrics_query_token_event',
+                                 {'count': self.token_count}))
+
+            def fetch(request):
+                metric, arguments = request
+                return getattr(self.discovery,
+                               metric)(**arguments).get_result()
+
+            executor = ThreadPoolExecutor(max_workers=len(requests))
+            try:
+                results = list(executor.map(fetch, requests))
+            finally:
+                executor.shutdown(wait=True)
+
+            with self._lock:
+                for (metric, _), result in zip(requests, results):
+                    aggregations = result.get('aggregations') or []
+                    if metric == 'get_metrics_query_token_event':
+                        self.tokens = []
+                        if aggregations:
+                            self.tokens = aggregations[0].get('results') or []
+                        continue
+                    for aggregation in aggregations:
+                        self._add(metric, aggregation)
+            self.refreshed = now
+            return True
+
+    def _add(self, metric, aggregation):
+        key = (metric, aggregation.get('event_type'))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = MetricSeries(self.capacity)
+        for bucket in aggregation.get('results') or []:
+            if bucket.get('key') is not None:
+                series.add(bucket['key'], bucket.get('matching_results'),
+                           bucket.get('event_rate'))
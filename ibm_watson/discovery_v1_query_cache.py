@@ -0,0 +1,212 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Client-side cache of Discovery V1 query results.
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+FRESH = 'fresh'
+STALE = 'stale'
+
+
+class _Entry(object):
+    __slots__ = ('body', 'headers', 'status_code', 'scope', 'stored', 'hits')
+
+    def __init__(self, body, headers, status_code, scope, stored):
+        self.body = body
+        self.headers = headers
+        self.status_code = status_code
+        self.scope = scope
+        self.stored = stored
+        self.hits = 0
+
+
+class QueryCache(object):
+    """
+    A thread-safe TTL and LRU cache of query results, bounded in bytes.
+
+    Results are stored as their serialized JSON, which is what the size bound
+    is measured against, and every hit returns a fresh copy. Entries are
+    grouped by scope, an `(environment_id, collection_id)` pair, so that all
+    entries of a collection can be invalidated when it changes.
+
+    An entry is fresh for `ttl` seconds. For a further `stale_ttl` seconds
+    it may still be served while it is refreshed in the background, provided
+    it has been hit at least `hot_threshold` times; otherwise it is fetched
+    again.
+
+    :param float ttl: The number of seconds an entry is fresh.
+    :param int max_bytes: The maximum total size of the cached results.
+    :param float stale_ttl: The number of seconds past `ttl` during which a
+    hot entry is served stale.
+    :param int hot_threshold: The number of hits from which an entry is hot.
+    :param clock: (optional) A function returning the current time in seconds.
+    """
+
+    def __init__(self,
+                 ttl=300,
+                 max_bytes=64 * 1024 * 1024,
+                 stale_ttl=0,
+                 hot_threshold=2,
+                 clock=time.time):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self.hot_threshold = hot_threshold
+        self.clock = clock
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._scopes = {}
+        self._generations = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(scope, arguments):
+        """
+        Compute the canonical key of a query.
+
+        :param tuple scope: The `(environment_id, collection_id)` pair.
+        :param dict arguments: The query arguments. `None` values are ignored,
+        so that omitted and defaulted arguments share a key.
+        :rtype: str
+        """
+        canonical = json.dumps(
+            [list(scope),
+             dict((k, v) for k, v in arguments.items() if v is not None)],
+            sort_keys=True,
+            separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def generation(self, scope):
+        """Return a token that changes whenever `scope` is invalidated."""
+        with self._lock:
+            return self._generations.get(scope, 0)
+
+    def get(self, key):
+        """
+        Look up a query.
+
+        :return: A `(result, headers, status_code, state)` tuple, where state is
+        `fresh` or `stale`, or `None` on a miss. A `stale` result should be
+        served while :meth:`claim_refresh` decides who refreshes it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            age = self.clock() - entry.stored
+            if age <= self.ttl:
+                state = FRESH
+            elif age <= self.ttl + self.stale_ttl \
+                    and entry.hits >= self.hot_threshold:
+                state = STALE
+            else:
+                self._remove(key)
+                self.misses += 1
+                return None
+            entry.hits += 1
+            self.hits += 1
+            self._touch(key)
+            body = entry.body
+            headers = entry.headers
+            status_code = entry.status_code
+        return json.loads(body), headers, status_code, state
+
+    def claim_refresh(self, key):
+        """Return `True` for the one caller that should refresh a stale key."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def put(self, key, scope, generation, result, headers=None,
+            status_code=200):
+        """
+        Store a query result.
+
+        The result is dropped if `scope` was invalidated after `generation`
+        was read, so that a query racing with an update cannot cache stale
+        data.
+        """
+        body = json.dumps(result, separators=(',', ':'))
+        with self._lock:
+            self._refreshing.discard(key)
+            if self._generations.get(scope, 0) != generation:
+                return
+            if len(body) > self.max_bytes:
+                return
+            hits = 0
+            if key in self._entries:
+                hits = self._entries[key].hits
+                self._remove(key)
+            entry = _Entry(body, dict(headers or {}), status_code, scope,
+                           self.clock())
+            entry.hits = hits
+            self._entries[key] = entry
+            self._scopes.setdefault(scope, set()).add(key)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def release(self, key):
+        """Give up a refresh claimed with :meth:`claim_refresh`."""
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def invalidate(self, scope):
+        """Drop every entry of `scope`."""
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+            for key in list(self._scopes.get(scope, ())):
+                self._remove(key)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            for scope in list(self._scopes):
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+            self._entries.clear()
+            self._scopes.clear()
+            self.size = 0
+
+    def _touch(self, key):
+        self._entries[key] = self._entries.pop(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.size -= len(entry.body)
+        keys = self._scopes.get(entry.scope)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._scopes[entry.scope]
@@ -0,0 +1,196 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Incremental parsing of large Discovery V1 query responses.
+"""
+
+from __future__ import absolute_import
+
+import codecs
+import json
+import re
+from .discovery_v1 import QueryResult
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+
+# Drop the consumed part of the buffer once it grows past this many characters.
+_COMPACT_AT = 1 << 16
+
+
+class _Scanner(object):
+    """A cursor over text that arrives in chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = u''
+        self.pos = 0
+        self.exhausted = False
+
+    def _read(self):
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk)
+            if self.pos > _COMPACT_AT:
+                self.buffer = self.buffer[self.pos:]
+                self.pos = 0
+            self.buffer += chunk
+            return True
+        self.buffer += self._decoder.decode(b'', final=True)
+        self.exhausted = True
+        return False
+
+    def peek(self):
+        """Skip whitespace and return the next character, or `None` at the end."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read():
+                return None
+
+    def expect(self, characters):
+        character = self.peek()
+        if character is None or character not in characters:
+            raise ValueError('expected {0} at offset {1}, found {2!r}'.format(
+                ' or '.join(characters), self.pos, character))
+        self.pos += 1
+        return character
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self.exhausted:
+                    raise
+                # Read until the pending text has doubled, so that a large
+                # value split into many small chunks is not decoded over and
+                # over again.
+                target = 2 * max(len(self.buffer) - self.pos, 1)
+                while self._read() and len(self.buffer) - self.pos < target:
+                    pass
+                continue
+            # A number at the very end of the buffer may continue in the next
+            # chunk.
+            if end < len(self.buffer) or self.exhausted:
+                self.pos = end
+                return value
+            self._read()
+
+
+def iter_object(chunks, array_key, on_member=None):
+    """
+    Parse a JSON object incrementally and yield the items of one of its arrays.
+
+    Only the item being decoded is held in memory. The other members of the
+    object are decoded as a whole and passed to `on_member` as soon as they
+    are complete.
+
+    :param chunks: An iterable of `bytes` or `str` chunks of the document.
+    :param str array_key: The name of the array member whose items to yield.
+    :param on_member: (optional) A function called with the name and value of
+    every other member.
+    :return: A generator of the decoded items.
+    """
+    scanner = _Scanner(chunks)
+    scanner.expect('{')
+    if scanner.peek() == '}':
+        return
+    while True:
+        key = scanner.value()
+        scanner.expect(':')
+        if key == array_key and scanner.peek() == '[':
+            scanner.expect('[')
+            if scanner.peek() != ']':
+                while True:
+                    yield scanner.value()
+                    if scanner.expect(',]') == ']':
+                        break
+            else:
+                scanner.expect(']')
+        else:
+            value = scanner.value()
+            if on_member is not None:
+                on_member(key, value)
+        if scanner.expect(',}') == '}':
+            return
+
+
+class QueryResultStream(object):
+    """
+    The results of a query, decoded one at a time as the response arrives.
+
+    Iterating over the stream yields each result as soon as it has been
+    received, so that processing can start before the whole response has
+    arrived, and only one result is held in memory at a time. The other
+    members of the response, such as `matching_results` and `aggregations`,
+    are available from :attr:`metadata` once they have been parsed; all of
+    them have been once the iteration is complete. The service places them
+    either before or after the results.
+
+    :param response: The streamed `requests.Response` of the query.
+    :param bool as_models: Whether to yield `QueryResult` models instead of
+    `dict` objects.
+    :param int chunk_size: The number of bytes to read at a time.
+    """
+
+    def __init__(self, response, as_models=True, chunk_size=64 * 1024):
+        self.response = response
+        self.as_models = as_models
+        self.chunk_size = chunk_size
+        self.metadata = {}
+        self._consumed = False
+
+    @property
+    def matching_results(self):
+        return self.metadata.get('matching_results')
+
+    @property
+    def aggregations(self):
+        return self.metadata.get('aggregations')
+
+    @property
+    def passages(self):
+        return self.metadata.get('passages')
+
+    def __iter__(self):
+        if self._consumed:
+            raise ValueError('the query results have already been consumed')
+        self._consumed = True
+        try:
+            for result in iter_object(
+                    self.response.iter_content(self.chunk_size), 'results',
+                    self.metadata.__setitem__):
+                yield QueryResult._from_dict(result) if self.as_models \
+                    else result
+        finally:
+            self.close()
+
+    def close(self):
+        """Release the connection."""
+        self.response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
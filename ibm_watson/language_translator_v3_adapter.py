@@ -0,0 +1,322 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from ibm_cloud_sdk_core import DetailedResponse
+from .language_translator_v3 import LanguageTranslatorV3
+from .language_translator_v3_documents import DocumentPipeline
+from .language_translator_v3_identify import LanguageIdentifier
+from .language_translator_v3_memory import TranslationMemory, normalize
+
+# The maximum size of the body of a translate request.
+MAX_REQUEST_BYTES = 50 * 1024
+
+
+def _cost(text):
+    """The number of bytes `text` adds to the serialized `text` array."""
+    return len(json.dumps(text)) + 2
+
+
+class LanguageTranslatorV3Adapter(LanguageTranslatorV3):
+    translation_memory = None
+    language_identifier = None
+
+    def enable_translation_memory(self, path):
+        """
+        Keep the translations returned by `translate` in a persistent store.
+
+        Before each `translate` call, the normalized texts are looked up in
+        the store and only the missing ones are sent to the service. The
+        translations of a custom model are dropped when the model is created
+        or deleted through this client.
+
+        :param str path: The SQLite database file.
+        :return: The store, whose `hits` and `misses` can be inspected.
+        :rtype: TranslationMemory
+        """
+        self.translation_memory = TranslationMemory(path)
+        return self.translation_memory
+
+    def disable_translation_memory(self):
+        """Stop using the translation memory and close it."""
+        memory = self.translation_memory
+        self.translation_memory = None
+        if memory is not None:
+            memory.close()
+
+    def translate(self, text, model_id=None, source=None, target=None,
+                  **kwargs):
+        memory = self.translation_memory
+        if memory is None or text is None:
+            return LanguageTranslatorV3.translate(
+                self, text, model_id=model_id, source=source, target=target,
+                **kwargs)
+        texts = [text] if isinstance(text, (type(''), type(u''))) \
+            else list(text)
+        keys = [normalize(t) for t in texts]
+        known = memory.lookup(keys, model_id, source, target)
+        # The first text of each missing key is sent as the caller wrote it.
+        missing = OrderedDict()
+        for key, original in zip(keys, texts):
+            if key not in known:
+                missing.setdefault(key, original)
+        result = {'word_count': 0, 'character_count': 0}
+        headers = None
+        if missing:
+            response = LanguageTranslatorV3.translate(
+                self, list(missing.values()), model_id=model_id, source=source,
+                target=target, **kwargs)
+            headers = response.get_headers()
+            result = response.get_result()
+            translated = dict(
+                (k, t['translation'])
+                for k, t in zip(missing, result.get('translations') or []))
+            memory.store(translated, model_id, source, target)
+            known.update(translated)
+        result['translations'] = [{'translation': known[k]} for k in keys]
+        return DetailedResponse(result, headers, 200)
+
+    translate.__doc__ = LanguageTranslatorV3.translate.__doc__
+
+    def create_model(self, base_model_id, forced_glossary=None,
+                     parallel_corpus=None, name=None, **kwargs):
+        response = LanguageTranslatorV3.create_model(
+            self, base_model_id, forced_glossary=forced_glossary,
+            parallel_corpus=parallel_corpus, name=name, **kwargs)
+        model_id = (response.get_result() or {}).get('model_id')
+        if self.translation_memory is not None and model_id is not None:
+            self.translation_memory.invalidate(model_id)
+        return response
+
+    create_model.__doc__ = LanguageTranslatorV3.create_model.__doc__
+
+    def delete_model(self, model_id, **kwargs):
+        response = LanguageTranslatorV3.delete_model(self, model_id, **kwargs)
+        if self.translation_memory is not None:
+            self.translation_memory.invalidate(model_id)
+        return response
+
+    delete_model.__doc__ = LanguageTranslatorV3.delete_model.__doc__
+
+    def enable_identify_cache(self,
+                              cache_size=4096,
+                              local_confidence=0.99,
+                              min_samples=20,
+                              min_coverage=0.8,
+                              learn_confidence=0.9):
+        """
+        Answer `identify` from a cache and a locally learned profile.
+
+        Results are cached by normalized text. On a cache miss, a character
+        n-gram profile learned from earlier answers of the service answers
+        without a request when it is confident enough; see
+        :class:`LanguageIdentifier` for the thresholds. A response served
+        without a request has no headers.
+
+        :param int cache_size: The maximum number of cached results.
+        :param float local_confidence: The confidence from which a local
+        answer is used, or `None` to disable local answers.
+        :param int min_samples: The number of texts a language must have been
+        learned from before it is answered locally.
+        :param float min_coverage: The fraction of known n-grams a text needs
+        to be answered locally.
+        :param float learn_confidence: The confidence from which an answer of
+        the service is learned.
+        :return: The identifier, whose `hits`, `local`, `requests` and
+        `hit_rate` can be inspected.
+        :rtype: LanguageIdentifier
+        """
+        self.language_identifier = LanguageIdentifier(
+            self,
+            cache_size=cache_size,
+            local_confidence=local_confidence,
+            min_samples=min_samples,
+            min_coverage=min_coverage,
+            learn_confidence=learn_confidence)
+        return self.language_identifier
+
+    def disable_identify_cache(self):
+        """Send every `identify` call to the service again."""
+        self.language_identifier = None
+
+    def identify(self, text, **kwargs):
+        identifier = self.language_identifier
+        if identifier is None:
+            return LanguageTranslatorV3.identify(self, text, **kwargs)
+        return identifier.identify_response(text, **kwargs)
+
+    identify.__doc__ = LanguageTranslatorV3.identify.__doc__
+
+    def translate_documents(self,
+                            paths,
+                            target=None,
+                            concurrency=4,
+                            source=None,
+                            model_id=None,
+                            output_directory=None,
+                            max_pending=None,
+                            initial_interval=1.0,
+                            max_interval=30.0,
+                            backoff=1.5):
+        """
+        Translate many files, overlapping uploads, polls and downloads.
+
+        Each file is submitted with `translate_document`, polled with
+        `get_document_status` until it is available, streamed to disk and
+        deleted from the service. See :class:`DocumentPipeline`. The
+        translation of `name.txt` to `fr` is written to `name.fr.txt`.
+
+        :param paths: An iterable of the files to translate.
+        :param str target: (optional) The target language code.
+        :param int concurrency: The number of requests in flight.
+        :param str source: (optional) The source language code.
+        :param str model_id: (optional) The model to translate with.
+        :param str output_directory: (optional) The directory the translations
+        are written to. Defaults to the directory of each source file.
+        :param int max_pending: The number of documents at the service at a
+        time. Defaults to `4 * concurrency`.
+        :param float initial_interval: The number of seconds before the first
+        poll of a document.
+        :param float max_interval: The maximum number of seconds between
+        polls.
+        :param float backoff: The factor applied to the interval after each
+        poll.
+        :return: A generator of :class:`DocumentProgress`, yielded each time
+        the status of a document changes.
+        """
+        if paths is None:
+            raise ValueError('paths must be provided')
+        if model_id is None and target is None:
+            raise ValueError('model_id or target must be provided')
+        pipeline = DocumentPipeline(
+            self,
+            target=target,
+            source=source,
+            model_id=model_id,
+            output_directory=output_directory,
+            concurrency=concurrency,
+            max_pending=max_pending,
+            initial_interval=initial_interval,
+            max_interval=max_interval,
+            backoff=backoff)
+        return pipeline.run(paths)
+
+    def translate_stream(self,
+                         texts,
+                         model_id=None,
+                         source=None,
+                         target=None,
+                         concurrency=4,
+                         max_bytes=MAX_REQUEST_BYTES,
+                         window=10000,
+                         **kwargs):
+        """
+        Translate a stream of texts with as few requests as possible.
+
+        Texts are packed into `translate` requests whose serialized body
+        stays within `max_bytes`, and up to `concurrency` requests are sent at
+        a time. A text identical to one of the last `window` distinct texts
+        is not sent again but given the same translation. The texts are read
+        lazily, so the stream can be longer than what fits in memory.
+
+        :param texts: An iterable of the texts to translate.
+        :param str model_id: (optional) The model to translate with.
+        :param str source: (optional) The source language code.
+        :param str target: (optional) The target language code.
+        :param int concurrency: The maximum number of requests in flight.
+        :param int max_bytes: The maximum size of a request body. A text that
+        does not fit on its own is sent alone.
+        :param int window: The number of distinct texts remembered for
+        deduplication.
+        :param dict headers: A `dict` containing the request headers
+        :return: A generator of `(text, translation)` pairs in input order,
+        where translation is an item of the `translations` of the response.
+        """
+        if texts is None:
+            raise ValueError('texts must be provided')
+        if model_id is None and target is None:
+            raise ValueError('model_id or target must be provided')
+        return self._translate_stream(texts, model_id, source, target,
+                                      concurrency, max_bytes, window, kwargs)
+
+    def _translate_stream(self, texts, model_id, source, target, concurrency,
+                          max_bytes, window, kwargs):
+        overhead = len(json.dumps({'text': [], 'model_id': model_id,
+                                   'source': source, 'target': target}))
+
+        def send(batch):
+            return self.translate(batch, model_id=model_id, source=source,
+                                  target=target,
+                                  **kwargs).get_result()['translations']
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        # Each slot is the [future, index] of a text in a batch; the future
+        # is set when the batch is sent.
+        seen = OrderedDict()
+        order = deque()
+        in_flight = deque()
+        batch = []
+        slots = []
+        size = [overhead]
+
+        def flush():
+            future = executor.submit(send, list(batch))
+            for slot in slots:
+                slot[0] = future
+            in_flight.append(future)
+            del batch[:]
+            del slots[:]
+            size[0] = overhead
+
+        def ready():
+            while order and order[0][1][0] is not None and \
+                    order[0][1][0].done():
+                text, (future, index) = order.popleft()
+                yield text, future.result()[index]
+
+        try:
+            for text in texts:
+                slot = seen.get(text)
+                if slot is None:
+                    cost = _cost(text)
+                    if batch and size[0] + cost > max_bytes:
+                        flush()
+                    slot = [None, len(batch)]
+                    batch.append(text)
+                    slots.append(slot)
+                    size[0] += cost
+                    seen[text] = slot
+                    if len(seen) > window:
+                        seen.popitem(last=False)
+                else:
+                    seen[text] = seen.pop(text)
+                order.append((text, slot))
+                while in_flight and (in_flight[0].done() or
+                                     len(in_flight) > concurrency):
+                    in_flight.popleft().result()
+                for pair in ready():
+                    yield pair
+            if batch:
+                flush()
+            while order:
+                text, (future, index) = order.popleft()
+                yield text, future.result()[index]
+        finally:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=True)
@@ -0,0 +1,301 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Pipelined translation of many documents with Language Translator V3.
+"""
+
+from __future__ import absolute_import
+
+import heapq
+import itertools
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from ibm_cloud_sdk_core import ApiException
+from .common import get_sdk_headers, replace_file
+
+UPLOADING = 'uploading'
+DOWNLOADING = 'downloading'
+DONE = 'done'
+FAILED = 'failed'
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _transient(error):
+    return isinstance(error, ApiException) and \
+        (error.code == 429 or error.code >= 500)
+
+
+def output_path(path, target, output_directory=None):
+    """
+    Return where the translation of `path` is written: `name.txt` translated
+    to `fr` becomes `name.fr.txt`, in `output_directory` or next to the
+    source file.
+    """
+    directory, name = os.path.split(path)
+    stem, extension = os.path.splitext(name)
+    return os.path.join(output_directory or directory,
+                        '{0}.{1}{2}'.format(stem, target, extension))
+
+
+class DocumentProgress(object):
+    """
+    The progress of one document.
+
+    :attr str path: The source file.
+    :attr str output: The file the translation is written to.
+    :attr str document_id: The ID given by the service, once uploaded.
+    :attr str status: `uploading`, then the status reported by the service
+    (`processing`, `available`), then `downloading` and finally `done` or
+    `failed`.
+    :attr Exception error: The error that made the document fail, if any.
+    :attr int size: The number of bytes written to `output`.
+    """
+    __slots__ = ('path', 'output', 'document_id', 'status', 'error', 'size',
+                 'interval')
+
+    def __init__(self, path, output, interval):
+        self.path = path
+        self.output = output
+        self.document_id = None
+        self.status = UPLOADING
+        self.error = None
+        self.size = 0
+        self.interval = interval
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def __repr__(self):
+        return 'DocumentProgress({0!r}, status={1!r})'.format(
+            self.path, self.status)
+
+
+class DocumentPipeline(object):
+    """
+    Translates many files with overlapping uploads, polls and downloads.
+
+    Up to `max_pending` documents are at the service at a time, and the
+    `translate_document`, `get_document_status`, download and
+    `delete_document` requests share `concurrency` worker threads. Nothing
+    sleeps while a request can be made: the pipeline waits only for the next
+    request to complete or the next poll to be due. The interval between the
+    polls of a document grows by `backoff` while it is processing, up to
+    `max_interval`.
+
+    Translations are streamed to a temporary file next to their output and
+    moved into place once complete. Every document is deleted from the
+    service once downloaded or failed, and when the pipeline is closed early.
+
+    :param LanguageTranslatorV3 translator: The service client.
+    :param str target: (optional) The target language code.
+    :param str source: (optional) The source language code.
+    :param str model_id: (optional) The model to translate with.
+    :param str output_directory: (optional) The directory the translations
+    are written to. Defaults to the directory of each source file.
+    :param int concurrency: The number of requests in flight.
+    :param int max_pending: The number of documents at the service at a time.
+    Defaults to `4 * concurrency`.
+    :param float initial_interval: The number of seconds before the first
+    poll of a document.
+    :param float max_interval: The maximum number of seconds between polls.
+    :param float backoff: The factor applied to the interval after each poll.
+    """
+
+    def __init__(self,
+                 translator,
+                 target=None,
+                 source=None,
+                 model_id=None,
+                 output_directory=None,
+                 concurrency=4,
+                 max_pending=None,
+                 initial_interval=1.0,
+                 max_interval=30.0,
+                 backoff=1.5):
+        self.translator = translator
+        self.target = target
+        self.source = source
+        self.model_id = model_id
+        self.output_directory = output_directory
+        self.concurrency = concurrency
+        self.max_pending = max_pending or 4 * concurrency
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+    def run(self, paths):
+        """
+        Translate files.
+
+        :param paths: An iterable of the files to translate, read lazily.
+        :return: A generator of :class:`DocumentProgress`, yielded each time
+        the status of a document changes. The same object is yielded for
+        every change of a document.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        paths = iter(paths)
+        # Each running future maps to the `(function, document)` it runs.
+        running = {}
+        due = []
+        sequence = itertools.count()
+        at_service = set()
+        exhausted = False
+
+        def start(function, document):
+            running[executor.submit(function, document)] = (function, document)
+
+        def fail(document, error):
+            document.status = FAILED
+            document.error = error
+            cleanup(document)
+
+        def cleanup(document):
+            if document in at_service:
+                at_service.discard(document)
+                executor.submit(self._delete, document.document_id)
+
+        try:
+            while True:
+                uploading = sum(1 for function, _ in running.values()
+                                if function == self._upload)
+                while not exhausted and \
+                        len(at_service) + uploading < self.max_pending:
+                    path = next(paths, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    document = DocumentProgress(
+                        path,
+                        output_path(path, self.target or self.model_id,
+                                    self.output_directory),
+                        self.initial_interval)
+                    start(self._upload, document)
+                    uploading += 1
+                    yield document
+                now = time.time()
+                while due and due[0][0] <= now:
+                    start(self._poll, heapq.heappop(due)[2])
+                if not running and not due:
+                    return
+                timeout = max(due[0][0] - now, 0) if due else None
+                if not running:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(list(running), timeout=timeout,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    function, document = running.pop(future)
+                    previous = document.status
+                    error = future.exception()
+                    if function == self._upload:
+                        if error is not None:
+                            fail(document, error)
+                        else:
+                            result = future.result()
+                            document.document_id = result['document_id']
+                            document.status = result.get('status',
+                                                         'processing')
+                            at_service.add(document)
+                            self._schedule(due, sequence, document)
+                    elif function == self._poll:
+                        status = None if error else future.result()
+                        if _transient(error):
+                            self._schedule(due, sequence, document)
+                        elif error is not None:
+                            fail(document, error)
+                        elif status == 'failed':
+                            fail(document, ValueError(
+                                'translation of {0} failed'.format(
+                                    document.path)))
+                        elif status == 'available':
+                            document.status = DOWNLOADING
+                            start(self._download, document)
+                        else:
+                            document.status = status
+                            self._schedule(due, sequence, document)
+                    else:
+                        if error is not None:
+                            fail(document, error)
+                        else:
+                            document.status = DONE
+                            cleanup(document)
+                    if document.status != previous:
+                        yield document
+        finally:
+            for future, (function, document) in list(running.items()):
+                if function == self._upload and not future.cancel() and \
+                        future.exception() is None:
+                    document.document_id = future.result()['document_id']
+                    at_service.add(document)
+            for document in list(at_service):
+                cleanup(document)
+            executor.shutdown(wait=True)
+
+    def _schedule(self, due, sequence, document):
+        heapq.heappush(due, (time.time() + document.interval, next(sequence),
+                             document))
+        document.interval = min(document.interval * self.backoff,
+                                self.max_interval)
+
+    def _upload(self, document):
+        with open(document.path, 'rb') as source:
+            return self.translator.translate_document(
+                source,
+                filename=os.path.basename(document.path),
+                model_id=self.model_id,
+                source=self.source,
+                target=self.target).get_result()
+
+    def _poll(self, document):
+        return self.translator.get_document_status(
+            document.document_id).get_result().get('status')
+
+    def _download(self, document):
+        # `get_translated_document` reads the whole body; the same request
+        # is made here with a streamed response.
+        translator = self.translator
+        response = translator.request(
+            method='GET',
+            url='/v3/documents/{0}/translated_document'.format(
+                *translator._encode_path_vars(document.document_id)),
+            headers=get_sdk_headers('language_translator', 'V3',
+                                    'get_translated_document'),
+            params={'version': translator.version},
+            accept_json=False,
+            stream=True).get_result()
+        directory = os.path.dirname(document.output) or '.'
+        handle, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as out:
+                for chunk in response.iter_content(_CHUNK_SIZE):
+                    out.write(chunk)
+                    document.size += len(chunk)
+            replace_file(tmp_path, document.output)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        finally:
+            response.close()
+
+    def _delete(self, document_id):
+        try:
+            self.translator.delete_document(document_id)
+        except ApiException:
+            pass
@@ -0,0 +1,222 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Local fast path for Language Translator V3 language identification.
+"""
+
+from __future__ import absolute_import
+
+import copy
+import math
+import threading
+from collections import OrderedDict, defaultdict
+from ibm_cloud_sdk_core import DetailedResponse
+from .language_translator_v3 import LanguageTranslatorV3
+from .language_translator_v3_memory import normalize
+
+
+def ngrams(text, n=3):
+    """
+    Return the character n-grams of a normalized text, padded with a space at
+    both ends so that word boundaries are part of the profile.
+    """
+    padded = u' {0} '.format(text.lower())
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+class NgramProfile(object):
+    """
+    Character n-gram counts per language, scored as a naive Bayes classifier.
+
+    :param int n: The length of the n-grams.
+    """
+
+    def __init__(self, n=3):
+        self.n = n
+        self.samples = defaultdict(int)
+        self._counts = defaultdict(lambda: defaultdict(int))
+        self._totals = defaultdict(int)
+        self._vocabulary = set()
+
+    def learn(self, text, language):
+        """Add the n-grams of a text identified as `language`."""
+        counts = self._counts[language]
+        for gram in ngrams(text, self.n):
+            counts[gram] += 1
+            self._totals[language] += 1
+            self._vocabulary.add(gram)
+        self.samples[language] += 1
+
+    def classify(self, text):
+        """
+        Score a text against every learned language.
+
+        :return: A `(languages, coverage)` tuple, where languages is a list of
+        `{'language', 'confidence'}` dicts sorted by decreasing confidence and
+        coverage is the fraction of the n-grams of the text seen before.
+        """
+        grams = ngrams(text, self.n)
+        if not grams or not self._counts:
+            return [], 0.0
+        coverage = float(sum(1 for g in grams if g in self._vocabulary)) / \
+            len(grams)
+        size = len(self._vocabulary) + 1
+        scores = {}
+        for language, counts in self._counts.items():
+            total = self._totals[language] + size
+            scores[language] = sum(
+                math.log((counts.get(g, 0) + 1.0) / total) for g in grams)
+        top = max(scores.values())
+        weights = dict((language, math.exp(score - top))
+                       for language, score in scores.items())
+        norm = sum(weights.values())
+        languages = sorted(
+            ({'language': language, 'confidence': weight / norm}
+             for language, weight in weights.items()),
+            key=lambda item: -item['confidence'])
+        return languages, coverage
+
+
+class LanguageIdentifier(object):
+    """
+    Identify languages with as few `identify` requests as possible.
+
+    Results are kept in an LRU cache keyed by the normalized, lowercased
+    text. On a miss, a local n-gram profile built from earlier answers of the
+    service is tried first: its answer is used without a request when the
+    top language was learned from at least `min_samples` texts, at least
+    `min_coverage` of the n-grams of the text are known, and its confidence
+    reaches `local_confidence`. Only answers of the service whose top
+    confidence reaches `learn_confidence` are learned.
+
+    A local answer lists only the languages of the profile.
+
+    :param LanguageTranslatorV3 translator: The service client.
+    :param int cache_size: The maximum number of cached results.
+    :param float local_confidence: The confidence from which a local answer is
+    used, or `None` to always ask the service on a cache miss.
+    :param int min_samples: The number of texts a language must have been
+    learned from before it is answered locally.
+    :param float min_coverage: The fraction of known n-grams a text needs to
+    be answered locally.
+    :param float learn_confidence: The confidence from which an answer of the
+    service is learned.
+    :param int n: The length of the n-grams of the profile.
+    """
+
+    def __init__(self,
+                 translator,
+                 cache_size=4096,
+                 local_confidence=0.99,
+                 min_samples=20,
+                 min_coverage=0.8,
+                 learn_confidence=0.9,
+                 n=3):
+        self.translator = translator
+        self.cache_size = cache_size
+        self.local_confidence = local_confidence
+        self.min_samples = min_samples
+        self.min_coverage = min_coverage
+        self.learn_confidence = learn_confidence
+        self.profile = NgramProfile(n)
+        self.hits = 0
+        self.local = 0
+        self.requests = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def hit_rate(self):
+        """The fraction of calls answered without a request."""
+        total = self.hits + self.local + self.requests
+        return float(self.hits + self.local) / total if total else 0.0
+
+    def identify(self, text, **kwargs):
+        """
+        Identify the language of a text.
+
+        :param str text: Input text in UTF-8 format.
+        :param dict headers: A `dict` containing the request headers
+        :return: An `IdentifiedLanguages` dict.
+        :rtype: dict
+        """
+        return self.identify_response(text, **kwargs).get_result()
+
+    def identify_response(self, text, **kwargs):
+        """
+        Identify the language of a text, as a `DetailedResponse`.
+
+        :param str text: Input text in UTF-8 format.
+        :param dict headers: A `dict` containing the request headers
+        :return: The response of the service, or one without headers if the
+        result was served without a request.
+        :rtype: DetailedResponse
+        """
+        if text is None:
+            raise ValueError('text must be provided')
+        key = normalize(text).lower()
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache[key] = self._cache.pop(key)
+                self.hits += 1
+                return DetailedResponse(copy.deepcopy(result), None, 200)
+            result = self._local(key)
+            if result is not None:
+                self.local += 1
+                self._put(key, result)
+                return DetailedResponse(copy.deepcopy(result), None, 200)
+            self.requests += 1
+        # The base method, so that an adapter routing `identify` here does
+        # not recurse.
+        response = LanguageTranslatorV3.identify(self.translator, text,
+                                                 **kwargs)
+        result = response.get_result()
+        languages = result.get('languages') or []
+        with self._lock:
+            if languages and \
+                    languages[0]['confidence'] >= self.learn_confidence:
+                self.profile.learn(key, languages[0]['language'])
+            self._put(key, result)
+        return DetailedResponse(copy.deepcopy(result), response.get_headers(),
+                                response.get_status_code())
+
+    def clear(self):
+        """Drop the cached results and the learned profile."""
+        with self._lock:
+            self._cache.clear()
+            self.profile = NgramProfile(self.profile.n)
+
+    def _local(self, key):
+        if self.local_confidence is None:
+            return None
+        languages, coverage = self.profile.classify(key)
+        if not languages or coverage < self.min_coverage:
+            return None
+        top = languages[0]
+        if top['confidence'] < self.local_confidence or \
+                self.profile.samples[top['language']] < self.min_samples:
+            return None
+        return {'languages': languages}
+
+    def _put(self, key, result):
+        self._cache.pop(key, None)
+        self._cache[key] = result
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,122 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Persistent translation memory for Language Translator V3.
+"""
+
+from __future__ import absolute_import
+
+import sqlite3
+import threading
+import unicodedata
+
+# SQLite limits the number of parameters of a statement to 999.
+_LOOKUP_CHUNK = 900
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS translations (
+    model_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    text TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    PRIMARY KEY (model_id, source, target, text)
+)
+'''
+
+
+def normalize(text):
+    """
+    Return the key of a text: its NFC form with runs of whitespace collapsed
+    and leading and trailing whitespace removed.
+    """
+    return unicodedata.normalize('NFC', u' '.join(text.split()))
+
+
+class TranslationMemory(object):
+    """
+    A thread-safe SQLite store of translations.
+
+    Translations are keyed by model ID, source and target language, and the
+    normalized text. Omitted key parts are stored as empty strings, so a
+    translation requested by `model_id` is not shared with one requested by
+    `source` and `target`.
+
+    :param str path: The database file, or `:memory:`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(_SCHEMA)
+
+    def lookup(self, texts, model_id=None, source=None, target=None):
+        """
+        Look up many texts at once.
+
+        :param list[str] texts: The normalized texts.
+        :return: The stored translation of each text found, keyed by text.
+        :rtype: dict
+        """
+        texts = list(set(texts))
+        found = {}
+        with self._lock:
+            for start in range(0, len(texts), _LOOKUP_CHUNK):
+                chunk = texts[start:start + _LOOKUP_CHUNK]
+                rows = self._connection.execute(
+                    'SELECT text, translation FROM translations '
+                    'WHERE model_id = ? AND source = ? AND target = ? '
+                    'AND text IN ({0})'.format(','.join('?' * len(chunk))),
+                    [model_id or '', source or '', target or ''] + chunk)
+                found.update(rows)
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def store(self, translations, model_id=None, source=None, target=None):
+        """
+        Store translations.
+
+        :param dict translations: The translation of each normalized text.
+        """
+        key = (model_id or '', source or '', target or '')
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO translations '
+                '(model_id, source, target, text, translation) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [key + (text, translation)
+                 for text, translation in translations.items()])
+
+    def invalidate(self, model_id):
+        """Delete every translation made with `model_id`."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'DELETE FROM translations WHERE model_id = ?', (model_id,))
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM translations').fetchone()[0]
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
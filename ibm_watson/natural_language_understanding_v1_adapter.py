@@ -0,0 +1,160 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+from ibm_cloud_sdk_core import DetailedResponse
+from .natural_language_understanding_v1 import NaturalLanguageUnderstandingV1, \
+    Features
+from .natural_language_understanding_v1_coalescer import AnalyzeCoalescer
+from .natural_language_understanding_v1_chunks import merge_results, \
+    split_text
+
+CHUNKS_DOCSTRING = """
+        :param int max_characters: (optional) Split a longer `text` or `html`
+        at paragraph or sentence boundaries into chunks of at most this many
+        characters, analyze the chunks concurrently and merge their results.
+        Locations refer to the whole `text`, or for `html` to the analyzed
+        texts of the chunks joined by newlines.
+        :param int max_workers: (optional) The maximum number of chunks
+        analyzed at a time. By default every chunk is analyzed at once.
+"""
+
+# The separator between the analyzed texts of HTML chunks.
+_HTML_SEPARATOR = '\n'
+
+
+class NaturalLanguageUnderstandingV1Adapter(NaturalLanguageUnderstandingV1):
+    coalescer = None
+
+    def enable_coalescing(self, window=0.05):
+        """
+        Merge concurrent `analyze` calls on the same document.
+
+        Calls made within `window` seconds of each other on the same `text`,
+        `html` or `url`, with the same other arguments, are sent as one
+        request with the union of their features, and each caller gets the
+        part of the result it asked for. See :class:`AnalyzeCoalescer`. Every
+        call waits up to `window` seconds for others to join.
+
+        :param float window: The number of seconds a request waits for other
+        calls to join it.
+        :return: The coalescer, whose `calls` and `requests` can be inspected.
+        :rtype: AnalyzeCoalescer
+        """
+        self.coalescer = AnalyzeCoalescer(self._analyze, window=window)
+        return self.coalescer
+
+    def disable_coalescing(self):
+        """Send every `analyze` call as its own request again."""
+        self.coalescer = None
+
+    def analyze(self,
+                features,
+                text=None,
+                html=None,
+                url=None,
+                clean=None,
+                xpath=None,
+                fallback_to_raw=None,
+                return_analyzed_text=None,
+                language=None,
+                limit_text_characters=None,
+                max_characters=None,
+                max_workers=None,
+                **kwargs):
+        coalescer = self.coalescer
+        if coalescer is None:
+            analyze = self._analyze
+        else:
+            if features is None:
+                raise ValueError('features must be provided')
+            features = self._convert_model(features, Features)
+            analyze = coalescer.analyze
+        return analyze(
+            features, text=text, html=html, url=url, clean=clean,
+            xpath=xpath, fallback_to_raw=fallback_to_raw,
+            return_analyzed_text=return_analyzed_text, language=language,
+            limit_text_characters=limit_text_characters,
+            max_characters=max_characters, max_workers=max_workers, **kwargs)
+
+    def _analyze(self,
+                 features,
+                 text=None,
+                 html=None,
+                 url=None,
+                 clean=None,
+                 xpath=None,
+                 fallback_to_raw=None,
+                 return_analyzed_text=None,
+                 language=None,
+                 limit_text_characters=None,
+                 max_characters=None,
+                 max_workers=None,
+                 **kwargs):
+        document = text if text is not None else html
+        if max_characters is None or document is None or url is not None:
+            return NaturalLanguageUnderstandingV1.analyze(
+                self, features, text=text, html=html, url=url, clean=clean,
+                xpath=xpath, fallback_to_raw=fallback_to_raw,
+                return_analyzed_text=return_analyzed_text, language=language,
+                limit_text_characters=limit_text_characters, **kwargs)
+        if features is None:
+            raise ValueError('features must be provided')
+        features = self._convert_model(features, Features)
+        if limit_text_characters is not None:
+            document = document[:limit_text_characters]
+        is_html = text is None
+        chunks = split_text(document, max_characters, html=is_html)
+
+        def analyze(chunk):
+            return NaturalLanguageUnderstandingV1.analyze(
+                self, features,
+                text=None if is_html else chunk,
+                html=chunk if is_html else None,
+                clean=clean, xpath=xpath, fallback_to_raw=fallback_to_raw,
+                return_analyzed_text=is_html or return_analyzed_text,
+                language=language, **kwargs)
+
+        if len(chunks) == 1:
+            return analyze(chunks[0][1])
+        executor = ThreadPoolExecutor(max_workers=max_workers or len(chunks))
+        try:
+            responses = list(executor.map(analyze, [c for _, c in chunks]))
+        finally:
+            executor.shutdown(wait=True)
+        results = [r.get_result() for r in responses]
+        if is_html:
+            # The offsets of HTML results refer to the cleaned text.
+            parts = []
+            offset = 0
+            for result in results:
+                length = len(result.get('analyzed_text') or '')
+                parts.append((offset, length, result))
+                offset += length + len(_HTML_SEPARATOR)
+            separator = _HTML_SEPARATOR
+        else:
+            parts = [(offset, len(chunk), result)
+                     for (offset, chunk), result in zip(chunks, results)]
+            separator = ''
+        merged = merge_results(parts, features, separator)
+        if not return_analyzed_text:
+            merged.pop('analyzed_text', None)
+        return DetailedResponse(merged, responses[0].get_headers(),
+                                responses[0].get_status_code())
+
+    analyze.__doc__ = NaturalLanguageUnderstandingV1.analyze.__doc__.replace(
+        '        :param dict headers:',
+        CHUNKS_DOCSTRING.strip('\n') + '\n        :param dict headers:', 1)
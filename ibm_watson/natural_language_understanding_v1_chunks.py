@@ -0,0 +1,271 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Analysis of long documents with Natural Language Understanding V1, in chunks.
+"""
+
+from __future__ import absolute_import
+
+import re
+from collections import OrderedDict
+
+# The number of characters the service analyzes in one request.
+MAX_CHARACTERS = 50000
+
+_PARAGRAPH = re.compile(r'\n\s*\n')
+_SENTENCE = re.compile(u'[.!?。][\'")\\]]*\\s+')
+_WHITESPACE = re.compile(r'\s+')
+_HTML_BLOCK = re.compile(
+    r'</(?:p|div|li|ul|ol|tr|table|h[1-6]|section|article|blockquote|pre)'
+    r'\s*>|<br\s*/?>', re.IGNORECASE)
+_HTML_TAG = re.compile(r'>')
+
+_TEXT_BOUNDARIES = (_PARAGRAPH, _SENTENCE, _WHITESPACE)
+_HTML_BOUNDARIES = (_HTML_BLOCK, _HTML_TAG)
+
+
+def split_text(text, max_characters=MAX_CHARACTERS, html=False):
+    """
+    Split a document into chunks of at most `max_characters`.
+
+    Chunks end at the last paragraph break that fits, else at the last
+    sentence end, else at the last whitespace, and are cut hard only when
+    none is found. HTML is split after block-level closing tags, else after
+    any tag.
+
+    :param str text: The text or HTML.
+    :param int max_characters: The maximum length of a chunk.
+    :param bool html: Whether `text` is HTML.
+    :return: A list of `(offset, chunk)` pairs, where offset is the position
+    of the chunk in `text`.
+    :rtype: list
+    """
+    boundaries = _HTML_BOUNDARIES if html else _TEXT_BOUNDARIES
+    chunks = []
+    start = 0
+    while len(text) - start > max_characters:
+        window = text[start:start + max_characters]
+        cut = max_characters
+        for boundary in boundaries:
+            ends = [m.end() for m in boundary.finditer(window) if m.end() > 0]
+            if ends:
+                cut = ends[-1]
+                break
+        chunks.append((start, window[:cut]))
+        start += cut
+    if start < len(text) or not chunks:
+        chunks.append((start, text[start:]))
+    return chunks
+
+
+def rebase(value, shift):
+    """
+    Return a copy of a result with every `location` moved by `shift`
+    characters.
+    """
+    if isinstance(value, dict):
+        rebased = {}
+        for key, item in value.items():
+            if key == 'location' and isinstance(item, list):
+                rebased[key] = [offset + shift for offset in item]
+            else:
+                rebased[key] = rebase(item, shift)
+        return rebased
+    if isinstance(value, list):
+        return [rebase(item, shift) for item in value]
+    return value
+
+
+def _combined_relevance(values):
+    """The probability that at least one chunk finds the item relevant."""
+    missing = 1.0
+    for value in values:
+        missing *= 1.0 - value
+    return 1.0 - missing
+
+
+def _mean_scores(weighted):
+    """Average `(weight, scores)` pairs key by key."""
+    totals = OrderedDict()
+    weights = {}
+    for weight, scores in weighted:
+        for key, score in (scores or {}).items():
+            if isinstance(score, (int, float)) and \
+                    not isinstance(score, bool):
+                totals[key] = totals.get(key, 0.0) + weight * score
+                weights[key] = weights.get(key, 0.0) + weight
+    return OrderedDict((key, total / weights[key])
+                       for key, total in totals.items() if weights[key])
+
+
+def _sentiment(weighted):
+    scores = _mean_scores(weighted)
+    if 'score' in scores and any('label' in s for _, s in weighted if s):
+        score = scores['score']
+        scores['label'] = 'positive' if score > 0 else \
+            'negative' if score < 0 else 'neutral'
+    return scores
+
+
+def _merge_items(chunks, feature, key):
+    """
+    Merge the items of a list feature found in several chunks.
+
+    Items with the same key are merged: counts are summed, relevance is
+    combined, mentions are concatenated and sentiment and emotion are
+    averaged, weighted by the count of each item.
+    """
+    merged = OrderedDict()
+    parts = OrderedDict()
+    for _, result in chunks:
+        for item in result.get(feature) or []:
+            parts.setdefault(key(item), []).append(item)
+    for item_key, items in parts.items():
+        item = dict(items[0])
+        weighted = [(i.get('count') or 1, i) for i in items]
+        if any('count' in i for i in items):
+            item['count'] = sum(i.get('count') or 0 for i in items)
+        if any('relevance' in i for i in items):
+            item['relevance'] = _combined_relevance(
+                i.get('relevance') or 0.0 for i in items)
+        if any('score' in i for i in items):
+            item['score'] = max(i.get('score') or 0.0 for i in items)
+        if any('confidence' in i for i in items):
+            item['confidence'] = max(i.get('confidence') or 0.0 for i in items)
+        if any('mentions' in i for i in items):
+            item['mentions'] = [m for i in items for m in i.get('mentions')
+                                or []]
+        if any('sentiment' in i for i in items):
+            item['sentiment'] = _sentiment([(w, i.get('sentiment'))
+                                            for w, i in weighted])
+        if any('emotion' in i for i in items):
+            item['emotion'] = _mean_scores([(w, i.get('emotion'))
+                                            for w, i in weighted])
+        merged[item_key] = item
+    return list(merged.values())
+
+
+def _merge_targets(chunks, feature, merge):
+    """Merge the document and target scores of `sentiment` or `emotion`."""
+    found = [(w, r[feature]) for w, r in chunks if r.get(feature)]
+    if not found:
+        return None
+    merged = {}
+    documents = [(w, f['document'].get(feature)
+                  if feature == 'emotion' else f['document'])
+                 for w, f in found if f.get('document')]
+    if documents:
+        scores = merge(documents)
+        merged['document'] = {'emotion': scores} if feature == 'emotion' \
+            else scores
+    targets = OrderedDict()
+    for weight, result in found:
+        for target in result.get('targets') or []:
+            targets.setdefault(target.get('text'), []).append(
+                (weight, target.get(feature) if feature == 'emotion'
+                 else target))
+    if any(f.get('targets') is not None for _, f in found):
+        merged['targets'] = []
+        for text, weighted in targets.items():
+            target = {'text': text}
+            if feature == 'emotion':
+                target['emotion'] = merge(weighted)
+            else:
+                target.update(merge(weighted))
+            merged['targets'].append(target)
+    return merged
+
+
+def _limit(features, feature):
+    return ((features or {}).get(feature) or {}).get('limit')
+
+
+def merge_results(chunks, features=None, separator=''):
+    """
+    Merge the `AnalysisResults` of the chunks of one document.
+
+    Locations are moved to where each chunk starts in the document.
+    Entities (by type and text), keywords and concepts (by text) and
+    categories (by label) found in several chunks are merged: counts and
+    mentions add up, relevance is combined as the probability that any chunk
+    finds the item relevant, and category scores and confidences keep their
+    maximum. Document sentiment and emotion, and those of targets, are means
+    weighted by the length of the chunks; those of entities and keywords are
+    weighted by their counts. Relations, semantic roles and syntax are
+    concatenated. Merged lists are sorted and cut to the limits of
+    `features`.
+
+    :param list chunks: The `(offset, length, result)` of each chunk, in
+    document order.
+    :param dict features: (optional) The features requested.
+    :param str separator: The separator between the analyzed texts of the
+    chunks.
+    :rtype: dict
+    """
+    results = [(length, rebase(result, offset))
+               for offset, length, result in chunks]
+    merged = {}
+    first = results[0][1]
+    for key in ('language', 'retrieved_url', 'metadata'):
+        for _, result in results:
+            if result.get(key) is not None:
+                merged[key] = result[key]
+                break
+    if any('analyzed_text' in r for _, r in results):
+        merged['analyzed_text'] = separator.join(
+            r.get('analyzed_text') or '' for _, r in results)
+    usages = [r['usage'] for _, r in results if r.get('usage')]
+    if usages:
+        merged['usage'] = {
+            'features': max(u.get('features') or 0 for u in usages),
+            'text_characters': sum(u.get('text_characters') or 0
+                                   for u in usages),
+            'text_units': sum(u.get('text_units') or 0 for u in usages)
+        }
+
+    for feature, key, order in (
+            ('entities', lambda e: (e.get('type'), e.get('text')),
+             'relevance'),
+            ('keywords', lambda k: k.get('text'), 'relevance'),
+            ('concepts', lambda c: c.get('text'), 'relevance'),
+            ('categories', lambda c: c.get('label'), 'score')):
+        if not any(feature in r for _, r in results):
+            continue
+        items = _merge_items(results, feature, key)
+        items.sort(key=lambda item: -(item.get(order) or 0.0))
+        limit = _limit(features, feature)
+        merged[feature] = items[:limit] if limit else items
+
+    for feature, merge in (('sentiment', _sentiment),
+                           ('emotion', _mean_scores)):
+        scores = _merge_targets(results, feature, merge)
+        if scores is not None:
+            merged[feature] = scores
+
+    for feature in ('relations', 'semantic_roles'):
+        if any(feature in r for _, r in results):
+            merged[feature] = [item for _, r in results
+                               for item in r.get(feature) or []]
+    if any('syntax' in r for _, r in results):
+        syntax = {}
+        for _, result in results:
+            for key, items in (result.get('syntax') or {}).items():
+                syntax.setdefault(key, []).extend(items or [])
+        merged['syntax'] = syntax
+
+    for key, item in first.items():
+        merged.setdefault(key, item)
+    return merged
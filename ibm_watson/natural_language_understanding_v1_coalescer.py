@@ -0,0 +1,192 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Coalescing of concurrent Natural Language Understanding V1 `analyze` calls.
+"""
+
+from __future__ import absolute_import
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from ibm_cloud_sdk_core import DetailedResponse
+
+# The keys of `AnalysisResults` that do not belong to a feature.
+_COMMON_KEYS = ('language', 'analyzed_text', 'retrieved_url', 'usage')
+
+# The options that add fields to the items of a feature, and those fields.
+_ITEM_FIELDS = {
+    'mentions': 'mentions',
+    'emotion': 'emotion',
+    'sentiment': 'sentiment',
+    'explanation': 'explanation',
+}
+
+# The boolean options that the service enables when they are omitted.
+_TRUE_BY_DEFAULT = ('document',)
+
+
+def union(features, more):
+    """
+    Return the union of two `Features` dicts, or `None` if they conflict.
+
+    A feature requested by both is merged option by option: a `limit` is
+    the larger of the two, and boolean options are or-ed. A `limit` given by
+    only one of them is a conflict, since the default of the service may be
+    smaller or larger. Any other option with different values, such as a
+    different `model` or `targets`, is a conflict too.
+    """
+    merged = copy.deepcopy(features)
+    for feature, options in more.items():
+        if feature not in merged:
+            merged[feature] = copy.deepcopy(options)
+            continue
+        current = merged[feature] or {}
+        options = options or {}
+        for key in set(current) | set(options):
+            mine = current.get(key)
+            value = options.get(key)
+            if key == 'limit':
+                if mine is None or value is None:
+                    return None
+                current[key] = max(mine, value)
+            elif isinstance(mine, bool) or isinstance(value, bool):
+                default = key in _TRUE_BY_DEFAULT
+                if mine is None:
+                    mine = default
+                if value is None:
+                    value = default
+                current[key] = mine or value
+                if current[key] == default:
+                    del current[key]
+            elif mine != value:
+                return None
+        merged[feature] = current
+    return merged
+
+
+def split(result, features):
+    """
+    Return the part of a merged `AnalysisResults` that `features` asked for.
+
+    Lists are cut to the `limit` of each feature, and the fields that a
+    feature did not ask for, such as entity `mentions`, are removed.
+    """
+    part = dict((key, result[key]) for key in _COMMON_KEYS if key in result)
+    for feature, options in features.items():
+        if feature not in result:
+            continue
+        value = copy.deepcopy(result[feature])
+        options = options or {}
+        if isinstance(value, list):
+            if options.get('limit'):
+                value = value[:options['limit']]
+            for option, field in _ITEM_FIELDS.items():
+                if not options.get(option):
+                    for item in value:
+                        if isinstance(item, dict):
+                            item.pop(field, None)
+        elif isinstance(value, dict) and options.get('document') is False:
+            value.pop('document', None)
+        part[feature] = value
+    return part
+
+
+class _Batch(object):
+    __slots__ = ('features', 'callers', 'done', 'response', 'error')
+
+    def __init__(self, features):
+        self.features = features
+        self.callers = 1
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class AnalyzeCoalescer(object):
+    """
+    Merges concurrent `analyze` calls on the same document into one request.
+
+    The first call on a document opens a batch and waits `window` seconds.
+    Calls made meanwhile on the same `text`, `html` or `url` with the same
+    other arguments join the batch, unless their features conflict. A single
+    request is then made with the union of the features, and each caller
+    gets the part of the result its own features asked for.
+
+    :param analyze: The function making the request, with the signature of
+    `NaturalLanguageUnderstandingV1.analyze`.
+    :param float window: The number of seconds a batch stays open.
+    """
+
+    def __init__(self, analyze, window=0.05):
+        self._analyze = analyze
+        self.window = window
+        self.calls = 0
+        self.requests = 0
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def analyze(self, features, **arguments):
+        """
+        Analyze a document, sharing the request with concurrent calls.
+
+        :param dict features: The `Features` dict.
+        :param arguments: The other arguments of `analyze`.
+        :rtype: DetailedResponse
+        """
+        key = hashlib.sha256(json.dumps(
+            arguments, sort_keys=True, default=str).encode('utf-8')).digest()
+        with self._lock:
+            self.calls += 1
+            batches = self._batches.setdefault(key, [])
+            leader = False
+            for batch in batches:
+                merged = union(batch.features, features)
+                if merged is not None:
+                    batch.features = merged
+                    batch.callers += 1
+                    break
+            else:
+                batch = _Batch(copy.deepcopy(features))
+                batches.append(batch)
+                self.requests += 1
+                leader = True
+        if leader:
+            self._send(key, batch, arguments)
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        response = batch.response
+        return DetailedResponse(split(response.get_result(), features),
+                                response.get_headers(),
+                                response.get_status_code())
+
+    def _send(self, key, batch, arguments):
+        time.sleep(self.window)
+        with self._lock:
+            batches = self._batches[key]
+            batches.remove(batch)
+            if not batches:
+                del self._batches[key]
+        try:
+            batch.response = self._analyze(batch.features, **arguments)
+        except Exception as error:
+            batch.error = error
+        finally:
+            batch.done.set()
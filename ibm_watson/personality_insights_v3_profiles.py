@@ -0,0 +1,332 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Incremental aggregation of Personality Insights V3 profiles.
+"""
+
+from __future__ import absolute_import
+
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .common import replace_file
+
+# The size of the pieces of a streamed request body.
+CHUNK_SIZE = 64 * 1024
+
+
+def _content_item(item):
+    if hasattr(item, '_to_dict'):
+        item = item._to_dict()
+    if item is None or item.get('content') is None:
+        raise ValueError('content must be provided')
+    return dict((k, v) for k, v in item.items() if v is not None)
+
+
+def content_hash(item):
+    """Return the SHA-256 hex digest of a `ContentItem` dict."""
+    canonical = json.dumps(item, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def iter_content(items, chunk_size=CHUNK_SIZE):
+    """
+    Serialize `Content` JSON piece by piece.
+
+    Passed as a request body, the generator is sent with chunked transfer
+    encoding, so the whole document is never held in memory.
+
+    :param items: An iterable of `ContentItem` dicts.
+    :param int chunk_size: The size from which a piece is yielded.
+    :return: A generator of UTF-8 encoded pieces of
+    `{"contentItems": [...]}`.
+    """
+    pieces = [b'{"contentItems":[']
+    size = len(pieces[0])
+    for i, item in enumerate(items):
+        piece = (b',' if i else b'') + json.dumps(
+            item, separators=(',', ':')).encode('utf-8')
+        pieces.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield b''.join(pieces)
+            pieces = []
+            size = 0
+    pieces.append(b']}')
+    yield b''.join(pieces)
+
+
+class ProfileTable(object):
+    """
+    Columns of the CSV profiles of many users, for bulk analytics.
+
+    Numeric columns are stored in `array('d')`, with NaN for missing values,
+    and the others in lists. The first column, `user_id`, holds the user of
+    each row.
+    """
+
+    def __init__(self):
+        self.columns = OrderedDict([('user_id', [])])
+
+    def __len__(self):
+        return len(self.columns['user_id'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def add_csv(self, user_id, text, csv_headers=True):
+        """
+        Add the rows of a CSV profile.
+
+        :param str user_id: The user the profile belongs to.
+        :param str text: The CSV response of `profile`.
+        :param bool csv_headers: Whether the response starts with column
+        headers. Without them, columns are named `column_0`, `column_1` and
+        so on.
+        """
+        rows = list(csv.reader(io.StringIO(
+            text if isinstance(text, type(u'')) else text.decode('utf-8'))))
+        if not rows:
+            return
+        if csv_headers:
+            names, rows = rows[0], rows[1:]
+        else:
+            names = ['column_{0}'.format(i) for i in range(len(rows[0]))]
+        length = len(self)
+        for row in rows:
+            self.columns['user_id'].append(user_id)
+            for name, value in zip(names, row):
+                self._column(name, value, length).append(
+                    self._value(self.columns[name], value))
+            length += 1
+            for column in self.columns.values():
+                if len(column) < length:
+                    column.append(float('nan') if isinstance(column, array)
+                                  else None)
+
+    def _column(self, name, value, length):
+        column = self.columns.get(name)
+        if column is None:
+            try:
+                float(value)
+                column = array('d', [float('nan')] * length)
+            except ValueError:
+                column = [None] * length
+            self.columns[name] = column
+        return column
+
+    @staticmethod
+    def _value(column, value):
+        if not isinstance(column, array):
+            return value
+        try:
+            return float(value)
+        except ValueError:
+            return float('nan')
+
+
+class _User(object):
+    __slots__ = ('items', 'words', 'profiled', 'result')
+
+    def __init__(self):
+        self.items = OrderedDict()
+        self.words = {}
+        self.profiled = set()
+        self.result = None
+
+
+class ProfileAggregator(object):
+    """
+    Keeps the content of many users and refreshes their profiles only when
+    enough new content has arrived.
+
+    Content items are deduplicated by their hash, so the whole history of a
+    user can be added again every run at the cost of hashing it. A profile
+    is requested when a user reaches `min_words` words for the first time,
+    or when the words added since the last profile reach `min_new_words` or
+    `min_growth` times the words that were profiled. The content is sent as
+    a streamed JSON body.
+
+    The hashes of the profiled content and the last profiles can be saved
+    and loaded, so that consecutive runs only profile the users whose
+    content changed.
+
+    :param PersonalityInsightsV3 personality_insights: The service client.
+    :param str accept: The type of the profiles: `application/json` or
+    `text/csv`.
+    :param int min_words: The number of words a first profile needs.
+    :param int min_new_words: The number of new words that justify a new
+    profile.
+    :param float min_growth: The growth of the content, relative to what was
+    profiled, that justifies a new profile.
+    :param profile_arguments: Other arguments of `profile`, such as
+    `raw_scores`, `csv_headers` or `consumption_preferences`.
+    """
+
+    def __init__(self,
+                 personality_insights,
+                 accept='application/json',
+                 min_words=100,
+                 min_new_words=1000,
+                 min_growth=0.1,
+                 **profile_arguments):
+        self.personality_insights = personality_insights
+        self.accept = accept
+        self.min_words = min_words
+        self.min_new_words = min_new_words
+        self.min_growth = min_growth
+        self.profile_arguments = profile_arguments
+        self.requests = 0
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def _user(self, user_id):
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _User()
+        return user
+
+    def add(self, user_id, items):
+        """
+        Add content items of a user.
+
+        :param str user_id: The user.
+        :param list[ContentItem] items: The items, as `ContentItem` objects
+        or dicts.
+        :return: The number of items that were not known yet.
+        :rtype: int
+        """
+        added = 0
+        with self._lock:
+            user = self._user(user_id)
+            for item in items:
+                item = _content_item(item)
+                key = content_hash(item)
+                if key not in user.items:
+                    user.items[key] = item
+                    user.words[key] = len(item['content'].split())
+                    added += 1
+        return added
+
+    def needs_profile(self, user_id):
+        """Return whether the new content of a user justifies a profile."""
+        with self._lock:
+            user = self._user(user_id)
+            profiled = sum(user.words[k] for k in user.profiled
+                           if k in user.words)
+            new = sum(words for key, words in user.words.items()
+                      if key not in user.profiled)
+            if user.result is None:
+                return profiled + new >= self.min_words
+            return new > 0 and (new >= self.min_new_words or
+                                new >= self.min_growth * profiled)
+
+    def profile(self, user_id, force=False, **kwargs):
+        """
+        Return the profile of a user, requesting it only if needed.
+
+        :param str user_id: The user.
+        :param bool force: Request a profile even if little content changed.
+        :param dict headers: A `dict` containing the request headers
+        :return: The profile: a dict for JSON, the text for CSV, or `None`
+        if the user has too little content.
+        """
+        if not force and not self.needs_profile(user_id):
+            return self._users[user_id].result
+        with self._lock:
+            user = self._user(user_id)
+            keys = list(user.items)
+            items = [user.items[k] for k in keys]
+            self.requests += 1
+        arguments = dict(self.profile_arguments, **kwargs)
+        response = self.personality_insights.profile(
+            iter_content(items), self.accept,
+            content_type='application/json', **arguments)
+        result = response.get_result()
+        if not isinstance(result, (dict, type(None))):
+            result = result.text
+        with self._lock:
+            user.profiled = set(keys)
+            user.result = result
+        return result
+
+    def profile_all(self, max_workers=4, force=False):
+        """
+        Refresh the profiles of every user that needs it.
+
+        :param int max_workers: The number of profiles requested at a time.
+        :param bool force: Request every profile.
+        :return: The profile of every user, keyed by user.
+        :rtype: dict
+        """
+        with self._lock:
+            user_ids = list(self._users)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            results = list(executor.map(
+                lambda user_id: self.profile(user_id, force=force), user_ids))
+        finally:
+            executor.shutdown(wait=True)
+        return dict(zip(user_ids, results))
+
+    def table(self):
+        """
+        Return the CSV profiles of every user as a :class:`ProfileTable`.
+
+        Requires `accept='text/csv'`.
+        """
+        if self.accept != 'text/csv':
+            raise ValueError('table requires accept=text/csv')
+        table = ProfileTable()
+        csv_headers = bool(self.profile_arguments.get('csv_headers'))
+        with self._lock:
+            for user_id, user in self._users.items():
+                if user.result is not None:
+                    table.add_csv(user_id, user.result, csv_headers)
+        return table
+
+    def save(self, path):
+        """
+        Save the hashes of the profiled content and the last profiles.
+
+        The content itself is not saved; it is expected to be added again.
+        """
+        with self._lock:
+            state = dict((user_id, {'profiled': sorted(user.profiled),
+                                    'result': user.result})
+                         for user_id, user in self._users.items())
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(handle, 'w') as out:
+            json.dump(state, out)
+        replace_file(tmp_path, path)
+
+    def load(self, path):
+        """Load the state saved with :meth:`save`."""
+        with open(path) as saved:
+            state = json.load(saved)
+        with self._lock:
+            for user_id, saved_user in state.items():
+                user = self._user(user_id)
+                user.profiled = set(saved_user['profiled'])
+                user.result = saved_user['result']
@@ -0,0 +1,134 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from ibm_cloud_sdk_core import DetailedResponse
+from .tone_analyzer_v3 import ToneAnalyzerV3, ToneInput
+from .tone_analyzer_v3_chat import MAX_UTTERANCES, ToneChatSession
+from .tone_analyzer_v3_sentences import MAX_BYTES, MAX_SENTENCES, \
+    merge_results, split_sentences
+
+CHUNKS_DOCSTRING = """
+        :param int max_sentences: (optional) Split plain text or JSON input
+        into chunks of at most this many sentences, and at most 128 KB,
+        analyze the chunks concurrently and merge their results. Sentence IDs
+        and offsets refer to the whole input and document tones are weighted
+        by chunk length. At most 100, the number of sentences the service
+        analyzes one by one.
+        :param int max_workers: (optional) The maximum number of chunks
+        analyzed at a time. By default every chunk is analyzed at once.
+"""
+
+
+class ToneAnalyzerV3Adapter(ToneAnalyzerV3):
+
+    def tone(self,
+             tone_input,
+             sentences=None,
+             tones=None,
+             content_language=None,
+             accept_language=None,
+             content_type=None,
+             max_sentences=None,
+             max_workers=None,
+             **kwargs):
+        if max_sentences is None:
+            return ToneAnalyzerV3.tone(
+                self, tone_input, sentences=sentences, tones=tones,
+                content_language=content_language,
+                accept_language=accept_language, content_type=content_type,
+                **kwargs)
+        text = self._tone_text(tone_input, content_type)
+        chunks = split_sentences(text, min(max_sentences, MAX_SENTENCES),
+                                 MAX_BYTES)
+
+        def analyze(chunk):
+            return ToneAnalyzerV3.tone(
+                self, {'text': chunk}, sentences=sentences, tones=tones,
+                content_language=content_language,
+                accept_language=accept_language,
+                content_type='application/json', **kwargs)
+
+        if len(chunks) == 1:
+            return analyze(text)
+        executor = ThreadPoolExecutor(max_workers=max_workers or len(chunks))
+        try:
+            responses = list(executor.map(analyze, [c for _, c in chunks]))
+        finally:
+            executor.shutdown(wait=True)
+        merged = merge_results(
+            [(offset, chunk, response.get_result())
+             for (offset, chunk), response in zip(chunks, responses)],
+            sentences=sentences is not False)
+        return DetailedResponse(merged, responses[0].get_headers(),
+                                responses[0].get_status_code())
+
+    tone.__doc__ = ToneAnalyzerV3.tone.__doc__.replace(
+        '        :param dict headers:',
+        CHUNKS_DOCSTRING.strip('\n') + '\n        :param dict headers:', 1)
+
+    @staticmethod
+    def _tone_text(tone_input, content_type):
+        if tone_input is None:
+            raise ValueError('tone_input must be provided')
+        if isinstance(tone_input, ToneInput):
+            return tone_input.text
+        if isinstance(tone_input, dict):
+            return tone_input.get('text') or ''
+        if hasattr(tone_input, 'read'):
+            tone_input = tone_input.read()
+        if isinstance(tone_input, bytes):
+            tone_input = tone_input.decode('utf-8')
+        if content_type and content_type.startswith('application/json'):
+            return json.loads(tone_input).get('text') or ''
+        if content_type and content_type.startswith('text/html'):
+            raise ValueError('max_sentences requires plain text or JSON input')
+        return tone_input
+
+    def chat_session(self,
+                     content_language=None,
+                     accept_language=None,
+                     batch_size=MAX_UTTERANCES,
+                     cache_size=10000,
+                     history=100,
+                     threshold=0.5):
+        """
+        Start an incremental analysis of a conversation with `tone_chat`.
+
+        The session buffers utterances, sends them in requests of at most
+        `batch_size` utterances, memoizes the analysis of every utterance so
+        a conversation sent again only costs its new utterances, and keeps
+        the primary tone of each user in a ring buffer.
+
+        :param str content_language: (optional) The language of the
+        utterances.
+        :param str accept_language: (optional) The language of the response.
+        :param int batch_size: The maximum number of utterances per request,
+        at most 50.
+        :param int cache_size: The number of utterance analyses memoized.
+        :param int history: The number of tones kept per user.
+        :param float threshold: The score a tone needs to be the primary tone
+        of an utterance.
+        :rtype: ToneChatSession
+        """
+        return ToneChatSession(self,
+                               content_language=content_language,
+                               accept_language=accept_language,
+                               batch_size=batch_size,
+                               cache_size=cache_size,
+                               history=history,
+                               threshold=threshold)
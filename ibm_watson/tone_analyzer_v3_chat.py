@@ -0,0 +1,257 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Incremental customer-engagement tone analysis with Tone Analyzer V3.
+"""
+
+from __future__ import absolute_import
+
+import copy
+import threading
+from array import array
+from collections import OrderedDict
+
+# The number of utterances the service analyzes in one request.
+MAX_UTTERANCES = 50
+
+# The tones of the customer-engagement endpoint.
+CHAT_TONES = ('sad', 'frustrated', 'satisfied', 'excited', 'polite',
+              'impolite', 'sympathetic')
+
+NEUTRAL = 'neutral'
+
+
+def _utterance(utterance):
+    if hasattr(utterance, '_to_dict'):
+        utterance = utterance._to_dict()
+    if utterance is None or utterance.get('text') is None:
+        raise ValueError('text must be provided')
+    return utterance
+
+
+class ToneHistory(object):
+    """
+    A ring buffer of the primary tone of the last utterances of a user.
+
+    Tones are stored as small integer codes and scores as 32-bit floats, so
+    a long history costs a few bytes per utterance.
+
+    :param int capacity: The number of utterances kept.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._tones = array('b', [0] * capacity)
+        self._scores = array('f', [0.0] * capacity)
+        self._names = [NEUTRAL] + list(CHAT_TONES)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, tone_id, score=None):
+        """Record the primary tone of an utterance, `neutral` for none."""
+        if tone_id not in self._names:
+            self._names.append(tone_id)
+        self._tones[self._next] = self._names.index(tone_id)
+        self._scores[self._next] = score if score is not None else 0.0
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def __iter__(self):
+        """Iterate over the `(tone_id, score)` pairs, oldest first."""
+        start = (self._next - self._size) % self.capacity
+        for i in range(self._size):
+            position = (start + i) % self.capacity
+            name = self._names[self._tones[position]]
+            # Scores are rounded back from single precision.
+            yield name, (None if name == NEUTRAL
+                         else round(self._scores[position], 6))
+
+    @property
+    def current(self):
+        """The last recorded tone, or `None`."""
+        if not self._size:
+            return None
+        return self._names[self._tones[(self._next - 1) % self.capacity]]
+
+    def to_dict(self):
+        """
+        Return the history in the shape of `updateUserTone` in the
+        Assistant and Tone Analyzer integration example.
+        """
+        return {
+            'current': self.current,
+            'history': [{'tone_name': name, 'score': score}
+                        for name, score in self]
+        }
+
+
+class ToneChatSession(object):
+    """
+    Analyzes a conversation with `tone_chat` as it grows.
+
+    Utterances added with :meth:`add` are buffered until :meth:`flush`,
+    which analyzes them in requests of at most `batch_size` utterances. The
+    analysis of every utterance is memoized by its text, so a conversation
+    sent again, as with :meth:`tone_chat`, only costs the new utterances.
+    The primary tone of every new utterance, the one with the highest score
+    above `threshold`, is recorded in a :class:`ToneHistory` per user.
+
+    :param ToneAnalyzerV3 tone_analyzer: The service client.
+    :param str content_language: (optional) The language of the utterances.
+    :param str accept_language: (optional) The language of the response.
+    :param int batch_size: The maximum number of utterances per request.
+    :param int cache_size: The number of utterance analyses memoized.
+    :param int history: The number of tones kept per user.
+    :param float threshold: The score a tone needs to be primary.
+    """
+
+    def __init__(self,
+                 tone_analyzer,
+                 content_language=None,
+                 accept_language=None,
+                 batch_size=MAX_UTTERANCES,
+                 cache_size=10000,
+                 history=100,
+                 threshold=0.5):
+        self.tone_analyzer = tone_analyzer
+        self.content_language = content_language
+        self.accept_language = accept_language
+        self.batch_size = min(batch_size, MAX_UTTERANCES)
+        self.cache_size = cache_size
+        self.history_size = history
+        self.threshold = threshold
+        self.turns = 0
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        self._buffer = []
+        self._cache = OrderedDict()
+        self._histories = {}
+        self._lock = threading.RLock()
+
+    def add(self, utterances):
+        """
+        Buffer new utterances of the conversation.
+
+        :param list[Utterance] utterances: The utterances, as `Utterance`
+        objects or dicts.
+        """
+        with self._lock:
+            self._buffer.extend(_utterance(u) for u in utterances)
+
+    def flush(self, **kwargs):
+        """
+        Analyze the buffered utterances.
+
+        :param dict headers: A `dict` containing the request headers
+        :return: An `UtteranceAnalyses` dict for the flushed utterances, whose
+        `utterance_id` is their position in the conversation.
+        :rtype: dict
+        """
+        with self._lock:
+            utterances = self._buffer
+            self._buffer = []
+            return {'utterances_tone': self._record(
+                utterances, self._analyze(utterances, kwargs))}
+
+    def tone_chat(self, utterances, **kwargs):
+        """
+        Analyze a whole conversation, sent again with every new utterance.
+
+        Utterances past those already seen by the session are recorded as
+        new turns. Buffered utterances are flushed first.
+
+        :param list[Utterance] utterances: The conversation so far.
+        :param dict headers: A `dict` containing the request headers
+        :return: An `UtteranceAnalyses` dict for the whole conversation.
+        :rtype: dict
+        """
+        with self._lock:
+            self.flush(**kwargs)
+            utterances = [_utterance(u) for u in utterances]
+            analyses = self._analyze(utterances, kwargs)
+            for i, analysis in enumerate(analyses):
+                analysis['utterance_id'] = i
+            if len(utterances) > self.turns:
+                self._record(utterances[self.turns:],
+                             copy.deepcopy(analyses[self.turns:]))
+            return {'utterances_tone': analyses}
+
+    def history(self, user=None):
+        """
+        Return the tone history of a user.
+
+        :param str user: The `user` of the utterances, or `None` for
+        utterances without one.
+        :rtype: ToneHistory
+        """
+        with self._lock:
+            history = self._histories.get(user)
+            if history is None:
+                history = self._histories[user] = \
+                    ToneHistory(self.history_size)
+            return history
+
+    def _analyze(self, utterances, kwargs):
+        analyses = []
+        for utterance in utterances:
+            analysis = self._cache.pop(utterance['text'], None)
+            if analysis is not None:
+                self._cache[utterance['text']] = analysis
+            analyses.append(analysis)
+        missing = list(OrderedDict.fromkeys(
+            u['text'] for u, a in zip(utterances, analyses) if a is None))
+        self.hits += len(utterances) - len(
+            [a for a in analyses if a is None])
+        self.misses += len(missing)
+        found = {}
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            self.requests += 1
+            result = self.tone_analyzer.tone_chat(
+                [{'text': text} for text in batch],
+                content_language=self.content_language,
+                accept_language=self.accept_language,
+                **kwargs).get_result()
+            for text, analysis in zip(batch, result['utterances_tone']):
+                found[text] = analysis
+        for text, analysis in found.items():
+            self._cache[text] = analysis
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        results = []
+        for utterance, analysis in zip(utterances, analyses):
+            if analysis is None:
+                analysis = found[utterance['text']]
+            analysis = copy.deepcopy(analysis)
+            analysis['utterance_text'] = utterance['text']
+            results.append(analysis)
+        return results
+
+    def _record(self, utterances, analyses):
+        for utterance, analysis in zip(utterances, analyses):
+            tones = [t for t in analysis.get('tones') or []
+                     if t.get('score', 0) > self.threshold]
+            primary = max(tones, key=lambda t: t['score']) if tones else None
+            self.history(utterance.get('user')).append(
+                primary['tone_id'] if primary else NEUTRAL,
+                primary['score'] if primary else None)
+            analysis['utterance_id'] = self.turns
+            self.turns += 1
+        return analyses
@@ -0,0 +1,167 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Analysis of long documents with Tone Analyzer V3, in chunks of sentences.
+"""
+
+from __future__ import absolute_import
+
+import re
+from collections import OrderedDict
+
+# The number of sentences the service analyzes one by one in a request.
+MAX_SENTENCES = 100
+
+# The size of the content of a request.
+MAX_BYTES = 128 * 1024
+
+# The score from which the service reports a tone.
+TONE_THRESHOLD = 0.5
+
+_SENTENCE_END = re.compile(r'[.!?]+[\'")\]]*\s+|\n\s*')
+
+
+def split_sentences(text, max_sentences=MAX_SENTENCES, max_bytes=MAX_BYTES):
+    """
+    Split a text into chunks of whole sentences.
+
+    Each chunk has at most `max_sentences` sentences and `max_bytes` bytes
+    in UTF-8, unless a single sentence is longer.
+
+    :param str text: The text.
+    :param int max_sentences: The maximum number of sentences of a chunk.
+    :param int max_bytes: The maximum size of a chunk.
+    :return: A list of `(offset, chunk)` pairs, where offset is the position
+    of the chunk in `text`.
+    :rtype: list
+    """
+    ends = [m.end() for m in _SENTENCE_END.finditer(text)]
+    if not ends or ends[-1] < len(text):
+        ends.append(len(text))
+    chunks = []
+    start = 0
+    sentences = 0
+    size = 0
+    previous = 0
+    for end in ends:
+        length = len(text[previous:end].encode('utf-8'))
+        if sentences and (sentences == max_sentences or
+                          size + length > max_bytes):
+            chunks.append((start, text[start:previous]))
+            start = previous
+            sentences = 0
+            size = 0
+        sentences += 1
+        size += length
+        previous = end
+    chunks.append((start, text[start:]))
+    return chunks
+
+
+def _mean_tones(weighted, threshold=None):
+    """
+    Average lists of `ToneScore` dicts, weighted by chunk. A tone missing
+    from a chunk scores 0 there. With a `threshold`, only the tones that
+    reach it are kept, by decreasing score.
+    """
+    total = float(sum(w for w, _ in weighted)) or 1.0
+    tones = OrderedDict()
+    for weight, scores in weighted:
+        for tone in scores or []:
+            merged = tones.get(tone['tone_id'])
+            if merged is None:
+                merged = tones[tone['tone_id']] = dict(tone, score=0.0)
+            merged['score'] += weight * tone['score'] / total
+    merged = [dict(t, score=round(t['score'], 6)) for t in tones.values()]
+    if threshold is None:
+        return merged
+    return sorted((t for t in merged if t['score'] >= threshold),
+                  key=lambda t: -t['score'])
+
+
+def _mean_categories(weighted):
+    categories = OrderedDict()
+    for _, document in weighted:
+        for category in document or []:
+            categories.setdefault(category['category_id'], category)
+    merged = []
+    for category_id, category in categories.items():
+        tones = []
+        for weight, document in weighted:
+            found = [c for c in document or []
+                     if c['category_id'] == category_id]
+            tones.append((weight, found[0].get('tones') if found else None))
+        merged.append(dict(category, tones=_mean_tones(tones)))
+    return merged
+
+
+def merge_results(chunks, sentences=True):
+    """
+    Merge the `ToneAnalysis` results of the chunks of one document.
+
+    Sentences are numbered through the whole document and their
+    `input_from` and `input_to` offsets are moved to where their chunk
+    starts. A chunk of one sentence, for which the service returns no
+    sentences, contributes its document analysis as that sentence. Document
+    tone scores are means of the chunk scores weighted by chunk length; a
+    chunk that does not report a tone counts as a score of 0, and tones
+    below the reporting threshold of 0.5 are left out, like the service
+    does.
+
+    :param list chunks: The `(offset, chunk, result)` of each chunk, in
+    document order.
+    :param bool sentences: Whether the sentences were analyzed.
+    :rtype: dict
+    """
+    analyses = []
+    weighted = []
+    warnings = []
+    for offset, chunk, result in chunks:
+        document = result.get('document_tone') or {}
+        weighted.append((len(chunk), document))
+        if document.get('warning'):
+            warnings.append(document['warning'])
+        found = result.get('sentences_tone')
+        if not sentences:
+            continue
+        if found is None:
+            found = [dict((key, document[key])
+                          for key in ('tones', 'tone_categories')
+                          if key in document)]
+            text = chunk.strip()
+            start = len(chunk) - len(chunk.lstrip())
+            found[0].update(text=text, input_from=start,
+                            input_to=start + len(text))
+        for sentence in found:
+            sentence = dict(sentence, sentence_id=len(analyses))
+            for key in ('input_from', 'input_to'):
+                if sentence.get(key) is not None:
+                    sentence[key] += offset
+            analyses.append(sentence)
+
+    document = {}
+    if any('tones' in d for _, d in weighted):
+        document['tones'] = _mean_tones(
+            [(w, d.get('tones')) for w, d in weighted], TONE_THRESHOLD)
+    if any('tone_categories' in d for _, d in weighted):
+        document['tone_categories'] = _mean_categories(
+            [(w, d.get('tone_categories')) for w, d in weighted])
+    if warnings:
+        document['warning'] = ' '.join(OrderedDict.fromkeys(warnings))
+    merged = {'document_tone': document}
+    if len(analyses) > 1:
+        merged['sentences_tone'] = analyses
+    return merged
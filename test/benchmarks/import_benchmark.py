@@ -0,0 +1,110 @@
+# coding: utf-8
+
+# Copyright 2019 IBM All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the cold-start cost of importing each service class of ibm_watson.
+
+Every import runs in a fresh interpreter, so nothing is cached between
+measurements. For each class the script reports the time of
+`from ibm_watson import <class>`, the memory allocated by the import as
+traced by `tracemalloc`, the peak resident size of the process where the
+`resource` module exists, and the number of modules loaded.
+
+Usage: python test/benchmarks/import_benchmark.py [--repeat N] [--json]
+       [class ...]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MEASURE = '''
+import json, sys, time, tracemalloc
+try:
+    import resource
+except ImportError:
+    resource = None
+before = len(sys.modules)
+tracemalloc.start()
+start = time.perf_counter()
+from ibm_watson import {name}
+seconds = time.perf_counter() - start
+current, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+rss = None
+if resource is not None:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        rss *= 1024
+print(json.dumps({{'seconds': seconds, 'allocated': current, 'peak': peak,
+                  'rss': rss, 'modules': len(sys.modules) - before}}))
+'''
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def service_classes():
+    sys.path.insert(0, ROOT)
+    import ibm_watson
+    return sorted(name for name in ibm_watson.__all__
+                  if name[-2] == 'V' and name[-1].isdigit())
+
+
+def measure(name, repeat):
+    """Return the median measurements of importing `name`."""
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-c', MEASURE.format(name=name)],
+            cwd=ROOT)
+        runs.append(json.loads(output.decode('utf-8')))
+    runs.sort(key=lambda run: run['seconds'])
+    return runs[len(runs) // 2]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('classes', nargs='*',
+                        help='the classes to measure, all by default')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='the number of runs per class; the median '
+                        'is reported')
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args(argv)
+
+    results = dict((name, measure(name, args.repeat))
+                   for name in args.classes or service_classes())
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+        return
+    print('{0:<32} {1:>9} {2:>11} {3:>11} {4:>10} {5:>8}'.format(
+        'class', 'ms', 'alloc KiB', 'peak KiB', 'rss MiB', 'modules'))
+    for name in sorted(results):
+        result = results[name]
+        rss = result['rss']
+        print('{0:<32} {1:>9.1f} {2:>11.0f} {3:>11.0f} {4:>10} {5:>8}'.format(
+            name, result['seconds'] * 1000, result['allocated'] / 1024.0,
+            result['peak'] / 1024.0,
+            '-' if rss is None else '{0:.1f}'.format(rss / 1048576.0),
+            result['modules']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# coding: utf-8
+import json
+import responses
+import ibm_watson
+from ibm_watson.assistant_v1 import CreateValue, Example, Mention
+from ibm_watson.assistant_v1_bulk_loader import BulkLoader
+
+platform_url = 'https://gateway.watsonplatform.net'
+service_path = '/assistant/api'
+base_url = '{0}{1}'.format(platform_url, service_path)
+workspace_url = '{0}/v1/workspaces/boguswid'.format(base_url)
+
+
+def make_loader(**kwargs):
+    service = ibm_watson.AssistantV1(
+        username='username', password='password', version='2019-02-28')
+    return BulkLoader(service, 'boguswid', **kwargs)
+
+
+@responses.activate
+def test_coalesced_load():
+    responses.add(
+        responses.POST,
+        workspace_url,
+        body=json.dumps({'workspace_id': 'boguswid'}),
+        status=200,
+        content_type='application/json')
+    loader = make_loader(coalesce_threshold=3)
+    loader.create_intent('order', description='Order a pizza')
+    loader.create_example('order', 'I want a pizza')
+    loader.create_example('order', 'one large please')
+    loader.create_value('size', 'large', synonyms=['big'])
+    loader.create_synonym('size', 'large', 'huge')
+    assert len(loader) == 5
+
+    results = loader.flush()
+    assert len(loader) == 0
+    assert len(responses.calls) == 1
+    assert 'append=true' in responses.calls[0].request.url
+    body = json.loads(responses.calls[0].request.body)
+    assert body['intents'] == [{
+        'intent': 'order',
+        'description': 'Order a pizza',
+        'examples': [{'text': 'I want a pizza'}, {'text': 'one large please'}]
+    }]
+    assert body['entities'] == [{
+        'entity': 'size',
+        'values': [{'value': 'large', 'synonyms': ['big', 'huge']}]
+    }]
+    assert [r.ok for r in results] == [True] * 5
+
+
+@responses.activate
+def test_coalesced_load_of_models():
+    responses.add(
+        responses.POST,
+        workspace_url,
+        body=json.dumps({'workspace_id': 'boguswid'}),
+        status=200,
+        content_type='application/json')
+    loader = make_loader(coalesce_threshold=2)
+    loader.create_intent('order', examples=[Example('a pizza')])
+    loader.create_example('order', 'a large one',
+                          mentions=[Mention('size', [2, 7])])
+    loader.create_entity('size', values=[CreateValue('large')])
+
+    results = loader.flush()
+    body = json.loads(responses.calls[0].request.body)
+    assert body['intents'][0]['examples'] == [
+        {'text': 'a pizza'},
+        {'text': 'a large one',
+         'mentions': [{'entity': 'size', 'location': [2, 7]}]}]
+    assert body['entities'][0]['values'] == [{'value': 'large'}]
+    assert [r.ok for r in results] == [True] * 3
+
+
+@responses.activate
+def test_item_load_reports_each_outcome():
+    responses.add(
+        responses.POST,
+        workspace_url + '/intents',
+        body=json.dumps({'intent': 'order'}),
+        status=201,
+        content_type='application/json')
+    responses.add(
+        responses.POST,
+        workspace_url + '/intents/order/examples',
+        body=json.dumps({'error': 'Unique Violation'}),
+        status=409,
+        content_type='application/json')
+    loader = make_loader(calls_per_second=1000)
+    loader.create_example('order', 'I want a pizza')
+    loader.create_intent('order')
+
+    results = loader.flush()
+    # The intent is created before its example, whatever the queue order.
+    assert [call.request.url.split('?')[0] for call in responses.calls] == \
+        [workspace_url + '/intents', workspace_url + '/intents/order/examples']
+    assert results[0].change.method == 'create_example'
+    assert not results[0].ok
+    assert results[0].error.code == 409
+    assert results[1].ok
+    assert results[1].response.get_status_code() == 201
+
+
+@responses.activate
+def test_failed_coalesced_load_falls_back_to_items():
+    responses.add(
+        responses.POST,
+        workspace_url,
+        body=json.dumps({'error': 'collision'}),
+        status=400,
+        content_type='application/json')
+    responses.add(
+        responses.POST,
+        workspace_url + '/intents/order/examples',
+        body=json.dumps({'text': 'pizza'}),
+        status=201,
+        content_type='application/json')
+    loader = make_loader(coalesce_threshold=1)
+    loader.create_example('order', 'pizza')
+    results = loader.flush()
+    assert len(responses.calls) == 2
+    assert results[0].ok
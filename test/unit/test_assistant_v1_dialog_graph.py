@@ -0,0 +1,99 @@
+# coding: utf-8
+from ibm_watson.assistant_v1 import DialogNode, DialogNodeNextStep, Workspace
+from ibm_watson.assistant_v1_dialog_graph import DialogGraph, DialogGraphIssue
+
+nodes = [
+    {'dialog_node': 'fallback', 'conditions': 'anything_else',
+     'previous_sibling': 'order'},
+    {'dialog_node': 'welcome', 'conditions': 'welcome'},
+    {'dialog_node': 'order', 'conditions': '#order',
+     'previous_sibling': 'welcome'},
+    {'dialog_node': 'size', 'conditions': '@size', 'parent': 'order'},
+    {'dialog_node': 'toppings', 'conditions': '@topping', 'parent': 'order',
+     'previous_sibling': 'size'},
+    {'dialog_node': 'shadowed', 'conditions': '#cancel',
+     'previous_sibling': 'fallback'},
+    {'dialog_node': 'confirm', 'conditions': 'false',
+     'previous_sibling': 'shadowed'},
+    {'dialog_node': 'goodbye', 'conditions': 'true',
+     'previous_sibling': 'confirm',
+     'next_step': {'behavior': 'jump_to', 'dialog_node': 'nowhere',
+                   'selector': 'body'}},
+]
+
+
+def test_navigation():
+    graph = DialogGraph(nodes)
+    assert len(graph) == 8
+    assert graph.roots == ('welcome', 'order', 'fallback', 'shadowed',
+                           'confirm', 'goodbye')
+    assert graph.children('order') == ('size', 'toppings')
+    assert graph.children('size') == ()
+    assert graph.parent('toppings') == 'order'
+    assert graph.parent('order') is None
+    assert graph.previous_sibling('toppings') == 'size'
+    assert graph.next_sibling('size') == 'toppings'
+    assert graph.next_sibling('toppings') is None
+    assert graph.ancestors('toppings') == ['order']
+
+
+def test_models_and_workspace():
+    workspace = Workspace._from_dict({
+        'name': 'pizza',
+        'language': 'en',
+        'learning_opt_out': False,
+        'workspace_id': 'boguswid',
+        'dialog_nodes': nodes
+    })
+    graph = DialogGraph.from_workspace(workspace)
+    assert isinstance(graph.node('order'), DialogNode)
+    assert graph.children('order') == ('size', 'toppings')
+    assert graph.jump_target('goodbye') == 'nowhere'
+
+
+def test_dead_nodes_and_validation():
+    graph = DialogGraph(nodes)
+    assert graph.dead_nodes() == ['shadowed', 'confirm', 'goodbye']
+    assert graph.validate() == [
+        DialogGraphIssue('goodbye', 'missing_jump_target',
+                         'jump target nowhere does not exist')
+    ]
+
+    jumping = list(nodes)
+    jumping[2] = dict(nodes[2], next_step=DialogNodeNextStep(
+        'jump_to', dialog_node='confirm', selector='body'))
+    assert DialogGraph(jumping).dead_nodes() == ['shadowed', 'goodbye']
+
+
+def test_structural_issues():
+    graph = DialogGraph([
+        {'dialog_node': 'a', 'parent': 'missing'},
+        {'dialog_node': 'b', 'previous_sibling': 'x'},
+        {'dialog_node': 'c', 'parent': 'd'},
+        {'dialog_node': 'd', 'parent': 'c'},
+    ])
+    kinds = sorted(issue.kind for issue in graph.validate())
+    assert kinds == ['missing_parent', 'missing_previous_sibling',
+                     'parent_cycle', 'parent_cycle']
+    assert graph.dead_nodes() == ['a', 'c', 'd']
+
+
+def test_large_workspace():
+    large = []
+    for i in range(100):
+        large.append({'dialog_node': 'root{0}'.format(i),
+                      'conditions': '#intent{0}'.format(i),
+                      'previous_sibling': 'root{0}'.format(i - 1) if i else None})
+        for j in range(100):
+            large.append({
+                'dialog_node': 'node{0}_{1}'.format(i, j),
+                'parent': 'root{0}'.format(i),
+                'previous_sibling': 'node{0}_{1}'.format(i, j - 1) if j else None,
+                'conditions': '@entity{0}'.format(j)
+            })
+    large.reverse()
+    graph = DialogGraph(large)
+    assert len(graph.roots) == 100
+    assert graph.children('root42')[-1] == 'node42_99'
+    assert graph.dead_nodes() == []
+    assert graph.validate() == []
@@ -0,0 +1,99 @@
+# coding: utf-8
+import json
+import os
+import pytest
+import responses
+import ibm_watson
+from ibm_watson.assistant_v1_log_exporter import LogExporter, COLUMNS
+
+platform_url = 'https://gateway.watsonplatform.net'
+service_path = '/assistant/api'
+base_url = '{0}{1}'.format(platform_url, service_path)
+
+
+def make_log(log_id, text, intent):
+    return {
+        'log_id': log_id,
+        'workspace_id': 'boguswid',
+        'language': 'en',
+        'request_timestamp': '2019-01-01T00:00:00.000Z',
+        'response_timestamp': '2019-01-01T00:00:00.100Z',
+        'request': {'input': {'text': text}},
+        'response': {
+            'input': {'text': text},
+            'intents': [{'intent': intent, 'confidence': 0.9}],
+            'entities': [{'entity': 'size', 'value': 'large',
+                          'location': [0, 5], 'confidence': 1}],
+            'output': {'text': ['Sure!']},
+            'context': {'conversation_id': 'conv-1'}
+        }
+    }
+
+
+def add_pages():
+    url = '{0}/v1/logs'.format(base_url)
+    responses.add(
+        responses.GET,
+        url,
+        body=json.dumps({
+            'logs': [make_log('1', 'large pizza', 'order'),
+                     make_log('2', 'cancel', 'cancel')],
+            'pagination': {'next_cursor': 'page2'}
+        }),
+        status=200,
+        content_type='application/json')
+    responses.add(
+        responses.GET,
+        url,
+        body=json.dumps({
+            'logs': [make_log('3', 'thanks', 'goodbye')],
+            'pagination': {}
+        }),
+        status=200,
+        content_type='application/json')
+
+
+def make_exporter():
+    service = ibm_watson.AssistantV1(
+        username='username', password='password', version='2019-02-28')
+    return LogExporter(service, page_limit=2)
+
+
+@responses.activate
+def test_export_ndjson(tmpdir):
+    add_pages()
+    path = os.path.join(str(tmpdir), 'logs.ndjson')
+    count = make_exporter().export(path, filter='language::en')
+    assert count == 3
+    assert len(responses.calls) == 2
+    assert 'cursor=page2' in responses.calls[1].request.url
+    with open(path) as exported:
+        rows = [json.loads(line) for line in exported]
+    assert [row['log_id'] for row in rows] == ['1', '2', '3']
+    assert sorted(rows[0]) == sorted(COLUMNS)
+    assert rows[0]['request_text'] == 'large pizza'
+    assert rows[0]['top_intent'] == 'order'
+    assert rows[0]['conversation_id'] == 'conv-1'
+    assert rows[0]['entities'] == [{'entity': 'size', 'value': 'large',
+                                    'confidence': 1}]
+    assert rows[0]['output_text'] == ['Sure!']
+
+
+def test_filter_is_required():
+    with pytest.raises(ValueError):
+        make_exporter().export('logs.ndjson')
+
+
+@responses.activate
+def test_export_parquet(tmpdir):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    add_pages()
+    path = os.path.join(str(tmpdir), 'logs.parquet')
+    count = make_exporter().export(path, filter='language::en',
+                                   format='parquet')
+    assert count == 3
+    table = parquet.read_table(path)
+    assert table.num_rows == 3
+    assert table.column_names == list(COLUMNS)
+    assert table.column('top_intent').to_pylist() == \
+        ['order', 'cancel', 'goodbye']
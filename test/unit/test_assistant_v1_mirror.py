@@ -0,0 +1,168 @@
+# coding: utf-8
+import json
+import os
+import responses
+import ibm_watson
+from ibm_watson.assistant_v1_mirror import WorkspaceMirror, WorkspaceChange
+
+platform_url = 'https://gateway.watsonplatform.net'
+service_path = '/assistant/api'
+base_url = '{0}{1}'.format(platform_url, service_path)
+workspace_url = '{0}/v1/workspaces/boguswid'.format(base_url)
+
+exported = {
+    'workspace_id': 'boguswid',
+    'name': 'Pizza app',
+    'language': 'en',
+    'learning_opt_out': False,
+    'updated': '2019-01-01T00:00:00.000Z',
+    'intents': [{
+        'intent': 'order',
+        'description': 'Order a pizza',
+        'updated': '2019-01-01T00:00:00.000Z',
+        'examples': [{'text': 'I want a pizza'}]
+    }, {
+        'intent': 'cancel',
+        'updated': '2019-01-01T00:00:00.000Z',
+        'examples': [{'text': 'cancel my order'}]
+    }],
+    'entities': [{
+        'entity': 'topping',
+        'updated': '2019-01-01T00:00:00.000Z',
+        'values': [{'value': 'cheese', 'type': 'synonyms',
+                    'synonyms': ['mozzarella']}]
+    }],
+    'dialog_nodes': [{'dialog_node': 'welcome', 'conditions': 'welcome'}],
+    'counterexamples': []
+}
+
+
+def add_json(method, url, body):
+    responses.add(
+        method,
+        url,
+        body=json.dumps(body),
+        status=200,
+        content_type='application/json')
+
+
+def make_mirror(tmpdir):
+    service = ibm_watson.AssistantV1(
+        username='username', password='password', version='2019-02-28')
+    path = os.path.join(str(tmpdir), 'workspace.json')
+    return WorkspaceMirror(service, 'boguswid', path)
+
+
+@responses.activate
+def test_full_sync_builds_index(tmpdir):
+    add_json(responses.GET, workspace_url, exported)
+    mirror = make_mirror(tmpdir)
+    assert mirror.sync() is True
+    assert len(responses.calls) == 1
+    assert 'export=true' in responses.calls[0].request.url
+    assert mirror.intent('order')['description'] == 'Order a pizza'
+    assert mirror.example('cancel', 'cancel my order') is not None
+    assert mirror.value('topping', 'cheese')['synonyms'] == ['mozzarella']
+    assert mirror.dialog_node('welcome')['conditions'] == 'welcome'
+    assert mirror.intent('missing') is None
+
+    # The snapshot survives a restart.
+    reloaded = make_mirror(tmpdir)
+    assert reloaded.example('order', 'I want a pizza') is not None
+
+
+@responses.activate
+def test_incremental_sync_fetches_changed_elements(tmpdir):
+    add_json(responses.GET, workspace_url, exported)
+    mirror = make_mirror(tmpdir)
+    mirror.sync()
+
+    responses.reset()
+    header = dict((k, v) for k, v in exported.items()
+                  if k not in ('intents', 'entities', 'dialog_nodes',
+                               'counterexamples'))
+    add_json(responses.GET, workspace_url, header)
+    assert mirror.sync() is False
+    assert len(responses.calls) == 1
+
+    responses.reset()
+    header['updated'] = '2019-02-01T00:00:00.000Z'
+    add_json(responses.GET, workspace_url, header)
+    add_json(responses.GET, workspace_url + '/intents', {
+        'intents': [{'intent': 'order',
+                     'updated': '2019-02-01T00:00:00.000Z'},
+                    {'intent': 'cancel',
+                     'updated': '2019-01-01T00:00:00.000Z'}],
+        'pagination': {'refresh_url': 'x'}
+    })
+    add_json(responses.GET, workspace_url + '/intents/order', {
+        'intent': 'order',
+        'updated': '2019-02-01T00:00:00.000Z',
+        'examples': [{'text': 'one large pizza please'}]
+    })
+    add_json(responses.GET, workspace_url + '/entities', {
+        'entities': [{'entity': 'topping',
+                      'updated': '2019-01-01T00:00:00.000Z'}],
+        'pagination': {'refresh_url': 'x'}
+    })
+    add_json(responses.GET, workspace_url + '/dialog_nodes', {
+        'dialog_nodes': exported['dialog_nodes'],
+        'pagination': {'refresh_url': 'x'}
+    })
+    add_json(responses.GET, workspace_url + '/counterexamples', {
+        'counterexamples': [],
+        'pagination': {'refresh_url': 'x'}
+    })
+    assert mirror.sync() is True
+    assert len(responses.calls) == 6
+    assert mirror.example('order', 'I want a pizza') is None
+    assert mirror.example('order', 'one large pizza please') is not None
+    assert mirror.example('cancel', 'cancel my order') is not None
+    assert mirror.value('topping', 'cheese') is not None
+
+
+@responses.activate
+def test_diff_and_push(tmpdir):
+    add_json(responses.GET, workspace_url, exported)
+    mirror = make_mirror(tmpdir)
+    mirror.sync()
+
+    desired = json.loads(json.dumps(exported))
+    desired['intents'][0]['examples'].append({'text': 'pizza time'})
+    del desired['intents'][1]
+    desired['entities'][0]['values'][0]['synonyms'] = ['mozzarella', 'brie']
+    desired['dialog_nodes'].append({
+        'dialog_node': 'goodbye',
+        'conditions': '#cancel',
+        'previous_sibling': 'welcome'
+    })
+
+    changes = mirror.diff(desired)
+    assert changes == [
+        WorkspaceChange('delete_intent', intent='cancel'),
+        WorkspaceChange('create_example', intent='order', text='pizza time',
+                        mentions=None),
+        WorkspaceChange('create_synonym', entity='topping', value='cheese',
+                        synonym='brie'),
+        WorkspaceChange('create_dialog_node', dialog_node='goodbye',
+                        conditions='#cancel', previous_sibling='welcome'),
+    ]
+    assert mirror.push(desired, dry_run=True) == changes
+    assert len(responses.calls) == 1
+
+    responses.reset()
+    responses.add(responses.DELETE, workspace_url + '/intents/cancel',
+                  status=200, body='{}', content_type='application/json')
+    add_json(responses.POST, workspace_url + '/intents/order/examples', {})
+    add_json(responses.POST,
+             workspace_url + '/entities/topping/values/cheese/synonyms', {})
+    add_json(responses.POST, workspace_url + '/dialog_nodes', {})
+    add_json(responses.GET, workspace_url, {'updated': exported['updated']})
+    mirror.push(desired)
+    assert [call.request.method for call in responses.calls] == \
+        ['DELETE', 'POST', 'POST', 'POST', 'GET']
+    assert json.loads(responses.calls[3].request.body) == {
+        'dialog_node': 'goodbye',
+        'conditions': '#cancel',
+        'previous_sibling': 'welcome'
+    }
@@ -15,6 +15,8 @@
 # limitations under the License.
 
 from ibm_watson import get_sdk_headers
+from ibm_watson.common import RateLimiter
+import time
 import unittest
 
 class TestCommon(unittest.TestCase):
@@ -25,3 +27,12 @@ class TestCommon(unittest.TestCase):
         self.assertIsNotNone(headers.get('User-Agent'))
         self.assertIn('watson-apis-python-sdk', headers.get('User-Agent'))
         self.assertEqual(headers.get('X-IBMCloud-SDK-Analytics'), 'service_name=my_service;service_version=v1;operation_id=my_operation')
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(50)
+        start = time.time()
+        for _ in range(5):
+            limiter.wait()
+        self.assertGreaterEqual(time.time() - start, 0.07)
+        with self.assertRaises(ValueError):
+            RateLimiter(0)
@@ -0,0 +1,74 @@
+# coding: utf-8
+import json
+import os
+import responses
+import ibm_watson
+from ibm_watson.compare_comply_v1_batch import BatchOrchestrator
+
+base_url = 'https://gateway.watsonplatform.net/compare-comply/api'
+
+
+def make_orchestrator(sleeps=None):
+    sleeps = [] if sleeps is None else sleeps
+    service = ibm_watson.CompareComplyV1('2018-10-15',
+                                         iam_access_token='token')
+    return BatchOrchestrator(service, 'element_classification',
+                             initial_interval=1, max_interval=4,
+                             sleep=sleeps.append)
+
+
+def batch(status, pending, successful):
+    return {'batch_id': 'batch1', 'status': status,
+            'document_counts': {'total': 2, 'pending': pending,
+                                'successful': successful, 'failed': 0}}
+
+
+@responses.activate
+def test_poll_with_backoff():
+    for body in (batch('active', 2, 0), batch('active', 2, 0),
+                 batch('active', 2, 0), batch('active', 1, 1),
+                 batch('completed', 0, 2)):
+        responses.add(responses.GET, '{0}/v1/batches/batch1'.format(base_url),
+                      body=json.dumps(body), status=200,
+                      content_type='application/json')
+    sleeps = []
+    statuses = list(make_orchestrator(sleeps).poll('batch1'))
+    assert [s['document_counts']['pending'] for s in statuses] == [2, 1, 0]
+    assert statuses[-1]['status'] == 'completed'
+    assert sleeps == [1, 2, 4, 1]
+
+
+@responses.activate
+def test_run_falls_back_to_local_directory(tmpdir):
+    responses.add(responses.POST, '{0}/v1/batches'.format(base_url),
+                  body=json.dumps({'error': 'not available', 'code': 400}),
+                  status=400, content_type='application/json')
+
+    def classify(request):
+        if b'broken' in request.body:
+            return (500, {}, json.dumps({'error': 'failed', 'code': 500}))
+        return (200, {}, json.dumps({'elements': []}))
+
+    responses.add_callback(
+        responses.POST, '{0}/v1/element_classification'.format(base_url),
+        callback=classify, content_type='application/json')
+    inputs = tmpdir.mkdir('in')
+    for name, content in (('a.pdf', 'a'), ('b.pdf', 'b'),
+                          ('c.pdf', 'broken')):
+        inputs.join(name).write(content)
+    outputs = os.path.join(str(tmpdir), 'out')
+
+    orchestrator = make_orchestrator()
+    statuses = list(orchestrator.run(
+        str(inputs), outputs, input_credentials_file='{}',
+        input_bucket_location='us-geo', input_bucket_name='in',
+        output_credentials_file='{}', output_bucket_location='us-geo',
+        output_bucket_name='out'))
+
+    assert len(statuses) == 4
+    assert statuses[0]['document_counts']['pending'] == 3
+    assert statuses[-1]['status'] == 'completed'
+    assert statuses[-1]['document_counts'] == {
+        'total': 3, 'pending': 0, 'successful': 2, 'failed': 1}
+    assert sorted(os.listdir(outputs)) == ['a.pdf.json', 'b.pdf.json']
+    assert list(orchestrator.failures) == ['c.pdf']
@@ -0,0 +1,56 @@
+# coding: utf-8
+import io
+import json
+import os
+import responses
+import ibm_watson
+from ibm_watson.compare_comply_v1_cache import ResultCache
+
+base_url = 'https://gateway.watsonplatform.net/compare-comply/api'
+
+
+def test_result_cache_eviction_and_reopen(tmpdir):
+    directory = str(tmpdir)
+    cache = ResultCache(directory, max_bytes=50)
+    keys = [ResultCache.key('classify_elements', '2018-10-15', None,
+                            [str(i)]) for i in range(3)]
+    cache.put(keys[0], {'text': 'x' * 10})
+    cache.put(keys[1], {'text': 'y' * 10})
+    assert cache.get(keys[0]) == {'text': 'x' * 10}
+    # Each entry is 21 bytes, so the least recently used one is evicted.
+    cache.put(keys[2], {'text': 'z' * 10})
+    assert cache.get(keys[1]) is None
+    assert cache.evictions == 1
+    assert len(os.listdir(directory)) == 2
+
+    reopened = ResultCache(directory, max_bytes=50)
+    assert reopened.size == 42
+    assert reopened.get(keys[2]) == {'text': 'z' * 10}
+
+
+@responses.activate
+def test_cached_classify_and_compare(tmpdir):
+    responses.add(responses.POST,
+                  '{0}/v1/element_classification'.format(base_url),
+                  body=json.dumps({'elements': []}), status=200,
+                  content_type='application/json')
+    responses.add(responses.POST, '{0}/v1/comparison'.format(base_url),
+                  body=json.dumps({'aligned_elements': []}), status=200,
+                  content_type='application/json')
+    service = ibm_watson.CompareComplyV1('2018-10-15',
+                                         iam_access_token='token')
+    cache = service.enable_result_cache(str(tmpdir))
+
+    for _ in range(2):
+        result = service.classify_elements(io.BytesIO(b'contract')).get_result()
+        assert result == {'elements': []}
+    assert len(responses.calls) == 1
+    service.classify_elements(b'contract', model='contracts')
+    assert len(responses.calls) == 2
+
+    service.compare_documents(b'one', b'two')
+    service.compare_documents(io.BytesIO(b'one'), io.BytesIO(b'two'))
+    assert len(responses.calls) == 3
+    service.compare_documents(b'two', b'one')
+    assert len(responses.calls) == 4
+    assert (cache.hits, cache.misses) == (2, 4)
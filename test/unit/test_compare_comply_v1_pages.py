@@ -0,0 +1,86 @@
+# coding: utf-8
+import io
+import json
+import pytest
+import responses
+import ibm_watson
+from ibm_watson.compare_comply_v1_pages import merge_results
+
+base_url = 'https://gateway.watsonplatform.net/compare-comply/api'
+
+
+def make_part(text, party):
+    html = '<html><head></head><body><p>{0}</p></body></html>'.format(text)
+    begin = html.index(text)
+    end = begin + len(text)
+    return {
+        'document': {'html': html, 'hash': 'part', 'title': text},
+        'model_id': 'contracts',
+        'elements': [{'location': {'begin': begin, 'end': end},
+                      'text': text}],
+        'tables': [{
+            'location': {'begin': begin, 'end': end},
+            'body_cells': [{
+                'cell_id': 'bodyCell-{0}-{1}'.format(begin, end),
+                'location': {'begin': begin, 'end': end},
+                'row_header_ids': [{'id': 'rowHeader-{0}-{1}'.format(
+                    begin, end)}]
+            }]
+        }],
+        'document_structure': {'section_titles': [], 'leading_sentences': [{
+            'text': text, 'element_locations': [{'begin': begin,
+                                                 'end': end}]}]},
+        'parties': [{'party': party, 'mentions': [{'text': party}]}]
+    }
+
+
+def test_merge_results():
+    merged = merge_results(
+        [make_part('first page', 'Acme'), make_part('second', 'Acme')],
+        b'%PDF-whole')
+    html = merged['document']['html']
+    assert html == ('<html><head></head><body><p>first page</p>'
+                    '<p>second</p></body></html>')
+    assert merged['document']['title'] == 'first page'
+    assert merged['document']['hash'] == '8225a4549d37326261ef762fd45c9438'
+    second = merged['elements'][1]['location']
+    assert html[second['begin']:second['end']] == 'second'
+    cell = merged['tables'][1]['body_cells'][0]
+    assert cell['cell_id'] == 'bodyCell-{begin}-{end}'.format(**second)
+    assert cell['row_header_ids'][0]['id'] == \
+        'rowHeader-{begin}-{end}'.format(**second)
+    sentences = merged['document_structure']['leading_sentences']
+    assert sentences[1]['element_locations'][0] == second
+    assert len(merged['parties']) == 1
+    assert len(merged['parties'][0]['mentions']) == 2
+
+
+@responses.activate
+def test_classify_elements_by_pages():
+    pypdf = pytest.importorskip('pypdf')
+    writer = pypdf.PdfWriter()
+    for _ in range(5):
+        writer.add_blank_page(width=200, height=200)
+    document = io.BytesIO()
+    writer.write(document)
+    data = document.getvalue()
+
+    def classify(request):
+        body = request.body
+        part = body[body.index(b'%PDF-'):body.rindex(b'%%EOF') + 5]
+        pages = len(pypdf.PdfReader(io.BytesIO(part)).pages)
+        return (200, {}, json.dumps(make_part('x' * pages, 'Acme')))
+
+    responses.add_callback(
+        responses.POST,
+        '{0}/v1/element_classification'.format(base_url),
+        callback=classify,
+        content_type='application/json')
+    service = ibm_watson.CompareComplyV1(
+        '2018-10-15', iam_access_token='token')
+    result = service.classify_elements(data, pages_per_request=2).get_result()
+
+    assert len(responses.calls) == 3
+    html = result['document']['html']
+    assert [html[e['location']['begin']:e['location']['end']]
+            for e in result['elements']] == ['xx', 'xx', 'x']
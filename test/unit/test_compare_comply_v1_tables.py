@@ -0,0 +1,79 @@
+# coding: utf-8
+import pytest
+from ibm_watson import compare_comply_v1_tables
+from ibm_watson.compare_comply_v1_tables import (BODY, COLUMN_HEADER, EMPTY,
+                                                 ROW_HEADER, decode_tables)
+
+
+def cell(cell_id, text, row, column, row_end=None, column_end=None):
+    return {
+        'cell_id': cell_id,
+        'text': text,
+        'location': {'begin': 0, 'end': 1},
+        'row_index_begin': row,
+        'row_index_end': row if row_end is None else row_end,
+        'column_index_begin': column,
+        'column_index_end': column if column_end is None else column_end
+    }
+
+
+RESULT = {
+    'tables': [{
+        'location': {'begin': 10, 'end': 200},
+        'section_title': {'text': 'Prices'},
+        'column_headers': [
+            cell('colHeader-1-2', 'Price', 0, 1, column_end=2),
+            cell('colHeader-3-4', 'Net', 1, 1),
+            cell('colHeader-5-6', 'Gross', 1, 2),
+        ],
+        'row_headers': [
+            cell('rowHeader-7-8', 'Pizza', 2, 0),
+            cell('rowHeader-9-10', 'Pasta', 3, 0),
+        ],
+        'body_cells': [
+            dict(cell('bodyCell-11-12', '10', 2, 1),
+                 row_header_ids=['rowHeader-7-8']),
+            cell('bodyCell-13-14', '12', 2, 2),
+            cell('bodyCell-15-16', '8', 3, 1),
+            cell('bodyCell-17-18', '9', 3, 2),
+        ]
+    }]
+}
+
+
+def check_grid(grid, index):
+    assert grid.shape == (4, 3)
+    assert index(grid.text, 0, 1) == 'Price'
+    assert index(grid.text, 0, 2) == 'Price'
+    assert index(grid.text, 3, 2) == '9'
+    assert index(grid.cell_ids, 2, 1) == 'bodyCell-11-12'
+    assert index(grid.kinds, 0, 0) == EMPTY
+    assert index(grid.kinds, 1, 2) == COLUMN_HEADER
+    assert index(grid.kinds, 3, 0) == ROW_HEADER
+    assert index(grid.kinds, 2, 2) == BODY
+    assert grid.column_headers == [(), ('Price', 'Net'), ('Price', 'Gross')]
+    assert grid.row_headers == [(), (), ('Pizza',), ('Pasta',)]
+    assert grid.body_rows() == [2, 3]
+    assert grid.body_columns() == [1, 2]
+    assert grid.section_title == 'Prices'
+
+
+def test_decode_tables_with_numpy():
+    pytest.importorskip('numpy')
+    grid, = decode_tables(RESULT)
+    check_grid(grid, lambda array, row, column: array[row, column])
+
+
+def test_decode_tables_without_numpy(monkeypatch):
+    monkeypatch.setattr(compare_comply_v1_tables, 'numpy', None)
+    grid, = decode_tables(RESULT)
+    check_grid(grid, lambda array, row, column: array[row][column])
+
+
+def test_to_arrow():
+    pytest.importorskip('pyarrow')
+    table = decode_tables(RESULT)[0].to_arrow()
+    assert table.column_names == ['row_header', 'Price / Net',
+                                  'Price / Gross']
+    assert table.column('Price / Gross').to_pylist() == ['12', '9']
+    assert table.column('row_header').to_pylist() == ['Pizza', 'Pasta']
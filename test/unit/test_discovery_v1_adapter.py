@@ -0,0 +1,309 @@
+# coding: utf-8
+import json
+import pytest
+import responses
+import ibm_watson
+from ibm_watson.discovery_v1_adapter import merge_aggregations
+from ibm_watson.discovery_v1_query_cache import QueryCache, STALE
+from ibm_watson.discovery_v1_stream import iter_object
+
+platform_url = 'https://gateway.watsonplatform.net'
+service_path = '/discovery/api'
+base_url = '{0}{1}'.format(platform_url, service_path)
+version = '2018-12-03'
+
+
+def query_url(environment_id, collection_id):
+    return '{0}/v1/environments/{1}/collections/{2}/query'.format(
+        base_url, environment_id, collection_id)
+
+
+def make_result(document_id, score):
+    return {'id': document_id, 'result_metadata': {'score': score}}
+
+
+def make_service():
+    return ibm_watson.DiscoveryV1(
+        version, username='username', password='password')
+
+
+#########################
+# scatter query
+#########################
+
+
+@responses.activate
+def test_scatter_query_merges_by_score():
+    responses.add(
+        responses.POST,
+        query_url('env1', 'colla'),
+        body=json.dumps({
+            'matching_results': 30,
+            'results': [make_result('a1', 9), make_result('a2', 5),
+                        make_result('a3', 1)],
+            'aggregations': [{
+                'type': 'term',
+                'field': 'topic',
+                'results': [{'key': 'x', 'matching_results': 20},
+                            {'key': 'y', 'matching_results': 10}]
+            }, {'type': 'max', 'field': 'price', 'value': 10}]
+        }),
+        status=200,
+        content_type='application/json')
+    responses.add(
+        responses.POST,
+        query_url('env2', 'collb'),
+        body=json.dumps({
+            'matching_results': 12,
+            'results': [make_result('b1', 7), make_result('b2', 6),
+                        make_result('b3', 2)],
+            'aggregations': [{
+                'type': 'term',
+                'field': 'topic',
+                'results': [{'key': 'y', 'matching_results': 11},
+                            {'key': 'z', 'matching_results': 1}]
+            }, {'type': 'max', 'field': 'price', 'value': 12}]
+        }),
+        status=200,
+        content_type='application/json')
+
+    response = make_service().scatter_query(
+        [('env1', 'colla'), ('env2', 'collb')],
+        natural_language_query='pizza',
+        aggregation='term(topic),max(price)',
+        count=2,
+        offset=1).get_result()
+
+    assert len(responses.calls) == 2
+    for call in responses.calls:
+        body = json.loads(call.request.body)
+        assert body['count'] == 3
+        assert body['offset'] == 0
+        assert body['natural_language_query'] == 'pizza'
+    assert response['matching_results'] == 42
+    assert [r['id'] for r in response['results']] == ['b1', 'b2']
+    assert response['results'][0]['environment_id'] == 'env2'
+    assert response['results'][0]['collection_id'] == 'collb'
+    term, maximum = response['aggregations']
+    assert term['results'] == [{'key': 'y', 'matching_results': 21},
+                               {'key': 'x', 'matching_results': 20}]
+    assert maximum['value'] == 12
+
+
+def test_merge_nested_histograms():
+    merged = merge_aggregations([
+        [{'type': 'filter', 'match': 'a', 'matching_results': 3,
+          'aggregations': [{'type': 'histogram', 'field': 'n', 'interval': 5,
+                            'results': [{'key': 5, 'matching_results': 3}]}]}],
+        [{'type': 'filter', 'match': 'a', 'matching_results': 4,
+          'aggregations': [{'type': 'histogram', 'field': 'n', 'interval': 5,
+                            'results': [{'key': 0, 'matching_results': 1},
+                                        {'key': 5, 'matching_results': 3}]}]}],
+    ])
+    assert merged[0]['matching_results'] == 7
+    assert merged[0]['aggregations'][0]['results'] == [
+        {'key': 0, 'matching_results': 1},
+        {'key': 5, 'matching_results': 6}
+    ]
+
+
+def test_merge_metrics_without_values():
+    shards = [[{'type': kind, 'field': 'n'}
+               for kind in ('max', 'min', 'sum', 'average')]] * 2
+    assert [a['value'] for a in merge_aggregations(shards)] == \
+        [None, None, None, None]
+
+
+#########################
+# query cache
+#########################
+
+
+def add_query_response(body=None):
+    responses.add(
+        responses.POST,
+        query_url('envid', 'collid'),
+        body=json.dumps(body or {'matching_results': 1,
+                                 'results': [make_result('doc', 1)]}),
+        status=200,
+        content_type='application/json')
+
+
+@responses.activate
+def test_query_cache_hit_and_invalidation():
+    add_query_response()
+    responses.add(
+        responses.DELETE,
+        '{0}/v1/environments/envid/collections/collid/documents/doc'.format(
+            base_url),
+        body=json.dumps({'document_id': 'doc', 'status': 'deleted'}),
+        status=200,
+        content_type='application/json')
+    service = make_service()
+    cache = service.enable_query_cache(ttl=60)
+
+    first = service.query('envid', 'collid', 'enriched_text.entities:x',
+                          count=5).get_result()
+    first['results'] = []
+    second = service.query('envid', 'collid', count=5,
+                           filter='enriched_text.entities:x').get_result()
+    assert len(responses.calls) == 1
+    assert second['results'][0]['id'] == 'doc'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    service.query('envid', 'collid', count=6)
+    assert len(responses.calls) == 2
+    assert len(cache) == 2
+
+    service.delete_document('envid', 'collid', 'doc')
+    assert len(cache) == 0
+    service.query('envid', 'collid', count=5,
+                  filter='enriched_text.entities:x')
+    assert len(responses.calls) == 4
+
+
+def test_query_cache_bounds():
+    now = [0]
+    cache = QueryCache(ttl=10, max_bytes=60, stale_ttl=10, hot_threshold=1,
+                       clock=lambda: now[0])
+    scope = ('envid', 'collid')
+    keys = [cache.key(scope, {'count': i}) for i in range(3)]
+    for key in keys:
+        cache.put(key, scope, cache.generation(scope), {'results': ['x' * 10]})
+    # Each entry is 26 bytes, so the least recently used one was evicted.
+    assert cache.get(keys[0]) is None
+    assert cache.evictions == 1
+    assert cache.get(keys[1])[3] == 'fresh'
+
+    now[0] = 15
+    assert cache.get(keys[1])[3] == STALE
+    assert cache.claim_refresh(keys[1]) is True
+    assert cache.claim_refresh(keys[1]) is False
+    # A cold entry past its TTL is dropped rather than served stale.
+    assert cache.get(keys[2]) is None
+
+    generation = cache.generation(scope)
+    cache.invalidate(scope)
+    cache.put(keys[1], scope, generation, {'results': []})
+    assert len(cache) == 0
+
+
+#########################
+# streaming
+#########################
+
+
+def test_iter_object_in_small_chunks():
+    document = {
+        'matching_results': 12345,
+        'aggregations': [{'type': 'term', 'results': [{'key': u'café'}]}],
+        'results': [{'id': str(i), 'text': u'über "quoted" ' * i,
+                     'result_metadata': {'score': i / 3.0}}
+                    for i in range(20)],
+        'passages': [],
+        'retrieval_details': {'document_retrieval_strategy': 'untrained'}
+    }
+    encoded = json.dumps(document, indent=1).encode('utf-8')
+    for size in (1, 3, 7, 4096):
+        chunks = [encoded[i:i + size] for i in range(0, len(encoded), size)]
+        members = {}
+        items = list(iter_object(chunks, 'results', members.__setitem__))
+        assert items == document['results']
+        assert members == dict((k, v) for k, v in document.items()
+                               if k != 'results')
+
+
+def test_iter_object_rejects_truncated_documents():
+    with pytest.raises(ValueError):
+        list(iter_object([b'{"results": [{"id": "1"}, {"id"'], 'results'))
+
+
+@responses.activate
+def test_query_stream():
+    body = {
+        'matching_results': 2,
+        'results': [make_result('doc1', 2), make_result('doc2', 1)],
+        'aggregations': [{'type': 'term', 'results': []}]
+    }
+    add_query_response(body)
+    service = make_service()
+    stream = service.query_stream('envid', 'collid', 'enriched_text:x',
+                                  count=2, return_fields='id',
+                                  passages_count=3)
+    request = json.loads(responses.calls[0].request.body)
+    assert request == {'filter': 'enriched_text:x', 'count': 2,
+                       'return': 'id', 'passages.count': 3}
+    results = list(stream)
+    assert [r.id for r in results] == ['doc1', 'doc2']
+    assert results[0].result_metadata.score == 2
+    assert stream.matching_results == 2
+    assert stream.aggregations == body['aggregations']
+
+
+#########################
+# export
+#########################
+
+
+def add_collection(documents):
+    """Serve queries against a collection whose sha1 values are known."""
+
+    def callback(request):
+        body = json.loads(request.body)
+        matches = documents
+        for clause in (body.get('filter') or '').split(','):
+            if clause.startswith('extracted_metadata.sha1:'):
+                prefix = clause.split(':', 1)[1].rstrip('*')
+                matches = [d for d in matches if d['sha1'].startswith(prefix)]
+        matches = sorted(matches, key=lambda d: d['sha1'])
+        offset = body.get('offset') or 0
+        if offset + body['count'] > ibm_watson.discovery_v1_adapter.MAX_RESULT_WINDOW:
+            return (400, {}, json.dumps({'error': 'window exceeded'}))
+        page = matches[offset:offset + body['count']]
+        return (200, {}, json.dumps({
+            'matching_results': len(matches),
+            'results': [{'id': d['sha1']} for d in page]
+        }))
+
+    responses.add_callback(
+        responses.POST,
+        query_url('envid', 'collid'),
+        callback=callback,
+        content_type='application/json')
+
+
+@responses.activate
+def test_iter_all_documents_with_offsets():
+    documents = [{'sha1': '{0:02x}'.format(i)} for i in range(12)]
+    add_collection(documents)
+    exported = list(make_service().iter_all_documents(
+        'envid', 'collid', page_size=5))
+    assert sorted(d['id'] for d in exported) == \
+        sorted(d['sha1'] for d in documents)
+    # One count query, then three pages.
+    assert len(responses.calls) == 4
+    # The last page asks only for the documents left.
+    assert sorted(json.loads(c.request.body)['count']
+                  for c in responses.calls[1:]) == [2, 5, 5]
+
+
+def test_iter_all_documents_checks_arguments_when_called():
+    with pytest.raises(ValueError):
+        make_service().iter_all_documents(None, 'c')
+    with pytest.raises(ValueError):
+        make_service().iter_all_documents('e', None)
+
+
+@responses.activate
+def test_iter_all_documents_with_partitions(monkeypatch):
+    monkeypatch.setattr(ibm_watson.discovery_v1_adapter, 'MAX_RESULT_WINDOW',
+                        10)
+    documents = [{'sha1': '{0:03x}'.format(i * 7)} for i in range(60)]
+    add_collection(documents)
+    exported = list(make_service().iter_all_documents(
+        'envid', 'collid', page_size=4, concurrency=3))
+    assert sorted(d['id'] for d in exported) == \
+        sorted(d['sha1'] for d in documents)
+    for call in responses.calls:
+        body = json.loads(call.request.body)
+        assert (body.get('offset') or 0) + body['count'] <= 10
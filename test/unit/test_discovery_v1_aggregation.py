@@ -0,0 +1,101 @@
+# coding: utf-8
+import json
+import math
+import responses
+import ibm_watson
+from ibm_watson.discovery_v1_aggregation import (
+    compile_aggregations, decode_aggregations, filter_, max_, nested, term,
+    timeslice)
+
+base_url = 'https://gateway.watsonplatform.net/discovery/api'
+
+
+def test_compile():
+    entities = term('enriched_text.entities.text', count=10)
+    daily = entities.timeslice('publication_date', '1day', anomaly=True)
+    assert str(entities) == 'term(enriched_text.entities.text,count:10)'
+    assert str(daily) == ('term(enriched_text.entities.text,count:10)'
+                          '.timeslice(publication_date,1day,anomaly:true)')
+    assert daily == term('enriched_text.entities.text', count=10).timeslice(
+        'publication_date', '1day', anomaly=True)
+    assert daily.compile() is daily.compile()
+
+    companies = nested('enriched_text.entities').filter(
+        'enriched_text.entities.type::Company').term(
+            'enriched_text.entities.text')
+    assert compile_aggregations(companies, max_('price')) == (
+        'nested(enriched_text.entities)'
+        '.filter(enriched_text.entities.type::Company)'
+        '.term(enriched_text.entities.text),max(price)')
+    assert str(timeslice('date', '1month')) == 'timeslice(date,1month)'
+    assert str(filter_('x:y')) == 'filter(x:y)'
+
+
+def test_decode():
+    levels = decode_aggregations([{
+        'type': 'term',
+        'field': 'topic',
+        'results': [{
+            'key': 'pizza',
+            'matching_results': 5,
+            'aggregations': [{
+                'type': 'timeslice',
+                'field': 'date',
+                'interval': '1day',
+                'results': [{'key': 1000, 'key_as_string': 'day1',
+                             'matching_results': 3},
+                            {'key': 2000, 'key_as_string': 'day2',
+                             'matching_results': 2}]
+            }, {'type': 'max', 'field': 'price', 'value': 12.5}]
+        }, {
+            'key': 'pasta',
+            'matching_results': 1,
+            'aggregations': [{
+                'type': 'timeslice',
+                'field': 'date',
+                'interval': '1day',
+                'results': [{'key': 1000, 'key_as_string': 'day1',
+                             'matching_results': 1}]
+            }, {'type': 'max', 'field': 'price'}]
+        }, {
+            'key': 'salad',
+            'matching_results': 0
+        }]
+    }, {'type': 'filter', 'match': 'a:b', 'matching_results': 4}])
+
+    assert sorted(levels) == ['0', '0.0', '0.1', '1']
+    topics = levels['0']
+    assert topics.keys == ['pizza', 'pasta', 'salad']
+    assert list(topics.counts) == [5, 1, 0]
+    assert list(topics.parents) == [-1, -1, -1]
+
+    days = levels['0.0']
+    assert days.keys == [1000, 2000, 1000]
+    assert days.labels == ['day1', 'day2', 'day1']
+    assert list(days.counts) == [3, 2, 1]
+    assert list(days.parents) == [0, 0, 1]
+    assert list(days.offsets(len(topics))) == [0, 2, 3, 3]
+
+    prices = levels['0.1']
+    assert list(prices.parents) == [0, 1]
+    assert prices.values[0] == 12.5
+    assert math.isnan(prices.values[1])
+
+    assert levels['1'].keys == ['a:b']
+    assert list(levels['1'].counts) == [4]
+
+
+@responses.activate
+def test_query_with_aggregation():
+    responses.add(
+        responses.POST,
+        '{0}/v1/environments/envid/collections/collid/query'.format(base_url),
+        body=json.dumps({'matching_results': 0, 'results': []}),
+        status=200,
+        content_type='application/json')
+    service = ibm_watson.DiscoveryV1(
+        '2018-12-03', username='username', password='password')
+    service.query('envid', 'collid',
+                  aggregation=term('topic', count=3).max('price'))
+    body = json.loads(responses.calls[0].request.body)
+    assert body['aggregation'] == 'term(topic,count:3).max(price)'
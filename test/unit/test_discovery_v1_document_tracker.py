@@ -0,0 +1,145 @@
+# coding: utf-8
+import json
+import re
+import time
+import pytest
+import responses
+import ibm_watson
+from ibm_cloud_sdk_core import ApiException
+from ibm_watson.discovery_v1_document_tracker import DocumentStatusTracker, \
+    _Tracked
+
+base_url = 'https://gateway.watsonplatform.net/discovery/api'
+collection_url = '{0}/v1/environments/envid/collections/collid'.format(
+    base_url)
+
+
+def add_collection(documents):
+    """
+    Serve a collection whose documents finish the given number of seconds
+    from now.
+    """
+    started = time.time()
+
+    def finished(document):
+        return time.time() - started >= document['after']
+
+    def get_collection(request):
+        done = [d for d in documents.values() if finished(d)]
+        failed = len([d for d in done if d.get('fail')])
+        return (200, {}, json.dumps({
+            'collection_id': 'collid',
+            'document_counts': {
+                'available': len(done) - failed,
+                'failed': failed,
+                'processing': len(documents) - len(done),
+                'pending': 0
+            }
+        }))
+
+    def get_document_status(request):
+        document_id = request.url.split('?')[0].rsplit('/', 1)[1]
+        document = documents.get(document_id)
+        if document is None:
+            return (404, {}, json.dumps({'error': 'not found', 'code': 404}))
+        if not finished(document):
+            status = 'processing'
+        else:
+            status = 'failed' if document.get('fail') else 'available'
+        return (200, {}, json.dumps({'document_id': document_id,
+                                     'status': status}))
+
+    responses.add_callback(
+        responses.GET,
+        re.compile(re.escape(collection_url) + r'\?'),
+        callback=get_collection,
+        content_type='application/json')
+    responses.add_callback(
+        responses.GET,
+        re.compile(re.escape(collection_url) + r'/documents/[^/?]+\?'),
+        callback=get_document_status,
+        content_type='application/json')
+
+
+def make_tracker(**kwargs):
+    service = ibm_watson.DiscoveryV1(
+        '2018-12-03', username='username', password='password')
+    return DocumentStatusTracker(service, 'envid', 'collid', max_workers=2,
+                                 initial_interval=0.01, max_interval=0.05,
+                                 **kwargs)
+
+
+@responses.activate
+def test_track_documents():
+    documents = {
+        'a': {'after': 0},
+        'b': {'after': 0.1},
+        'c': {'after': 0.05, 'fail': True},
+    }
+    add_collection(documents)
+    with make_tracker() as tracker:
+        futures = tracker.track(['a', 'b', 'c', 'missing'])
+        assert futures['a'].result(5)['status'] == 'available'
+        assert futures['b'].result(5)['status'] == 'available'
+        assert futures['c'].result(5)['status'] == 'failed'
+        with pytest.raises(ApiException):
+            futures['missing'].result(5)
+        assert tracker.track(['a'])['a'] is futures['a']
+
+
+@responses.activate
+def test_unchanged_counts_skip_status_requests():
+    documents = dict(('doc{0}'.format(i), {'after': 0.3}) for i in range(4))
+    add_collection(documents)
+    with make_tracker(max_skips=1000) as tracker:
+        tracker.track(list(documents))
+        statuses = list(tracker.as_completed(timeout=10))
+    assert sorted(s['document_id'] for s in statuses) == sorted(documents)
+    # Every document is polled once in the first round, then not again until
+    # the counts show the collection is idle.
+    assert tracker.status_requests <= 8
+    assert tracker.collection_requests > 2
+
+
+@responses.activate
+def test_unchanged_counts_still_poll_after_max_skips():
+    started = time.time()
+    # Another document is deleted as the tracked one finishes, so the counts
+    # never change.
+    responses.add(
+        responses.GET,
+        re.compile(re.escape(collection_url) + r'\?'),
+        body=json.dumps({'document_counts': {'available': 5, 'failed': 0,
+                                             'processing': 1, 'pending': 0}}),
+        content_type='application/json')
+
+    def get_document_status(request):
+        finished = time.time() - started >= 0.1
+        return (200, {}, json.dumps({
+            'document_id': 'doc',
+            'status': 'available' if finished else 'processing'}))
+
+    responses.add_callback(
+        responses.GET,
+        re.compile(re.escape(collection_url) + r'/documents/doc\?'),
+        callback=get_document_status,
+        content_type='application/json')
+    with make_tracker(max_skips=2) as tracker:
+        future = tracker.track(['doc'])['doc']
+        assert future.result(5)['status'] == 'available'
+    assert tracker.status_requests > 1
+
+
+def test_skip_splits_a_large_round_in_one_pass():
+    tracker = make_tracker(max_skips=1)
+    due = [_Tracked('doc{0}'.format(i), 0.01) for i in range(40000)]
+    for tracked in due[::2]:
+        tracked.polls = 1
+    started = time.time()
+    polled = tracker._skip(due)
+    # Comparing every due document with every skipped one takes far longer.
+    assert time.time() - started < 2
+    assert polled == due[1::2]
+    assert len(tracker._schedule) == 20000
+    assert tracker._skip(due[::2]) == due[::2]
+    tracker.close()
@@ -0,0 +1,72 @@
+# coding: utf-8
+import json
+import responses
+import ibm_watson
+from ibm_watson.discovery_v1_metrics import MetricSeries, MetricsCollector
+
+base_url = 'https://gateway.watsonplatform.net/discovery/api'
+DAY = 24 * 60 * 60 * 1000
+
+
+def test_metric_series_ring_buffer():
+    series = MetricSeries(3)
+    for day in range(5):
+        series.add(day * DAY, day)
+    assert list(series.keys()) == [2 * DAY, 3 * DAY, 4 * DAY]
+    assert list(series.counts()) == [2, 3, 4]
+    series.add(4 * DAY, 40, 0.5)
+    series.add(3 * DAY, 30)
+    series.add(0, 99)
+    assert list(series.counts()) == [2, 30, 40]
+    assert list(series.rates()) == [0, 0, 0.5]
+    assert series.last_key == 4 * DAY
+    copy = series.copy()
+    series.add(5 * DAY, 5)
+    assert list(copy.counts()) == [2, 30, 40]
+
+
+@responses.activate
+def test_collector_requests_missing_interval():
+    days = {'number_of_queries': 3}
+
+    def metric(request):
+        name = request.url.split('?')[0].rsplit('/', 1)[1]
+        results = [{'key': day * DAY, 'matching_results': day + 1}
+                   for day in range(days.get(name, 1))]
+        event_type = 'click' if name == 'event_rate' else None
+        return (200, {}, json.dumps({'aggregations': [{
+            'interval': '1d', 'event_type': event_type, 'results': results}]}))
+
+    for path in ('number_of_queries', 'number_of_queries_with_event',
+                 'number_of_queries_with_no_search_results', 'event_rate',
+                 'top_query_tokens_with_event_rate'):
+        responses.add_callback(
+            responses.GET,
+            '{0}/v1/metrics/{1}'.format(base_url, path),
+            callback=metric,
+            content_type='application/json')
+
+    now = [3 * DAY / 1000.0]
+    service = ibm_watson.DiscoveryV1(
+        '2018-12-03', username='username', password='password')
+    collector = MetricsCollector(service, history=3 * 24 * 60 * 60,
+                                 max_age=60, clock=lambda: now[0])
+    assert collector.refresh() is True
+    assert len(responses.calls) == 5
+    assert 'start_time=1970-01-01T00%3A00%3A00Z' in responses.calls[0].request.url
+    queries = collector.series('get_metrics_query')
+    assert list(queries.counts()) == [1, 2, 3]
+    assert len(collector.series('get_metrics_event_rate', 'click')) == 1
+
+    # Refreshes within max_age are served locally.
+    assert collector.refresh() is False
+    assert len(responses.calls) == 5
+
+    now[0] += 120
+    days['number_of_queries'] = 4
+    collector.refresh()
+    # Only the newest bucket onwards is requested again.
+    url = [c.request.url for c in responses.calls[5:]
+           if '/number_of_queries?' in c.request.url][0]
+    assert 'start_time=1970-01-03T00%3A00%3A00Z' in url
+    assert list(collector.series('get_metrics_query').counts()) == [1, 2, 3, 4]
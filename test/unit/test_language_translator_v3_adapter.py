@@ -0,0 +1,214 @@
+# coding: utf-8
+import itertools
+import json
+import os
+import re
+import pytest
+import responses
+import ibm_watson
+
+base_url = 'https://gateway.watsonplatform.net/language-translator/api'
+
+
+def make_service():
+    return ibm_watson.LanguageTranslatorV3(
+        '2018-05-01', username='username', password='password')
+
+
+def add_translate():
+
+    def translate(request):
+        body = json.loads(request.body)
+        return (200, {}, json.dumps({
+            'translations': [{'translation': t.upper()}
+                             for t in body['text']],
+            'word_count': len(body['text']),
+            'character_count': sum(len(t) for t in body['text'])
+        }))
+
+    responses.add_callback(
+        responses.POST,
+        '{0}/v3/translate'.format(base_url),
+        callback=translate,
+        content_type='application/json')
+
+
+@responses.activate
+def test_translate_stream_packs_and_dedupes():
+    add_translate()
+    texts = ['sentence {0}'.format(i % 30) for i in range(100)]
+    pairs = list(make_service().translate_stream(
+        iter(texts), model_id='en-es', max_bytes=200, concurrency=3))
+
+    assert [text for text, _ in pairs] == texts
+    assert [t['translation'] for _, t in pairs] == [t.upper() for t in texts]
+    sent = [json.loads(call.request.body) for call in responses.calls]
+    assert sorted(t for body in sent for t in body['text']) == \
+        sorted(set(texts))
+    for call in responses.calls:
+        assert len(call.request.body) <= 200
+    assert len(sent) < 30
+
+
+def test_translate_stream_requires_target():
+    with pytest.raises(ValueError):
+        make_service().translate_stream(['hello'])
+
+
+@responses.activate
+def test_translation_memory(tmpdir):
+    add_translate()
+    responses.add(
+        responses.DELETE,
+        '{0}/v3/models/custom-en-es'.format(base_url),
+        body=json.dumps({'status': 'OK'}),
+        status=200,
+        content_type='application/json')
+    path = str(tmpdir.join('memory.db'))
+    service = make_service()
+    memory = service.enable_translation_memory(path)
+
+    result = service.translate(['hello', 'world', 'hello'],
+                               model_id='custom-en-es').get_result()
+    assert [t['translation'] for t in result['translations']] == \
+        ['HELLO', 'WORLD', 'HELLO']
+    assert json.loads(responses.calls[0].request.body)['text'] == \
+        ['hello', 'world']
+
+    service = make_service()
+    memory = service.enable_translation_memory(path)
+    result = service.translate(['hello ', 'again', ' world'],
+                               model_id='custom-en-es').get_result()
+    assert [t['translation'] for t in result['translations']] == \
+        ['HELLO', 'AGAIN', 'WORLD']
+    assert json.loads(responses.calls[1].request.body)['text'] == ['again']
+    assert (memory.hits, memory.misses) == (2, 1)
+
+    service.translate(['Line one\n\n  Line two', 'Line one Line two'],
+                      model_id='custom-en-es')
+    assert json.loads(responses.calls[2].request.body)['text'] == \
+        ['Line one\n\n  Line two']
+
+    service.delete_model('custom-en-es')
+    assert len(memory) == 0
+
+
+@responses.activate
+def test_identify_cache_and_local_profile():
+    english = ['the cat sat on the mat', 'the dog ate the hat',
+               'the man saw the cat']
+    spanish = ['el gato come el pan', 'el perro ve el gato',
+               'el hombre come pan']
+
+    def identify(request):
+        text = request.body
+        if isinstance(text, bytes):
+            text = text.decode('utf-8')
+        language = 'en' if text.startswith('the') else 'es'
+        return (200, {}, json.dumps({'languages': [
+            {'language': language, 'confidence': 0.95},
+            {'language': 'fr', 'confidence': 0.05}]}))
+
+    responses.add_callback(
+        responses.POST,
+        '{0}/v3/identify'.format(base_url),
+        callback=identify,
+        content_type='application/json')
+    service = make_service()
+    identifier = service.enable_identify_cache(min_samples=3,
+                                               local_confidence=0.9)
+    for text in english + spanish:
+        response = service.identify(text)
+        assert response.get_headers()['Content-Type'] == 'application/json'
+    assert identifier.requests == 6
+
+    response = service.identify('The  cat sat on the MAT')
+    assert response.get_result()['languages'][0]['language'] == 'en'
+    assert response.get_headers() is None
+    assert identifier.hits == 1
+
+    result = service.identify('the cat ate the hat').get_result()
+    assert result['languages'][0]['language'] == 'en'
+    result = service.identify('el gato ve el pan').get_result()
+    assert result['languages'][0]['language'] == 'es'
+    assert identifier.local == 2
+    assert len(responses.calls) == 6
+
+    service.identify('zzz qqq xxx')
+    assert len(responses.calls) == 7
+    assert identifier.hit_rate == 0.3
+
+
+@responses.activate
+def test_translate_documents(tmpdir):
+    documents = {}
+    ids = itertools.count()
+    documents_url = '{0}/v3/documents'.format(base_url)
+
+    def translate_document(request):
+        document_id = 'doc{0}'.format(next(ids))
+        body = request.body
+        documents[document_id] = {'polls': 0,
+                                  'fail': b'broken' in body}
+        return (200, {}, json.dumps({'document_id': document_id,
+                                     'status': 'processing'}))
+
+    def document_id(request):
+        return request.url.split('?')[0].split('/')[-1]
+
+    def get_document_status(request):
+        document = documents[document_id(request)]
+        document['polls'] += 1
+        status = 'processing'
+        if document['polls'] >= 2:
+            status = 'failed' if document['fail'] else 'available'
+        return (200, {}, json.dumps({'document_id': document_id(request),
+                                     'status': status}))
+
+    def get_translated_document(request):
+        return (200, {}, u'translated {0}'.format(
+            request.url.split('?')[0].split('/')[-2]))
+
+    def delete_document(request):
+        del documents[document_id(request)]
+        return (204, {}, '')
+
+    document_pattern = re.compile(documents_url + r'/doc\d+(\?.*)?$')
+    responses.add_callback(responses.POST, documents_url,
+                           callback=translate_document,
+                           content_type='application/json')
+    responses.add_callback(responses.GET, document_pattern,
+                           callback=get_document_status,
+                           content_type='application/json')
+    responses.add_callback(responses.GET,
+                           re.compile(documents_url +
+                                      r'/doc\d+/translated_document'),
+                           callback=get_translated_document,
+                           content_type='text/plain')
+    responses.add_callback(responses.DELETE, document_pattern,
+                           callback=delete_document)
+
+    paths = []
+    for i in range(5):
+        path = tmpdir.join('manual{0}.txt'.format(i))
+        path.write('broken' if i == 3 else 'manual')
+        paths.append(str(path))
+    output = tmpdir.mkdir('out')
+
+    final = {}
+    for progress in make_service().translate_documents(
+            paths, 'fr', concurrency=2, max_pending=3,
+            output_directory=str(output), initial_interval=0.01):
+        if progress.finished:
+            final[progress.path] = progress
+
+    assert sorted(final) == paths
+    assert final[paths[3]].status == 'failed'
+    for i in (0, 1, 2, 4):
+        assert final[paths[i]].status == 'done'
+        written = output.join('manual{0}.fr.txt'.format(i)).read()
+        assert written == 'translated {0}'.format(
+            final[paths[i]].document_id)
+    assert sorted(os.listdir(str(output))) == \
+        ['manual{0}.fr.txt'.format(i) for i in (0, 1, 2, 4)]
+    assert documents == {}
@@ -0,0 +1,105 @@
+# coding: utf-8
+import json
+import re
+import responses
+import ibm_watson
+from ibm_watson.natural_language_understanding_v1 import Features, \
+    EntitiesOptions, KeywordsOptions, SentimentOptions
+from ibm_watson.natural_language_understanding_v1_chunks import split_text
+
+base_url = 'https://gateway.watsonplatform.net/natural-language-understanding/api'
+
+
+def test_split_text_prefers_paragraphs_then_sentences():
+    text = 'One two. Three four.\n\nFive six. Seven eight nine ten.'
+    chunks = split_text(text, 25)
+    assert [c for _, c in chunks] == \
+        ['One two. Three four.\n\n', 'Five six. ', 'Seven eight nine ten.']
+    assert all(text[o:o + len(c)] == c for o, c in chunks)
+    assert split_text('abcdefgh', 3) == [(0, 'abc'), (3, 'def'), (6, 'gh')]
+
+
+@responses.activate
+def test_analyze_long_text_merges_chunks():
+
+    def analyze(request):
+        text = json.loads(request.body)['text']
+        position = text.find('IBM')
+        entities = []
+        if position >= 0:
+            entities.append({'type': 'Company', 'text': 'IBM',
+                             'relevance': 0.5, 'count': 1,
+                             'mentions': [{'text': 'IBM',
+                                           'location': [position,
+                                                        position + 3]}]})
+        return (200, {}, json.dumps({
+            'language': 'en',
+            'usage': {'features': 2, 'text_characters': len(text),
+                      'text_units': 1},
+            'entities': entities,
+            'keywords': [{'text': text.split()[0], 'relevance': 0.9,
+                          'count': 1}],
+            'sentiment': {'document': {
+                'label': 'positive' if 'good' in text else 'negative',
+                'score': 0.5 if 'good' in text else -1.0}}
+        }))
+
+    responses.add_callback(responses.POST, '{0}/v1/analyze'.format(base_url),
+                           callback=analyze, content_type='application/json')
+    service = ibm_watson.NaturalLanguageUnderstandingV1(
+        '2018-03-16', username='username', password='password')
+    text = 'IBM is good. Good indeed.\n\nThen bad. Later IBM again.'
+    features = Features(entities=EntitiesOptions(mentions=True),
+                        keywords=KeywordsOptions(limit=2),
+                        sentiment=SentimentOptions())
+    result = service.analyze(features, text=text, max_characters=30,
+                             max_workers=2).get_result()
+
+    assert len(responses.calls) == 2
+    entity, = result['entities']
+    assert entity['count'] == 2
+    assert entity['relevance'] == 0.75
+    assert [text[b:e] for b, e in
+            (m['location'] for m in entity['mentions'])] == ['IBM', 'IBM']
+    assert [k['text'] for k in result['keywords']] == ['IBM', 'Then']
+    document = result['sentiment']['document']
+    assert abs(document['score'] - (0.5 * 27 - 26.0) / 53) < 1e-9
+    assert document['label'] == 'negative'
+    assert result['usage'] == {'features': 2, 'text_characters': len(text),
+                               'text_units': 2}
+    assert 'analyzed_text' not in result
+
+
+@responses.activate
+def test_analyze_long_html_joins_analyzed_texts():
+
+    def analyze(request):
+        body = json.loads(request.body)
+        assert body['return_analyzed_text']
+        text = re.sub(r'<[^>]*>', '', body['html'])
+        position = text.find('IBM')
+        return (200, {}, json.dumps({
+            'language': 'en',
+            'analyzed_text': text,
+            'entities': [{'type': 'Company', 'text': 'IBM',
+                          'relevance': 0.5, 'count': 1,
+                          'mentions': [{'text': 'IBM',
+                                        'location': [position,
+                                                     position + 3]}]}]
+        }))
+
+    responses.add_callback(responses.POST, '{0}/v1/analyze'.format(base_url),
+                           callback=analyze, content_type='application/json')
+    service = ibm_watson.NaturalLanguageUnderstandingV1(
+        '2018-03-16', username='username', password='password')
+    html = '<p>Hello IBM.</p><p>Bye IBM.</p>'
+    result = service.analyze(
+        Features(entities=EntitiesOptions(mentions=True)), html=html,
+        return_analyzed_text=True, max_characters=20).get_result()
+
+    assert len(responses.calls) == 2
+    text = result['analyzed_text']
+    assert text == 'Hello IBM.\nBye IBM.'
+    assert [text[b:e] for b, e in (m['location'] for m in
+                                   result['entities'][0]['mentions'])] == \
+        ['IBM', 'IBM']
@@ -0,0 +1,97 @@
+# coding: utf-8
+import json
+import threading
+import responses
+import ibm_watson
+from ibm_watson.natural_language_understanding_v1 import Features, \
+    CategoriesOptions, EntitiesOptions, SentimentOptions
+from ibm_watson.natural_language_understanding_v1_coalescer import union
+
+base_url = 'https://gateway.watsonplatform.net/natural-language-understanding/api'
+
+
+def test_union_merges_options_and_detects_conflicts():
+    assert union({'entities': {'limit': 5}},
+                 {'entities': {'limit': 10, 'mentions': True},
+                  'sentiment': {}}) == \
+        {'entities': {'limit': 10, 'mentions': True}, 'sentiment': {}}
+    assert union({'entities': {'model': 'a'}},
+                 {'entities': {'model': 'b'}}) is None
+    assert union({'entities': {'limit': 100}}, {'entities': {}}) is None
+    assert union({'entities': {}}, {'entities': {'limit': 1}}) is None
+
+
+@responses.activate
+def test_concurrent_calls_share_one_request():
+
+    def analyze(request):
+        features = json.loads(request.body)['features']
+        result = {'language': 'en'}
+        if 'entities' in features:
+            result['entities'] = [
+                {'type': 'Company', 'text': 'IBM', 'relevance': 0.9,
+                 'mentions': [{'text': 'IBM', 'location': [0, 3]}]},
+                {'type': 'Person', 'text': 'Ann', 'relevance': 0.5,
+                 'mentions': [{'text': 'Ann', 'location': [8, 11]}]}]
+        if 'sentiment' in features:
+            result['sentiment'] = {'document': {'label': 'positive',
+                                                'score': 0.8}}
+        if 'categories' in features:
+            result['categories'] = [{'label': '/business', 'score': 0.7}]
+        return (200, {}, json.dumps(result))
+
+    responses.add_callback(responses.POST, '{0}/v1/analyze'.format(base_url),
+                           callback=analyze, content_type='application/json')
+    service = ibm_watson.NaturalLanguageUnderstandingV1(
+        '2018-03-16', username='username', password='password')
+    coalescer = service.enable_coalescing(window=0.2)
+    requested = [
+        Features(entities=EntitiesOptions(limit=1)),
+        Features(entities=EntitiesOptions(limit=2, mentions=True),
+                 sentiment=SentimentOptions()),
+        Features(categories=CategoriesOptions()),
+    ]
+    results = [None] * len(requested)
+
+    def call(i):
+        results[i] = service.analyze(requested[i],
+                                     text='IBM and Ann').get_result()
+
+    threads = [threading.Thread(target=call, args=(i,))
+               for i in range(len(requested))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(responses.calls) == 1
+    sent = json.loads(responses.calls[0].request.body)['features']
+    assert sent == {'entities': {'limit': 2, 'mentions': True},
+                    'sentiment': {}, 'categories': {}}
+    assert results[0] == {'language': 'en', 'entities': [
+        {'type': 'Company', 'text': 'IBM', 'relevance': 0.9}]}
+    assert len(results[1]['entities']) == 2
+    assert results[1]['entities'][1]['mentions'][0]['text'] == 'Ann'
+    assert results[1]['sentiment']['document']['score'] == 0.8
+    assert set(results[2]) == {'language', 'categories'}
+    assert (coalescer.calls, coalescer.requests) == (3, 1)
+
+    service.analyze(Features(entities=EntitiesOptions(model='a')),
+                    text='IBM and Ann')
+    assert len(responses.calls) == 2
+
+    def call_separately(i, features):
+        results[i] = service.analyze(features, text='IBM and Ann')
+
+    threads = [threading.Thread(target=call_separately, args=(i, features))
+               for i, features in enumerate([
+                   Features(entities=EntitiesOptions(limit=100)),
+                   Features(entities=EntitiesOptions())])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(responses.calls) == 4
+    assert sorted(json.dumps(json.loads(c.request.body)['features'])
+                  for c in responses.calls[2:]) == \
+        ['{"entities": {"limit": 100}}', '{"entities": {}}']
@@ -0,0 +1,29 @@
+# coding: utf-8
+import subprocess
+import sys
+import pytest
+import ibm_watson
+
+
+def test_exports():
+    for name in ibm_watson.__all__:
+        assert getattr(ibm_watson, name) is not None
+        assert name in dir(ibm_watson)
+    assert ibm_watson.TextToSpeechV1.__name__ == 'TextToSpeechV1Adapter'
+    with pytest.raises(AttributeError):
+        getattr(ibm_watson, 'SpeechToTextV2')
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason='lazy imports need Python 3.7')
+def test_lazy_import():
+    loaded = subprocess.check_output([
+        sys.executable, '-c',
+        'import sys\n'
+        'from ibm_watson import AssistantV2\n'
+        'print(" ".join(m for m in sys.modules if m.startswith("ibm_watson")))'
+    ]).decode('utf-8').split()
+    assert 'ibm_watson.assistant_v2' in loaded
+    assert 'ibm_watson.assistant_v1' not in loaded
+    assert 'ibm_watson.discovery_v1' not in loaded
+    assert 'ibm_watson.websocket' not in loaded
@@ -0,0 +1,71 @@
+# coding: utf-8
+import json
+import math
+import os
+import responses
+import ibm_watson
+from ibm_watson.personality_insights_v3 import ContentItem
+from ibm_watson.personality_insights_v3_profiles import ProfileAggregator, \
+    iter_content
+
+profile_url = 'https://gateway.watsonplatform.net/personality-insights/api/v3/profile'
+
+
+def test_iter_content_streams_valid_json():
+    items = [{'content': u'word {0} é'.format(i)} for i in range(50)]
+    pieces = list(iter_content(items, chunk_size=100))
+    assert len(pieces) > 5
+    assert json.loads(b''.join(pieces).decode('utf-8')) == \
+        {'contentItems': items}
+
+
+@responses.activate
+def test_aggregator_profiles_only_new_content(tmpdir):
+    with open(os.path.join(os.path.dirname(__file__),
+                           '../../resources/personality-v3-expect3.txt')) \
+            as expect_file:
+        csv_response = expect_file.read()
+    bodies = []
+
+    def profile(request):
+        bodies.append(json.loads(b''.join(request.body).decode('utf-8')))
+        return (200, {}, csv_response)
+
+    responses.add_callback(responses.POST, profile_url, callback=profile,
+                           content_type='text/csv')
+    service = ibm_watson.PersonalityInsightsV3(
+        '2016-10-20', username='username', password='password')
+    aggregator = ProfileAggregator(service, accept='text/csv', min_words=4,
+                                   min_new_words=100, min_growth=0.5,
+                                   csv_headers=True)
+
+    history = [ContentItem('one two three', id='1'),
+               {'content': 'four five', 'id': '2'}]
+    assert aggregator.add('ann', history) == 2
+    assert aggregator.add('bob', [{'content': 'too short'}]) == 1
+    results = aggregator.profile_all()
+    assert results['ann'] == csv_response
+    assert results['bob'] is None
+    assert len(bodies) == 1
+    assert [i['id'] for i in bodies[0]['contentItems']] == ['1', '2']
+
+    path = str(tmpdir.join('profiles.json'))
+    aggregator.save(path)
+    aggregator = ProfileAggregator(service, accept='text/csv', min_words=4,
+                                   min_new_words=100, min_growth=0.5,
+                                   csv_headers=True)
+    aggregator.load(path)
+    assert aggregator.add('ann', history + [{'content': 'six'}]) == 3
+    assert aggregator.profile('ann') == csv_response
+    assert len(bodies) == 1
+    aggregator.add('ann', [{'content': 'seven eight'}])
+    aggregator.profile('ann')
+    assert len(bodies) == 2
+    assert len(bodies[1]['contentItems']) == 4
+
+    table = aggregator.table()
+    assert len(table) == 1
+    assert list(table['user_id']) == ['ann']
+    assert table['consumption_preferences_start_business'][0] == 0.5
+    assert table['big5_agreeableness'].typecode == 'd'
+    assert not math.isnan(table['big5_agreeableness'][0])
@@ -0,0 +1,75 @@
+# coding: utf-8
+import json
+import responses
+import ibm_watson
+from ibm_watson.tone_analyzer_v3 import Utterance
+from ibm_watson.tone_analyzer_v3_chat import ToneHistory
+
+tone_chat_url = 'https://gateway.watsonplatform.net/tone-analyzer/api/v3/tone_chat'
+
+TONES = {
+    'This is broken': [{'tone_id': 'frustrated', 'score': 0.9,
+                        'tone_name': 'Frustrated'}],
+    'Sorry to hear that': [{'tone_id': 'sympathetic', 'score': 0.8,
+                            'tone_name': 'Sympathetic'},
+                           {'tone_id': 'polite', 'score': 0.6,
+                            'tone_name': 'Polite'}],
+    'Thanks, it works': [{'tone_id': 'satisfied', 'score': 0.7,
+                          'tone_name': 'Satisfied'}],
+    'ok': [{'tone_id': 'polite', 'score': 0.3, 'tone_name': 'Polite'}],
+}
+
+
+def test_tone_history_ring_buffer():
+    history = ToneHistory(3)
+    for tone_id, score in (('sad', 0.6), ('neutral', None),
+                           ('excited', 0.75), ('unknown', 0.5)):
+        history.append(tone_id, score)
+    assert len(history) == 3
+    assert history.to_dict() == {'current': 'unknown', 'history': [
+        {'tone_name': 'neutral', 'score': None},
+        {'tone_name': 'excited', 'score': 0.75},
+        {'tone_name': 'unknown', 'score': 0.5}]}
+
+
+@responses.activate
+def test_chat_session_analyzes_only_new_utterances():
+
+    def tone_chat(request):
+        utterances = json.loads(request.body)['utterances']
+        return (200, {}, json.dumps({'utterances_tone': [
+            {'utterance_id': i, 'utterance_text': u['text'],
+             'tones': TONES[u['text']]}
+            for i, u in enumerate(utterances)]}))
+
+    responses.add_callback(responses.POST, tone_chat_url, callback=tone_chat,
+                           content_type='application/json')
+    service = ibm_watson.ToneAnalyzerV3('2017-09-21', username='username',
+                                        password='password')
+    session = service.chat_session(batch_size=2)
+
+    session.add([Utterance('This is broken', user='customer'),
+                 {'text': 'Sorry to hear that', 'user': 'agent'},
+                 {'text': 'ok', 'user': 'customer'}])
+    flushed = session.flush()['utterances_tone']
+    assert [a['utterance_id'] for a in flushed] == [0, 1, 2]
+    assert len(responses.calls) == 2
+
+    conversation = [{'text': 'This is broken', 'user': 'customer'},
+                    {'text': 'Sorry to hear that', 'user': 'agent'},
+                    {'text': 'ok', 'user': 'customer'},
+                    {'text': 'Thanks, it works', 'user': 'customer'}]
+    result = session.tone_chat(conversation)['utterances_tone']
+    assert [a['utterance_id'] for a in result] == [0, 1, 2, 3]
+    assert result[3]['tones'][0]['tone_id'] == 'satisfied'
+    assert len(responses.calls) == 3
+    assert json.loads(responses.calls[2].request.body)['utterances'] == \
+        [{'text': 'Thanks, it works'}]
+    assert (session.hits, session.misses, session.turns) == (3, 4, 4)
+
+    assert session.history('customer').to_dict() == {
+        'current': 'satisfied',
+        'history': [{'tone_name': 'frustrated', 'score': 0.9},
+                    {'tone_name': 'neutral', 'score': None},
+                    {'tone_name': 'satisfied', 'score': 0.7}]}
+    assert session.history('agent').current == 'sympathetic'
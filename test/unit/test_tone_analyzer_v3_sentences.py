@@ -0,0 +1,64 @@
+# coding: utf-8
+import json
+import responses
+import ibm_watson
+from ibm_watson.tone_analyzer_v3 import ToneInput
+from ibm_watson.tone_analyzer_v3_sentences import merge_results, \
+    split_sentences
+
+tone_url = 'https://gateway.watsonplatform.net/tone-analyzer/api/v3/tone'
+
+
+def test_split_sentences_by_count_and_size():
+    text = u'One. Two!  Three?\nFour five. Six'
+    chunks = split_sentences(text, max_sentences=2)
+    assert [c for _, c in chunks] == [u'One. Two!  ', u'Three?\nFour five. ',
+                                      u'Six']
+    assert all(text[o:o + len(c)] == c for o, c in chunks)
+    assert [c for _, c in split_sentences(u'Déjà vu. Encore.', 10, 9)] == \
+        [u'Déjà vu. ', u'Encore.']
+
+
+def test_one_sentence_chunks_get_offsets():
+    text = 'Hi there.\n  Bye now.'
+    document = {'document_tone': {'tones': []}}
+    merged = merge_results([(o, c, document)
+                            for o, c in split_sentences(text, 1)])
+    assert [text[s['input_from']:s['input_to']]
+            for s in merged['sentences_tone']] == ['Hi there.', 'Bye now.']
+    assert [s['text'] for s in merged['sentences_tone']] == \
+        ['Hi there.', 'Bye now.']
+
+
+@responses.activate
+def test_tone_merges_sentence_chunks():
+
+    def tone(request):
+        text = json.loads(request.body)['text']
+        sentences = [s for s in text.split('. ') if s]
+        joy = 'happy' in text
+        result = {'document_tone': {'tones': [
+            {'tone_id': 'joy' if joy else 'sadness', 'score': 1.0,
+             'tone_name': 'Joy' if joy else 'Sadness'}]}}
+        if len(sentences) > 1:
+            result['sentences_tone'] = [
+                {'sentence_id': i, 'text': s, 'tones': []}
+                for i, s in enumerate(sentences)]
+        return (200, {}, json.dumps(result))
+
+    responses.add_callback(responses.POST, tone_url, callback=tone,
+                           content_type='application/json')
+    service = ibm_watson.ToneAnalyzerV3('2017-09-21', username='username',
+                                        password='password')
+    text = 'I am happy. So happy. Very sad. Quite sad'
+    result = service.tone(ToneInput(text), max_sentences=2,
+                          max_workers=2).get_result()
+
+    assert len(responses.calls) == 2
+    assert [(s['sentence_id'], s['text']) for s in result['sentences_tone']] \
+        == [(0, 'I am happy'), (1, 'So happy'), (2, 'Very sad'),
+            (3, 'Quite sad')]
+    tones = result['document_tone']['tones']
+    assert [t['tone_id'] for t in tones] == ['joy']
+    # Sadness, at 19 / 41, is below the reporting threshold.
+    assert tones[0]['score'] == round(22.0 / len(text), 6)